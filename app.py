@@ -11,6 +11,7 @@ from jbi100_app.layouts.overview_layout import overview_layout
 from jbi100_app.layouts.detailed_layout import detailed_layout
 
 from jbi100_app.callbacks.register_callbacks import register_callbacks
+from jbi100_app.data import start_data_watcher
 
 # Register all interactive callbacks (map clicks, filters, brushing, etc.)
 register_callbacks()
@@ -21,9 +22,10 @@ app.layout = html.Div(
     [
         dcc.Location(id="url", refresh=False),
         # Memory stores for cross-component state management
-        dcc.Store(id="selected_country", storage_type="memory"),  # Currently clicked country
-        dcc.Store(id="selected-countries", storage_type="memory"),  # Countries selected on map
-        dcc.Store(id="metric-brush", storage_type="memory"),  # Brushed countries from metric cards
+        # Countries are stored as integer entity ids (rows of the dataset's IndicatorMatrix)
+        dcc.Store(id="selected_country", storage_type="memory"),  # Currently clicked country (entity store)
+        dcc.Store(id="selected-countries", storage_type="memory"),  # Countries selected on map (entity store)
+        dcc.Store(id="metric-brush", storage_type="memory"),  # Brushed countries from metric cards (entity store)
         dcc.Store(id="metric-brush-rev", storage_type="memory"),  # Revision counter for brush updates
         dcc.Store(id="expanded-metric", storage_type="memory"),  # Currently expanded metric card
         html.Div(id="layout-container"),
@@ -43,4 +45,6 @@ def display_page(pathname):
 
 
 if __name__ == "__main__":
+    # Pick up edited CSVs in data_sets/ without restarting the server
+    start_data_watcher()
     app.run(debug=False)
\ No newline at end of file
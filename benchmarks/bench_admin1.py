@@ -0,0 +1,190 @@
+# Benchmark: every callback at 10,000 admin-1 units against its latency target
+# Generates synthetic admin-1 CSVs (provinces spread over the real countries, in
+# data_sets/admin1/ layout) in a temporary copy of data_sets/, loads the dataset with
+# them and times each callback with the admin-1 level shown, 200 selected units and
+# one clicked unit. Prints the median per callback next to LATENCY_TARGETS_MS and
+# exits with status 1 when a callback misses its target, so scaling regressions show
+# up as a failing run. The targets are documented in the README.
+# Run from the repository root: python benchmarks/bench_admin1.py [n_units]
+
+import contextvars
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+
+from jbi100_app import data
+from jbi100_app.callbacks.register_callbacks import register_callbacks
+
+register_callbacks()
+
+from app import display_page  # noqa: E402  (callbacks need the app registered)
+from jbi100_app.callbacks import (  # noqa: E402
+    country_selection as cs,
+    detail_callbacks as dc,
+    metric_cards_callbacks as mcc,
+    metric_expand_callbacks as mec,
+    mini_map_callbacks as mc,
+    ranking_callbacks as rc,
+)
+
+N_UNITS = 10_000
+N_SELECTED = 200
+REPEATS = 5
+WEIGHTS = (20, 30, 10, 25, 15)
+TOGGLES = (["enabled"],) * 5
+GLOBAL_METRICS = (["unemployment"], ["gdp_pc"], [], [], [], [], 60, 70, 50, 40, 65, 55)
+
+# Median latency budget per callback (ms) with N_UNITS admin-1 units loaded, on one
+# core. Keep in sync with "Performance targets" in the README.
+LATENCY_TARGETS_MS = {
+    "update_search_options": 20,
+    "toggle_selected": 20,
+    "bulk_select": 50,
+    "label": 10,
+    "update_global_map": 250,
+    "update_detailed_ranking": 200,
+    "update_detailed_scatterplot": 250,
+    "update_detailed_info": 50,
+    "update_selected_indicator": 5,
+    "update_selected_country": 10,
+    "bump_brush_revision": 5,
+    "update_metric_cards": 500,
+    "store_metric_brush": 20,
+    "toggle_expanded": 5,
+    "apply_expand_classes": 5,
+    "update_mini_map": 100,
+    "display_page": 50,
+}
+
+
+# Copy of data_sets/ plus n synthetic admin-1 units, each file missing a few columns
+def write_admin1_sources(root, n, rng):
+    for csv in data.DATA_DIR.glob("*.csv"):
+        shutil.copy(csv, root / csv.name)
+    countries = data.get_data(['Latitude', 'Longitude']).dropna().reset_index(drop=True)
+    parents = rng.choice(countries.index.to_numpy(), size=n)
+    names = [f"Province {i:05d}" for i in range(n)]
+    lat = countries['Latitude'].to_numpy()[parents] + rng.normal(0, 2, n)
+    lon = countries['Longitude'].to_numpy()[parents] + rng.normal(0, 2, n)
+    coords = [f"{abs(a):.0f} {abs(a) % 1 * 60:.0f} {'N' if a >= 0 else 'S'}, "
+              f"{abs(o):.0f} {abs(o) % 1 * 60:.0f} {'E' if o >= 0 else 'W'}" for a, o in zip(lat, lon)]
+
+    admin1 = root / data.ADMIN1_SUBDIR
+    admin1.mkdir()
+    for stem, columns in data.COLUMN_MANIFEST.items():
+        frame = {data.COUNTRY_COL: names, data.PARENT_COL: countries[data.COUNTRY_COL].to_numpy()[parents]}
+        for col in columns:
+            if col == 'Geographic_Coordinates':
+                frame[col] = coords
+            elif col == 'Fiscal_Year':
+                continue
+            elif 'percent' in col.lower() or 'Rate' in col:
+                frame[col] = rng.uniform(0, 40, n).round(2)
+            else:
+                frame[col] = rng.lognormal(12, 2, n).round(0)
+        pd.DataFrame(frame).to_csv(admin1 / f"{stem}.csv", index=False)
+
+
+def call(fn, *args, trigger=None):
+    def run():
+        triggered = [{"prop_id": trigger, "value": None}] if trigger else []
+        context_value.set(AttributeDict(
+            triggered_inputs=triggered, inputs_list=[], states_list=[], outputs_list=[],
+            input_values={}, state_values={},
+        ))
+        return fn(*args)
+    return contextvars.copy_context().run(run)
+
+
+def median_ms(fn):
+    fn()  # warm caches
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_UNITS
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_admin1_sources(root, n, rng)
+        data.DATA_DIR, data.ADMIN1_DIR = root, root / data.ADMIN1_SUBDIR
+        data.EDITIONS_DIR, data.PROCESSED_DIR = root / "editions", root / "processed"
+        data.REGISTRY.invalidate()
+
+        start = time.perf_counter()
+        ds = data.get_dataset()
+        print(f"dataset with {n} admin-1 units built in {time.perf_counter() - start:.1f} s "
+              f"({len(ds.matrix)} entities)")
+
+        units = np.flatnonzero(data.level_mask("admin1", ds))
+        # Stores hold entity ids with their data version (data.entity_store)
+        ids = sorted(rng.choice(units, size=N_SELECTED, replace=False).tolist())
+        sel = data.entity_store(ids, ds)
+        clicked = data.entity_store(ids[:1], ds)
+        brushed = data.entity_store(ids[:50], ds)
+        name = str(ds.matrix.names[ids[0]])
+        click = {"points": [{"customdata": [name, "", 1]}]}
+        brush = {"points": [{"customdata": [str(ds.matrix.names[i]), ""]} for i in units[:500]]}
+        pasted = "\n".join(ds.frame.loc[ds.frame["iso3"].notna(), "Country"].head(50))
+
+        cases = {
+            "update_search_options": lambda: cs.update_search_options("ger"),
+            "toggle_selected": lambda: call(cs.toggle_selected, None, 0, "DEU", sel,
+                                            trigger="country-search.value"),
+            "bulk_select": lambda: cs.bulk_select(1, pasted, "region|Europe", 20, sel,
+                                                  *GLOBAL_METRICS),
+            "label": lambda: cs.label(sel),
+            "update_global_map": lambda: rc.update_global_map(*GLOBAL_METRICS, sel, 0),
+            "update_detailed_ranking": lambda: dc.update_detailed_ranking(
+                sel, clicked, "Complex_Metrics", *WEIGHTS, *TOGGLES, 0, None, "admin1"),
+            "update_detailed_scatterplot": lambda: dc.update_detailed_scatterplot(
+                sel, clicked, brushed, 1, "ASF", "IEC", *WEIGHTS, *TOGGLES, 0, None, "admin1"),
+            "update_detailed_info": lambda: call(dc.update_detailed_info, click, None, sel,
+                                                 trigger="detailed-ranking-bar.clickData"),
+            "update_selected_indicator": lambda: call(dc.update_selected_indicator, click, None,
+                                                      trigger="detailed-ranking-bar.clickData"),
+            "update_selected_country": lambda: call(dc.update_selected_country, click, None,
+                                                    trigger="detailed-ranking-bar.clickData"),
+            "bump_brush_revision": lambda: mcc.bump_brush_revision(sel, 3),
+            "update_metric_cards": lambda: mcc.update_metric_cards(sel, brushed, 1, "", clicked, "admin1"),
+            "store_metric_brush": lambda: call(mcc.store_metric_brush, None, None, None, None, None,
+                                               brush, None, 0, None, trigger="detailed-scatterplot.selectedData"),
+            "toggle_expanded": lambda: call(mec.toggle_expanded, 1, 0, 0, 0, 0, 0, *TOGGLES, None,
+                                            trigger="metric-expand-asf.n_clicks"),
+            "apply_expand_classes": lambda: mec.apply_expand_classes("ASF", *TOGGLES),
+            "update_mini_map": lambda: mc.update_mini_map(sel, clicked),
+            "display_page": lambda: display_page("/detailed"),
+        }
+
+        print(f"median of {REPEATS} runs, {N_SELECTED} selected units (ms)")
+        failed = []
+        for cb, fn in cases.items():
+            ms = median_ms(fn)
+            target = LATENCY_TARGETS_MS[cb]
+            ok = ms <= target
+            if not ok:
+                failed.append(cb)
+            print(f"{cb:>28} {ms:9.1f} / {target:5d}  {'ok' if ok else 'OVER TARGET'}")
+
+    if failed:
+        print(f"{len(failed)} callback(s) over target: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
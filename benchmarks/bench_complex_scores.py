@@ -0,0 +1,91 @@
+# Benchmark: weighted complex score, merge-based vs. aligned metric matrix
+# Times the former compute_complex_scores body (one DataFrame and outer merge per
+# enabled metric, then a weighted sum per column) against MetricMatrix.composite on
+# the loaded dataset (~260 entities) and on 100,000 synthetic entities, for a few
+# toggle combinations. Both must return identical frames.
+# Run from the repository root: python benchmarks/bench_complex_scores.py
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jbi100_app.data import get_dataset
+from jbi100_app.utils.metric_matrix import MetricMatrix
+
+KEYS = ["ASF", "IEC", "SCC", "WSI", "ERS"]
+WEIGHTS = dict(zip(KEYS, (20, 30, 10, 25, 15)))
+CASES = {
+    "all five": KEYS,
+    "three": ["ASF", "SCC", "ERS"],
+    "one": ["IEC"],
+}
+REPEATS = 20
+
+
+# compute_complex_scores before the metric matrix (scores: key -> series)
+def merge_scores(scores, weights):
+    result_df = None
+    for name, series in scores.items():
+        temp_df = pd.DataFrame({"Country": series.index, name: series.values})
+        result_df = temp_df if result_df is None else result_df.merge(temp_df, on="Country", how="outer")
+
+    total_weight = sum(weights.values()) or 1
+    score_cols = list(scores.keys())
+    result_df["Complex_Score"] = 0
+    for col in score_cols:
+        result_df["Complex_Score"] += (weights[col] / total_weight) * result_df[col].fillna(0)
+    return result_df[["Country", "Complex_Score"] + score_cols]
+
+
+# Five series over n entities, each missing a random tenth of them
+def synthetic_metrics(n, rng):
+    names = np.array([f"ENTITY {i:06d}" for i in range(n)], dtype=object)
+    return {
+        key: pd.Series(rng.random(n), index=pd.Index(names)).sample(frac=0.9, random_state=j).sort_index()
+        for j, key in enumerate(KEYS)
+    }
+
+
+def median_ms(fn):
+    fn()
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    datasets = {
+        "dataset": dict(get_dataset().metrics),
+        "100k synthetic": synthetic_metrics(100_000, rng),
+    }
+
+    print(f"median of {REPEATS} runs (ms)")
+    print(f"{'':>16} {'case':>9} {'rows':>8} {'merge':>9} {'matrix':>9} {'speedup':>8}")
+    for label, metrics in datasets.items():
+        start = time.perf_counter()
+        matrix = MetricMatrix.from_series(metrics)
+        build = (time.perf_counter() - start) * 1000
+        for case, keys in CASES.items():
+            weights = {k: WEIGHTS[k] for k in keys}
+            scores = {k: metrics[k] for k in keys}
+            expected = merge_scores(scores, weights)
+            pd.testing.assert_frame_equal(matrix.composite(weights), expected, check_exact=True)
+
+            t_merge = median_ms(lambda: merge_scores(scores, weights))
+            t_matrix = median_ms(lambda: matrix.composite(weights))
+            print(f"{label:>16} {case:>9} {len(expected):8d} {t_merge:9.2f} {t_matrix:9.2f} "
+                  f"{t_merge / t_matrix:7.1f}x")
+        print(f"{label:>16} matrix build (once per data version): {build:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# Benchmark: typeahead country search latency
+# Replays typing every indexed country name, alias and ISO code one keystroke at a
+# time against the CountrySearch index of the loaded dataset and reports the mean,
+# p99 and worst latency per keystroke.
+# Run from the repository root: python benchmarks/bench_country_search.py
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jbi100_app.data import get_dataset
+from jbi100_app.utils.country_search import CountrySearch
+
+
+def main():
+    frame = get_dataset().frame
+
+    start = time.perf_counter()
+    index = CountrySearch.from_frame(frame)
+    build = time.perf_counter() - start
+
+    queries = [term[:i] for term in set(index._terms) for i in range(1, len(term) + 1)]
+    timings = np.empty(len(queries))
+    for j, q in enumerate(queries):
+        start = time.perf_counter()
+        index.search(q)
+        timings[j] = time.perf_counter() - start
+    timings *= 1e6
+
+    print(f"{len(index)} countries, {len(index._terms)} indexed terms")
+    print(f"index build          : {build * 1000:8.1f} ms")
+    print(f"keystrokes replayed  : {len(queries)}")
+    print(f"mean per keystroke   : {timings.mean():8.1f} us")
+    print(f"p99 per keystroke    : {np.percentile(timings, 99):8.1f} us")
+    print(f"worst keystroke      : {timings.max():8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Benchmark: trigram-indexed matcher vs. difflib.get_close_matches
+# Generates 10k noisy country names (1-2 random character edits of ISO names),
+# resolves each against the normalized ISO keys with both matchers at the app's
+# cutoff, checks they agree and reports timings.
+# Run from the repository root: python benchmarks/bench_fuzzy_match.py
+
+import difflib
+import string
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jbi100_app.utils.country_meta import FUZZY_CUTOFF, _iso_maps
+from jbi100_app.utils.fuzzy_match import TrigramIndex
+
+N_NAMES = 10_000
+ALPHABET = string.ascii_uppercase + " "
+
+
+def noisy_names(keys, n, seed=0):
+    rng = np.random.default_rng(seed)
+    names = []
+    for _ in range(n):
+        s = list(keys[rng.integers(len(keys))])
+        for _ in range(rng.integers(1, 3)):
+            op = rng.integers(4)
+            pos = int(rng.integers(len(s)))
+            if op == 0:                      # substitute
+                s[pos] = ALPHABET[rng.integers(len(ALPHABET))]
+            elif op == 1 and len(s) > 1:     # delete
+                del s[pos]
+            elif op == 2:                    # insert
+                s.insert(pos, ALPHABET[rng.integers(len(ALPHABET))])
+            elif pos + 1 < len(s):           # transpose
+                s[pos], s[pos + 1] = s[pos + 1], s[pos]
+        names.append("".join(s))
+    return names
+
+
+def main():
+    iso_keys, _ = _iso_maps()
+    keys = sorted(iso_keys)
+    names = noisy_names(keys, N_NAMES)
+
+    start = time.perf_counter()
+    index = TrigramIndex(keys)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = []
+    for name in names:
+        match = difflib.get_close_matches(name, list(iso_keys), n=1, cutoff=FUZZY_CUTOFF)
+        legacy.append(match[0] if match else None)
+    t_legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.best_match(name, cutoff=FUZZY_CUTOFF) for name in names]
+    t_indexed = time.perf_counter() - start
+
+    shortlist = np.mean([len(index.shortlist(name, FUZZY_CUTOFF)) for name in names[:1000]])
+    mismatches = sum(a != b for a, b in zip(legacy, indexed))
+    matched = sum(m is not None for m in indexed)
+
+    print(f"{N_NAMES} noisy names against {len(keys)} ISO keys (cutoff {FUZZY_CUTOFF})")
+    print(f"matched              : {matched}")
+    print(f"mean shortlist size  : {shortlist:.1f} of {len(keys)}")
+    print(f"index build          : {build * 1000:8.1f} ms")
+    print(f"difflib              : {t_legacy:8.2f} s")
+    print(f"trigram index        : {t_indexed:8.2f} s  ({t_legacy / t_indexed:.1f}x)")
+    print(f"disagreements        : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
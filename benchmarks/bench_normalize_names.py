@@ -0,0 +1,58 @@
+# Benchmark: batch country-name normalization vs. per-row _norm
+# Builds a 1M-name input from the dataset's and all.csv's names plus accented /
+# punctuated / cased variants (a realistic, heavily repeated list), and a 1M
+# all-distinct input, checks normalize_names() matches _norm exactly and reports
+# throughput.
+# Run from the repository root: python benchmarks/bench_normalize_names.py
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jbi100_app.data import get_data
+from jbi100_app.utils.country_meta import ISO_PATH, _combining_table, _norm, normalize_names
+
+N_NAMES = 1_000_000
+
+
+def base_names():
+    names = list(get_data(columns=[])["Country"]) + list(pd.read_csv(ISO_PATH)["name"])
+    variants = []
+    for n in names:
+        variants += [n, n.lower(), f"  {n} ", n.replace(" ", "-"), f"{n} (the)", n.replace("A", "Á")]
+    return variants
+
+
+def run(label, names):
+    start = time.perf_counter()
+    legacy = [_norm(n) for n in names]
+    t_legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = normalize_names(names)
+    t_batch = time.perf_counter() - start
+
+    same = legacy == batch
+    print(f"{label:<22} distinct {len(set(names)):>9,}   _norm {t_legacy:6.2f} s   "
+          f"batch {t_batch:6.2f} s ({t_legacy / t_batch:5.1f}x, "
+          f"{len(names) / t_batch / 1e6:.1f}M names/s)   identical: {same}")
+
+
+def main():
+    _combining_table()  # one-off table build, not part of the per-call cost
+    rng = np.random.default_rng(0)
+    pool = base_names()
+    repeated = [pool[i] for i in rng.integers(len(pool), size=N_NAMES)]
+    distinct = [f"{pool[i]} {k}" for k, i in enumerate(rng.integers(len(pool), size=N_NAMES))]
+
+    run("1M repeated names", repeated)
+    run("1M distinct names", distinct)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Benchmark: serial vs. pooled per-file stages of the preprocessing pipeline
+# Builds a synthetic 10-edition input (5 Factbook files per edition, 50 files in
+# total, each with the real files' rows replicated), runs the full pipeline with
+# a cold stage cache serially and with process/thread pools, checks the outputs
+# are identical and prints the per-stage / per-file timing breakdown.
+# Run from the repository root: python benchmarks/bench_preprocessing.py [workers]
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import preprocessing
+from preprocessing import RAW_DIR, SOURCES, format_timings, run_pipeline
+
+EDITIONS = range(2015, 2025)  # 10 editions x 5 files = 50 files
+REPLICAS = 10                 # row multiplier per file
+
+
+def synthetic_input(root: Path) -> dict:
+    """Write the synthetic files under root/<year>/ and return the sources mapping."""
+    base = {name: pd.read_csv(RAW_DIR / fname) for name, fname in SOURCES.items()}
+    sources = {}
+    for year in EDITIONS:
+        (root / str(year)).mkdir(parents=True)
+        drift = 1.0 + 0.01 * (year - EDITIONS[0])
+        for name, df in base.items():
+            parts = []
+            for r in range(REPLICAS):
+                part = df.copy()
+                part["Country"] = part["Country"].astype(str) + f" {r}"
+                for c in part.columns:
+                    if part[c].dtype.kind == "f":
+                        part[c] = part[c] * drift
+                parts.append(part)
+            rel = f"{year}/{SOURCES[name]}"
+            pd.concat(parts, ignore_index=True).to_csv(root / rel, index=False)
+            sources[f"{name}_{year}"] = rel
+    return sources
+
+
+def timed_run(raw_dir, out_dir, sources, workers, executor):
+    start = time.perf_counter()
+    records = run_pipeline(raw_dir, out_dir, force=True, workers=workers,
+                           executor=executor, sources=sources)
+    return time.perf_counter() - start, records
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else max(os.cpu_count() or 1, 4)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sources = synthetic_input(tmp / "raw")
+        print(f"{len(sources)} files, {len(EDITIONS)} editions, CPUs: {os.cpu_count()}")
+
+        results = {}
+        for label, n, executor in [("serial", 1, "process"),
+                                   (f"process x{workers}", workers, "process"),
+                                   (f"thread x{workers}", workers, "thread")]:
+            out = tmp / label.replace(" ", "_")
+            out.mkdir()
+            wall, records = timed_run(tmp / "raw", out, sources, n, executor)
+            files_wall = next(sec for stage, _, state, sec in records if stage == "files")
+            results[label] = (wall, files_wall, records, out)
+
+        reference = (results["serial"][3] / preprocessing.OUT_CLEAN).read_bytes()
+        for label, (wall, files_wall, _, out) in results.items():
+            same = (out / preprocessing.OUT_CLEAN).read_bytes() == reference
+            print(f"{label:<14} total {wall:7.2f} s   per-file stages {files_wall:7.2f} s   "
+                  f"identical output: {same}")
+
+        print()
+        print(f"Breakdown (process x{workers}):")
+        print(format_timings(results[f"process x{workers}"][2]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Benchmark: compute_complex_scores with the score cache
+# Replays a slider session on the loaded dataset: for every weight configuration
+# the ranking and the scatterplot each ask for the scores, and the metric cards ask
+# for the equal-weight scores. Reports the time per call on a miss and on a hit and
+# the cache's hit/miss counters, then checks cached frames equal fresh ones.
+# Run from the repository root: python benchmarks/bench_score_cache.py
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jbi100_app.data import get_dataset
+from jbi100_app.utils.complex_scores import SCORE_CACHE, compute_complex_scores
+
+N_CONFIGS = 50
+ON = (True,) * 5
+
+
+def main():
+    ds = get_dataset()
+    rng = np.random.default_rng(0)
+    # Slider positions in steps of 5; some configurations repeat, some only differ
+    # in scale (all weights doubled) and normalize to the same key
+    configs = [tuple(int(w) for w in rng.integers(0, 11, 5) * 5) for _ in range(N_CONFIGS)]
+    configs += [tuple(2 * w for w in c) for c in configs[:10]] + configs[:10]
+
+    SCORE_CACHE.clear()
+    SCORE_CACHE.hits = SCORE_CACHE.misses = 0
+    miss, hit = [], []
+    for weights in configs:
+        for caller in ("ranking", "scatterplot", "metric cards"):
+            w = (1, 1, 1, 1, 1) if caller == "metric cards" else weights
+            before = SCORE_CACHE.misses
+            start = time.perf_counter()
+            compute_complex_scores(*w, *ON, dataset=ds)
+            (miss if SCORE_CACHE.misses > before else hit).append(time.perf_counter() - start)
+
+    print(f"{len(configs)} configurations x 3 callers = {len(miss) + len(hit)} calls")
+    print(f"hits {SCORE_CACHE.hits}, misses {SCORE_CACHE.misses}, "
+          f"{len(SCORE_CACHE)} entries, {SCORE_CACHE.nbytes / 1024:.0f} KiB")
+    print(f"median per call: miss {np.median(miss) * 1000:.3f} ms, hit {np.median(hit) * 1000:.4f} ms")
+
+    for weights in configs[:5]:
+        cached = compute_complex_scores(*weights, *ON, dataset=ds)
+        fresh = ds.metric_matrix.composite(dict(zip(["ASF", "IEC", "SCC", "WSI", "ERS"], weights)))
+        pd.testing.assert_frame_equal(cached, fresh, check_exact=True)
+
+
+if __name__ == "__main__":
+    main()
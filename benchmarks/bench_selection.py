@@ -0,0 +1,77 @@
+# Benchmark: callback latency vs. number of selected countries
+# Runs the callbacks that read selected-countries (global map, detailed ranking,
+# scatterplot, metric cards, mini map) with 10 to 200 selected countries and
+# reports the median time per call, to check latency stays flat as selections grow.
+# Run from the repository root: python benchmarks/bench_selection.py
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jbi100_app.callbacks.register_callbacks import register_callbacks
+from jbi100_app.data import entity_store, get_dataset
+
+register_callbacks()
+
+from jbi100_app.callbacks import (  # noqa: E402  (callbacks need the app registered)
+    detail_callbacks as dc,
+    metric_cards_callbacks as mcc,
+    mini_map_callbacks as mc,
+    ranking_callbacks as rc,
+)
+
+SIZES = [10, 50, 100, 150, 200]
+REPEATS = 5
+WEIGHTS = (20, 30, 10, 25, 15)
+TOGGLES = (["enabled"],) * 5
+
+
+def median_ms(fn, *args):
+    fn(*args)  # warm caches
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+# Clicked-country store: the first selected id
+def first(store):
+    return {**store, "ids": store["ids"][:1]}
+
+
+def main():
+    # Stores carry entity ids (frame rows) with their data version; pick among
+    # countries with an ISO3 code
+    ds = get_dataset()
+    ids = np.flatnonzero(ds.frame["iso3"].notna().to_numpy())
+    rng = np.random.default_rng(0)
+
+    cases = {
+        "global map": lambda sel: rc.update_global_map(
+            ["unemployment"], ["gdp_pc"], [], [], [], [], 60, 70, 50, 40, 65, 55, sel, 0),
+        "ranking": lambda sel: dc.update_detailed_ranking(
+            sel, first(sel), "Complex_Metrics", *WEIGHTS, *TOGGLES),
+        "scatterplot": lambda sel: dc.update_detailed_scatterplot(
+            sel, first(sel), None, 1, "ASF", "IEC", *WEIGHTS, *TOGGLES),
+        "metric cards": lambda sel: mcc.update_metric_cards(sel, None, 1, "ASF", first(sel)),
+        "mini map": lambda sel: mc.update_mini_map(sel, first(sel)),
+    }
+
+    print(f"{len(ids)} countries with an ISO3 code; median of {REPEATS} runs (ms)")
+    print(f"{'selected':>14}" + "".join(f"{n:>9}" for n in SIZES))
+    for name, fn in cases.items():
+        row = []
+        for n in SIZES:
+            sel = entity_store(rng.choice(ids, size=min(n, len(ids)), replace=False), ds)
+            row.append(median_ms(fn, sel))
+        print(f"{name:>14}" + "".join(f"{t:9.1f}" for t in row))
+
+
+if __name__ == "__main__":
+    main()
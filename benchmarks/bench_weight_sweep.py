@@ -0,0 +1,90 @@
+# Benchmark: batch weight sweep vs. one compute_complex_scores call per scenario
+# Scores and ranks K random weight/toggle scenarios with sweep_complex_scores on
+# the loaded dataset and on 260 synthetic countries (every country of the world,
+# each metric missing for a tenth of them). The per-scenario baseline (composite
+# score, then a sort for the ranks) is timed on 1,000 scenarios and scaled up.
+# Exits with status 1 when 100,000 scenarios take longer than SWEEP_TARGET_MS.
+# Run from the repository root: python benchmarks/bench_weight_sweep.py
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jbi100_app.data import get_dataset
+from jbi100_app.utils.complex_scores import SWEEP_KEYS, sweep_complex_scores
+from jbi100_app.utils.metric_matrix import MetricMatrix
+
+SIZES = [1_000, 10_000, 100_000]
+BASELINE_SCENARIOS = 1_000
+REPEATS = 3
+# 100,000 scenarios over all countries, on one core (ms)
+SWEEP_TARGET_MS = 1000
+
+
+# Stand-in for a Dataset with n countries: what the sweep reads from one
+def synthetic_dataset(n, rng):
+    names = np.array([f"COUNTRY {i:03d}" for i in range(n)], dtype=object)
+    metrics = {
+        key: pd.Series(rng.random(n), index=pd.Index(names)).sample(frac=0.9, random_state=j).sort_index()
+        for j, key in enumerate(SWEEP_KEYS)
+    }
+    frame = pd.DataFrame({"Country": names, "entity_level": "country"})
+    return SimpleNamespace(metric_matrix=MetricMatrix.from_series(metrics, names), frame=frame)
+
+
+def scenarios(k, rng):
+    weights = rng.integers(0, 101, (k, len(SWEEP_KEYS))).astype(float)
+    toggles = rng.random((k, len(SWEEP_KEYS))) < 0.8
+    return weights, toggles
+
+
+def per_scenario(ds, weights, toggles):
+    for w, t in zip(weights, toggles):
+        scores = ds.metric_matrix.composite({key: w[j] for j, key in enumerate(SWEEP_KEYS) if t[j]})
+        np.argsort(-scores["Complex_Score"].to_numpy(), kind="stable")
+
+
+def min_ms(fn):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    datasets = {
+        "dataset": get_dataset(),
+        "260 synthetic": synthetic_dataset(260, rng),
+    }
+
+    print(f"best of {REPEATS} runs (ms)")
+    print(f"{'':>14} {'scenarios':>10} {'entities':>9} {'per scenario':>13} {'sweep':>9} {'speedup':>8}")
+    failed = []
+    for label, ds in datasets.items():
+        weights, toggles = scenarios(BASELINE_SCENARIOS, rng)
+        per_call = min_ms(lambda: per_scenario(ds, weights, toggles)) / BASELINE_SCENARIOS
+        for k in SIZES:
+            weights, toggles = scenarios(k, rng)
+            sweep = sweep_complex_scores(weights, toggles, dataset=ds)
+            t_sweep = min_ms(lambda: sweep_complex_scores(weights, toggles, dataset=ds))
+            print(f"{label:>14} {k:10d} {len(sweep.names):9d} {per_call * k:13.0f} {t_sweep:9.1f} "
+                  f"{per_call * k / t_sweep:7.0f}x")
+            if k == 100_000 and t_sweep > SWEEP_TARGET_MS:
+                failed.append(label)
+
+    if failed:
+        print(f"100,000 scenarios over {SWEEP_TARGET_MS} ms: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,215 @@
 # Country selection callback - handles map clicks and selection state
-# Maintains a list of selected countries (up to 10)
-# Supports toggling selection on/off and clearing all selections
+# Maintains a list of selected countries (up to MAX_SELECTED_COUNTRIES)
+# Supports toggling selection on/off, adding from the search box, bulk adding
+# (pasted list, region, top N by score) and clearing all selections
+# The store holds sorted integer entity ids (rows of the dataset's IndicatorMatrix)
+# with the data version they belong to (data.entity_store)
 
+import re
+
+import numpy as np
 from dash.dependencies import Input, Output, State
 from dash import callback_context
+from dash.exceptions import PreventUpdate
 
 from jbi100_app.app_instance import app
+from jbi100_app.callbacks.ranking_callbacks import top_countries
+from jbi100_app.data import REGION_LEVELS, entity_store, get_dataset, store_ids
+from jbi100_app.utils.country_meta import resolve_iso3
+from jbi100_app.utils.country_search import CountrySearch
+
+# Upper bound on the selection; views summarise large selections (ranking window,
+# radar band) instead of drawing every country
+MAX_SELECTED_COUNTRIES = 200
+
+# Codes listed in the selection label before it switches to "and N more"
+LABEL_MAX_LISTED = 10
+
+# Typeahead suggestions shown per keystroke
+MAX_SEARCH_RESULTS = 10
+
+# Search index of the current data version (rebuilt when the version changes)
+_search_index = {}
+
+
+def _get_search_index(ds):
+    index = _search_index.get(ds.version)
+    if index is None:
+        index = CountrySearch.from_frame(ds.frame)
+        _search_index.clear()
+        _search_index[ds.version] = index
+    return index
+
+
+# Typeahead: ranked matches for what has been typed so far
+@app.callback(
+    Output("country-search", "options"),
+    Input("country-search", "search_value"),
+    prevent_initial_call=True,
+)
+def update_search_options(search_value):
+    if not search_value:
+        raise PreventUpdate
+    # "search" makes the dropdown show every server-side match (aliases and codes
+    # do not appear in the label it would otherwise filter on)
+    index = _get_search_index(get_dataset())
+    return [
+        {"label": f"{display} ({iso3})", "value": iso3, "search": search_value}
+        for iso3, display in index.search(search_value, MAX_SEARCH_RESULTS)
+    ]
 
-# Limit to 10 countries to keep visualizations readable
-MAX_SELECTED_COUNTRIES = 10
+
+# Valid, de-duplicated entity ids of a stored selection
+def _selected_ids(selected, ds):
+    return set(store_ids(selected, ds).tolist())
 
 
 @app.callback(
     Output("selected-countries", "data"),
+    Output("country-search", "value"),
     Input("globe-map", "clickData"),
     Input("clear-selected", "n_clicks"),
+    Input("country-search", "value"),
     State("selected-countries", "data"),
     prevent_initial_call=True,
 )
-def toggle_selected(clickData, clear_clicks, selected):
-    selected = selected or []
+def toggle_selected(clickData, clear_clicks, search_choice, selected):
+    ds = get_dataset()
 
     ctx = callback_context
     trigger = ctx.triggered_id
 
     # Only clear if the button was actually clicked
     if trigger == "clear-selected" and clear_clicks:
-        return []
+        return entity_store([], ds), None
+
+    # A search pick adds the country (never removes it) and resets the box; the
+    # option value is its ISO3 code, which stays valid across data reloads
+    if trigger == "country-search":
+        if search_choice is None:
+            raise PreventUpdate
+        s = _selected_ids(selected, ds)
+        entity = ds.matrix.id_of(search_choice)
+        if entity is not None and len(s) < MAX_SELECTED_COUNTRIES:
+            s.add(entity)
+        return entity_store(s, ds), None
 
     if trigger != "globe-map":
-        return selected
+        return selected, None
 
     if not clickData or "points" not in clickData or not clickData["points"]:
-        return selected
+        return selected, None
 
-    iso3 = clickData["points"][0].get("location")
-    if not iso3:
-        return selected
+    entity = ds.matrix.id_of(clickData["points"][0].get("location"))
+    if entity is None:
+        return selected, None
 
-    iso3 = iso3.upper().strip()
-    s = {x.upper().strip() for x in selected if x}
+    s = _selected_ids(selected, ds)
 
-    if iso3 in s:
-        s.remove(iso3)
+    if entity in s:
+        s.remove(entity)
     else:
         # Cap the number of selected countries to MAX_SELECTED_COUNTRIES
         if len(s) >= MAX_SELECTED_COUNTRIES:
-            return sorted(s)  # Don't add more if already at limit
-        s.add(iso3)
+            return entity_store(s, ds), None  # Don't add more if already at limit
+        s.add(entity)
+
+    return entity_store(s, ds), None
+
+
+# Pasted lists: one entry per line (or ";"/tab separated). A single line is split
+# on commas instead, unless that would break up a "KOREA, SOUTH"-style name.
+def _split_country_list(text):
+    text = (text or "").strip()
+    if not text:
+        return []
+    if re.search(r"[\n;\t]", text):
+        parts = re.split(r"[\n;\t]+", text)
+    elif resolve_iso3([text])[0] is None:
+        parts = text.split(",")
+    else:
+        parts = [text]
+    return [p.strip() for p in parts if p.strip()]
+
+
+# Bulk selection: resolve everything in one pass and write the store once, so the
+# map re-renders a single time instead of once per country
+@app.callback(
+    Output("selected-countries", "data", allow_duplicate=True),
+    Output("bulk-select-status", "children"),
+    Input("bulk-select-apply", "n_clicks"),
+    State("bulk-select-text", "value"),
+    State("bulk-select-region", "value"),
+    State("bulk-select-top-n", "value"),
+    State("selected-countries", "data"),
+    State("metric-checklist-unemployment", "value"),
+    State("metric-checklist-gdp", "value"),
+    State("metric-checklist-youth-unemp", "value"),
+    State("metric-checklist-pop-growth", "value"),
+    State("metric-checklist-elec-access", "value"),
+    State("metric-checklist-elec-capacity", "value"),
+    State("w-unemployment", "value"),
+    State("w-gdp_pc", "value"),
+    State("w-youth_unemp", "value"),
+    State("w-pop_growth", "value"),
+    State("w-elec_access", "value"),
+    State("w-elec_capacity", "value"),
+    prevent_initial_call=True,
+)
+def bulk_select(
+    n_clicks, text, region, top_n, selected,
+    unemp_sel, gdp_sel, youth_sel, pop_sel, access_sel, cap_sel,
+    w_unemp, w_gdp, w_youth, w_pop, w_access, w_cap,
+):
+    if not n_clicks:
+        raise PreventUpdate
+
+    ds = get_dataset()
+
+    entries = _split_country_list(text)
+    resolved = [ds.matrix.id_of(code) if code else None for code in resolve_iso3(entries)]
+    candidates = [i for i in resolved if i is not None]
+    unresolved = [e for e, i in zip(entries, resolved) if i is None]
+
+    # Region values are "<level>|<name>"; anything else is reported, not looked up
+    if region:
+        level, _, name = region.partition("|")
+        if level in REGION_LEVELS:
+            in_region = (ds.frame[level] == name).to_numpy() & ds.frame["iso3"].notna().to_numpy()
+            candidates += np.flatnonzero(in_region).tolist()
+        else:
+            unresolved.append(region)
+
+    if top_n:
+        keys = (unemp_sel or []) + (gdp_sel or []) + (youth_sel or []) + (pop_sel or []) \
+            + (access_sel or []) + (cap_sel or [])
+        weights = {
+            "unemployment": w_unemp or 0,
+            "gdp_pc": w_gdp or 0,
+            "youth_unemp": w_youth or 0,
+            "pop_growth": w_pop or 0,
+            "elec_access": w_access or 0,
+            "elec_capacity": w_cap or 0,
+        }
+        candidates += ds.matrix.ids_of(top_countries(keys, weights, int(top_n), dataset=ds)).tolist()
+
+    s = _selected_ids(selected, ds)
+    before = len(s)
+    skipped = 0
+    for entity in dict.fromkeys(candidates):
+        if entity in s:
+            continue
+        if len(s) >= MAX_SELECTED_COUNTRIES:
+            skipped += 1
+            continue
+        s.add(entity)
 
-    return sorted(s)
+    status = [f"Added {len(s) - before}."]
+    if skipped:
+        status.append(f"{skipped} not added (max {MAX_SELECTED_COUNTRIES}).")
+    if unresolved:
+        status.append("Not recognized: " + ", ".join(unresolved))
+    return entity_store(s, ds), " ".join(status)
 
 
 @app.callback(
@@ -57,10 +217,15 @@ def toggle_selected(clickData, clear_clicks, selected):
     Input("selected-countries", "data"),
 )
 def label(selected):
-    selected = selected or []
+    ds = get_dataset()
+    matrix = ds.matrix
+    ids = store_ids(selected, ds)
+    selected = [matrix.iso3[i] or matrix.display[i] for i in ids]
     if not selected:
         return "None"
-    label_text = ", ".join(selected)
+    label_text = ", ".join(selected[:LABEL_MAX_LISTED])
+    if len(selected) > LABEL_MAX_LISTED:
+        label_text += f" and {len(selected) - LABEL_MAX_LISTED} more"
     if len(selected) >= MAX_SELECTED_COUNTRIES:
         label_text += f" (max {MAX_SELECTED_COUNTRIES})"
     return label_text
\ No newline at end of file
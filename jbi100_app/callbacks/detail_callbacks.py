@@ -6,6 +6,7 @@ Callbacks for the detailed view panels:
 - Detailed Info Panel (key statistics)
 """
 
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
@@ -14,30 +15,59 @@ from dash import html, dcc, callback_context
 
 from jbi100_app.app_instance import app
 from jbi100_app.data import (
-    get_data,
+    entity_store,
+    get_dataset,
+    get_columns,
+    level_mask,
+    store_ids,
+    store_mask,
     available_skilled_workforce,
     industrial_energy_capacity,
     supply_chain_connectivity_score,
     wage_sustainability_index,
     economic_resilience_score,
 )
-from jbi100_app.utils.country_meta import attach_country_meta
 from jbi100_app.views.detailed_view.scatterplot import Scatterplot
 from jbi100_app.utils.complex_scores import compute_complex_scores
 
+# Bar/hover wording per entity level
+LEVEL_NOUNS = {"country": "countries", "admin1": "regions"}
+
 # Color constants
 COLOR_DEFAULT = "#94a3b8"   # Gray for non-selected countries
 COLOR_SELECTED = "#f97316"  # Orange for selected countries
 COLOR_CLICKED = "#22c55e"   # Green for clicked/active country
 
+# Bars in the detailed ranking (highlighted countries plus context rows). Larger
+# selections are shown as a window of this many highlighted countries around the
+# clicked one, with the rest summarised in "... skipped" rows.
+RANKING_WINDOW = 15
+
+# Radar axes: label -> complex metric accessor
+RADAR_METRICS = [
+    ("Workforce", available_skilled_workforce),
+    ("Energy", industrial_energy_capacity),
+    ("Supply Chain", supply_chain_connectivity_score),
+    ("Wage Sust.", wage_sustainability_index),
+    ("Resilience", economic_resilience_score),
+]
+
 
 def _compute_complex_scores(
     w_asf, w_iec, w_scc, w_wsi, w_ers,
-    t_asf, t_iec, t_scc, t_wsi, t_ers
+    t_asf, t_iec, t_scc, t_wsi, t_ers,
+    dataset=None,
+    w_prx=0,
+    t_prx=False,
+    selected=None,
 ):
     return compute_complex_scores(
         w_asf, w_iec, w_scc, w_wsi, w_ers,
-        t_asf, t_iec, t_scc, t_wsi, t_ers
+        t_asf, t_iec, t_scc, t_wsi, t_ers,
+        dataset=dataset,
+        w_prx=w_prx,
+        t_prx=t_prx,
+        selected=selected,
     )
 
 
@@ -79,21 +109,34 @@ def _extract_country_iso3_from_click(clickData):
     Input("toggle-scc", "value"),
     Input("toggle-wsi", "value"),
     Input("toggle-ers", "value"),
+    Input("weight-prx", "value"),
+    Input("toggle-prx", "value"),
+    Input("entity-level", "value"),
 )
 def update_detailed_ranking(
     selected_countries, clicked_country, metric,
     w_asf, w_iec, w_scc, w_wsi, w_ers,
-    t_asf, t_iec, t_scc, t_wsi, t_ers
+    t_asf, t_iec, t_scc, t_wsi, t_ers,
+    w_prx=0, t_prx=None, level=None,
 ):
-    selected_countries = selected_countries or []
-
     t_asf = bool(t_asf)
     t_iec = bool(t_iec)
     t_scc = bool(t_scc)
     t_wsi = bool(t_wsi)
     t_ers = bool(t_ers)
 
-    df = attach_country_meta(get_data())
+    # Pin one dataset version for the whole callback
+    ds = get_dataset()
+    df = get_columns([] if metric == "Complex_Metrics" else [metric], dataset=ds)
+
+    # Selection as boolean masks over the entity ids (frame row = id); only the
+    # entities of the chosen level are ranked
+    level = level or "country"
+    noun = LEVEL_NOUNS.get(level, "countries")
+    df = df.assign(
+        _selected=store_mask(selected_countries, ds),
+        _clicked=store_mask(clicked_country, ds),
+    )[level_mask(level, ds)]
 
     if df.empty:
         fig = go.Figure()
@@ -106,15 +149,14 @@ def update_detailed_ranking(
         fig.update_layout(margin=dict(l=10, r=10, t=10, b=10))
         return fig
 
-    selected_set = {str(x).upper().strip() for x in selected_countries if x}
-
-    if clicked_country:
-        clicked_country = str(clicked_country).upper().strip()
-
     if metric == "Complex_Metrics":
         scores_df = _compute_complex_scores(
             w_asf, w_iec, w_scc, w_wsi, w_ers,
             t_asf, t_iec, t_scc, t_wsi, t_ers,
+            dataset=ds,
+            w_prx=w_prx,
+            t_prx=bool(t_prx),
+            selected=store_ids(selected_countries, ds).tolist(),
         )
         df = df.merge(scores_df[["Country", "Complex_Score"]], on="Country", how="left")
         metric_col = "Complex_Score"
@@ -139,26 +181,21 @@ def update_detailed_ranking(
     df_all = df_all.sort_values(by=metric_col, ascending=False).reset_index(drop=True)
     df_all["rank"] = range(1, len(df_all) + 1)
 
-    highlighted_indices = set()
-
-    for idx, row in df_all.iterrows():
-        country_upper = str(row["Country"]).upper()
-        iso3_upper = str(row.get("iso3", "")).upper() if pd.notna(row.get("iso3")) else ""
-        if country_upper in selected_set or iso3_upper in selected_set:
-            highlighted_indices.add(idx)
-
-    if clicked_country:
-        for idx, row in df_all.iterrows():
-            country_upper = str(row["Country"]).upper()
-            iso3_upper = str(row.get("iso3", "")).upper() if pd.notna(row.get("iso3")) else ""
-            if country_upper == clicked_country or iso3_upper == clicked_country:
-                highlighted_indices.add(idx)
-                break
+    is_selected_row = df_all["_selected"].to_numpy()
+    is_clicked_row = df_all["_clicked"].to_numpy()
+    highlighted_indices = set(np.flatnonzero(is_selected_row | is_clicked_row).tolist())
 
-    target_count = 15
+    target_count = RANKING_WINDOW
 
     if not highlighted_indices:
         indices_to_show = list(range(min(target_count, len(df_all))))
+    elif len(highlighted_indices) > target_count:
+        # Window of highlighted rows, centred on the clicked country if any
+        sorted_highlighted = sorted(highlighted_indices)
+        clicked_rows = np.flatnonzero(is_clicked_row).tolist()
+        center = sorted_highlighted.index(clicked_rows[0]) if clicked_rows else 0
+        start = min(max(center - target_count // 2, 0), len(sorted_highlighted) - target_count)
+        indices_to_show = sorted_highlighted[start:start + target_count]
     else:
         sorted_highlighted = sorted(highlighted_indices)
         indices_to_show = list(sorted_highlighted)
@@ -182,6 +219,8 @@ def update_detailed_ranking(
             indices_to_show = sorted(final_indices)
 
     skip_positions = []
+    if indices_to_show and indices_to_show[0] > 0:
+        skip_positions.append(0)
     for i in range(1, len(indices_to_show)):
         if indices_to_show[i] - indices_to_show[i - 1] > 1:
             skip_positions.append(i)
@@ -207,19 +246,18 @@ def update_detailed_ranking(
                 values_list.append(0)
                 colors_list.append("#e5e5e5")
                 customdata_list.append(["", "", ""])
-                hovertext_list.append(f"{skipped_count} countries not shown")
+                hovertext_list.append(f"{skipped_count} {noun} not shown")
 
         row = df_all.loc[idx]
         country = row["Country"]
-        country_upper = str(country).upper()
-        iso3_upper = str(row.get("iso3", "")).upper() if pd.notna(row.get("iso3")) else ""
 
         countries_list.append(country)
         values_list.append(row[metric_col])
-        customdata_list.append([country, row.get("iso3", ""), row.get("rank", "")])
+        iso3 = row.get("iso3", "")
+        customdata_list.append([country, iso3 if isinstance(iso3, str) else "", row.get("rank", "")])
 
-        is_clicked = clicked_country and (country_upper == clicked_country or iso3_upper == clicked_country)
-        is_selected = (country_upper in selected_set) or (iso3_upper in selected_set)
+        is_clicked = is_clicked_row[idx]
+        is_selected = is_selected_row[idx]
 
         if is_clicked:
             colors_list.append(COLOR_CLICKED)
@@ -246,7 +284,7 @@ def update_detailed_ranking(
             values_list.append(0)
             colors_list.append("#e5e5e5")
             customdata_list.append(["", "", ""])
-            hovertext_list.append(f"{skipped_count} more countries not shown")
+            hovertext_list.append(f"{skipped_count} more {noun} not shown")
 
     countries_list = countries_list[::-1]
     values_list = values_list[::-1]
@@ -271,7 +309,7 @@ def update_detailed_ranking(
     total_countries = len(df_all)
     num_actual_countries = len(indices_to_show)
     if num_actual_countries < total_countries:
-        title_text += f" ({num_actual_countries} of {total_countries} countries)"
+        title_text += f" ({num_actual_countries} of {total_countries} {noun})"
 
     fig.update_layout(
         margin=dict(l=5, r=10, t=30, b=25),
@@ -308,30 +346,39 @@ def update_detailed_ranking(
     Input("toggle-scc", "value"),
     Input("toggle-wsi", "value"),
     Input("toggle-ers", "value"),
+    Input("weight-prx", "value"),
+    Input("toggle-prx", "value"),
+    Input("entity-level", "value"),
 )
 def update_detailed_scatterplot(
-    selected_countries, clicked_country, brushed_iso3, brush_rev,
+    selected_countries, clicked_country, brushed_ids, brush_rev,
     x_axis, y_axis,
     w_asf, w_iec, w_scc, w_wsi, w_ers,
-    t_asf, t_iec, t_scc, t_wsi, t_ers
+    t_asf, t_iec, t_scc, t_wsi, t_ers,
+    w_prx=0, t_prx=None, level=None,
 ):
-    selected_countries = selected_countries or []
-    brushed_set = {str(x).upper().strip() for x in (brushed_iso3 or []) if x}
-    has_brush = len(brushed_set) > 0
-
     axis_labels = {
         "ASF": "Skilled Workforce",
         "IEC": "Energy Capacity",
         "SCC": "Supply Chain",
         "WSI": "Wage Sustainability",
         "ERS": "Economic Resilience",
+        "PRX": "Market Proximity",
     }
     x_label = axis_labels.get(x_axis, x_axis)
     y_label = axis_labels.get(y_axis, y_axis)
 
+    # Pin one dataset version for the whole callback
+    ds = get_dataset()
+    brushed_mask = store_mask(brushed_ids, ds)
+    has_brush = bool(brushed_mask.any())
     scores_df = _compute_complex_scores(
         w_asf, w_iec, w_scc, w_wsi, w_ers,
-        bool(t_asf), bool(t_iec), bool(t_scc), bool(t_wsi), bool(t_ers)
+        bool(t_asf), bool(t_iec), bool(t_scc), bool(t_wsi), bool(t_ers),
+        dataset=ds,
+        w_prx=w_prx,
+        t_prx=bool(t_prx),
+        selected=store_ids(selected_countries, ds).tolist(),
     )
 
     if scores_df.empty:
@@ -345,7 +392,14 @@ def update_detailed_scatterplot(
         fig.update_layout(margin=dict(l=20, r=20, t=0, b=20))
         return fig, ""
 
-    df = attach_country_meta(get_data())
+    # Selection, click and brush as masks over the entity ids (frame row = id),
+    # restricted to the chosen level
+    level = level or "country"
+    df = get_columns([], dataset=ds).assign(
+        _selected=store_mask(selected_countries, ds),
+        _clicked=store_mask(clicked_country, ds),
+        _brushed=brushed_mask,
+    )[level_mask(level, ds)]
     df_plot = df.merge(scores_df, on="Country", how="left")
 
     if x_axis not in df_plot.columns or y_axis not in df_plot.columns:
@@ -359,7 +413,9 @@ def update_detailed_scatterplot(
         fig.update_layout(margin=dict(l=20, r=20, t=0, b=20))
         return fig, ""
 
-    df_plot = df_plot.dropna(subset=[x_axis, y_axis, "iso3"]).copy()
+    # Countries need an ISO3 code; admin-1 units have none
+    required = [x_axis, y_axis] + (["iso3"] if level == "country" else [])
+    df_plot = df_plot.dropna(subset=required).copy()
     if df_plot.empty:
         fig = go.Figure()
         fig.add_annotation(
@@ -371,23 +427,8 @@ def update_detailed_scatterplot(
         fig.update_layout(margin=dict(l=20, r=20, t=0, b=20))
         return fig, ""
 
-    selected_set = {str(x).upper().strip() for x in selected_countries if x}
-
-    active_iso3 = None
-    if clicked_country:
-        cc = str(clicked_country).upper().strip()
-        if (df_plot["iso3"].astype(str).str.upper() == cc).any():
-            active_iso3 = cc
-        else:
-            m = df_plot[df_plot["Country"].astype(str).str.upper() == cc]
-            if not m.empty:
-                active_iso3 = str(m.iloc[0]["iso3"]).upper().strip()
-
-    country_upper = df_plot["Country"].astype(str).str.upper()
-    iso_upper = df_plot["iso3"].astype(str).str.upper()
-
-    selected_country_names = set(df_plot.loc[country_upper.isin(selected_set), "Country"].astype(str))
-    selected_country_names |= set(df_plot.loc[iso_upper.isin(selected_set), "Country"].astype(str))
+    is_selected = df_plot["_selected"].to_numpy()
+    selected_country_names = set(df_plot.loc[is_selected, "Country"].astype(str))
 
     if x_axis == y_axis:
         base_df = df_plot[["Country", x_axis, "iso3"]].copy()
@@ -398,46 +439,27 @@ def update_detailed_scatterplot(
     sp = Scatterplot("Detailed Scatterplot", x_axis, y_axis, base_df)
     fig = sp._build_figure(selected_country_names)
 
-    countries = base_df["Country"].astype(str).tolist()
-    iso3s = base_df["iso3"].astype(str).str.upper().tolist()
-
-    marker_colors = []
-    marker_sizes = []
-    marker_opacities = []
-    marker_line_widths = []
+    countries = base_df["Country"].astype(str).to_numpy()
+    iso3s = base_df["iso3"].fillna("").astype(str).to_numpy()
 
-    for c, iso in zip(countries, iso3s):
-        is_clicked = (active_iso3 == iso) if active_iso3 else False
-        is_selected = (c.upper() in selected_set) or (iso in selected_set)
-        is_brushed = iso in brushed_set
+    # Marker styles for every point at once: clicked > selected > brushed > default
+    conditions = [df_plot["_clicked"].to_numpy(), is_selected, df_plot["_brushed"].to_numpy()]
 
-        if is_clicked:
-            marker_colors.append(COLOR_CLICKED)
-            marker_sizes.append(14)
-            marker_opacities.append(1.0)
-            marker_line_widths.append(2)
-        elif is_selected:
-            marker_colors.append(COLOR_SELECTED)
-            marker_sizes.append(11)
-            marker_opacities.append(0.9)
-            marker_line_widths.append(1)
-        elif is_brushed:
-            marker_colors.append(COLOR_DEFAULT)
-            marker_sizes.append(10)
-            marker_opacities.append(0.9)
-            marker_line_widths.append(1)
-        else:
-            marker_colors.append(COLOR_DEFAULT)
-            marker_sizes.append(7)
-            marker_opacities.append(0.15 if has_brush else 0.5)
-            marker_line_widths.append(0)
+    # Colours as codes over a three-colour scale (plotly validates numbers in one pass)
+    marker_colors = np.select(conditions, [2, 1, 0], 0)
+    marker_sizes = np.select(conditions, [14, 11, 10], 7)
+    marker_opacities = np.select(conditions, [1.0, 0.9, 0.9], 0.15 if has_brush else 0.5)
+    marker_line_widths = np.select(conditions, [2, 1, 1], 0)
 
     if fig.data:
-        fig.data[0].customdata = list(zip(countries, iso3s))
+        fig.data[0].customdata = np.column_stack([countries, iso3s])
         fig.data[0].marker = dict(
             size=marker_sizes,
             opacity=marker_opacities,
             color=marker_colors,
+            colorscale=[[0, COLOR_DEFAULT], [0.5, COLOR_SELECTED], [1, COLOR_CLICKED]],
+            cmin=0,
+            cmax=2,
             line=dict(width=marker_line_widths, color="#1f2937"),
         )
         fig.data[0].hovertemplate = (
@@ -514,17 +536,21 @@ def update_detailed_info(ranking_click, scatter_click, selected_countries):
         )
 
     try:
-        df = get_data()
+        ds = get_dataset()
+        df = ds.frame
     except Exception:
         return html.Div("Data unavailable", className="detailed-info-placeholder")
 
-    sel = df[df["Country"].astype(str).str.upper() == str(country_name).upper()]
-    if sel.empty:
+    entity = ds.matrix.id_of(country_name)
+    if entity is None:
         return html.Div(f"Country '{country_name}' not found.", className="detailed-info-placeholder")
 
-    row = sel.iloc[0]
+    row = df.iloc[entity]
     country_display = row["Country"]
 
+    # Ranks and averages are taken among entities of the same level
+    peers = level_mask(row["entity_level"], ds)
+
     key_metrics = [
         ("Total_Population", "Population", "{:,.0f}"),
         ("Real_GDP_per_Capita_USD", "GDP/Capita", "${:,.0f}"),
@@ -545,7 +571,7 @@ def update_detailed_info(ranking_click, scatter_click, selected_countries):
                 except Exception:
                     formatted_val = str(val)
 
-                non_null = df[col].dropna()
+                non_null = df.loc[peers, col].dropna()
                 rank_info = ""
                 if not non_null.empty:
                     if "Unemployment" in col:
@@ -571,41 +597,30 @@ def update_detailed_info(ranking_click, scatter_click, selected_countries):
                 )
 
     metrics_data = []
-
-    try:
-        asf = available_skilled_workforce()
-        if country_display in asf.index:
-            metrics_data.append(("Workforce", asf[country_display], asf.mean()))
-    except Exception:
-        pass
-
-    try:
-        iec = industrial_energy_capacity()
-        if country_display in iec.index:
-            metrics_data.append(("Energy", iec[country_display], iec.mean()))
-    except Exception:
-        pass
-
-    try:
-        scc = supply_chain_connectivity_score()
-        if country_display in scc.index:
-            metrics_data.append(("Supply Chain", scc[country_display], scc.mean()))
-    except Exception:
-        pass
-
-    try:
-        wsi = wage_sustainability_index()
-        if country_display in wsi.index:
-            metrics_data.append(("Wage Sust.", wsi[country_display], wsi.mean()))
-    except Exception:
-        pass
-
-    try:
-        ers = economic_resilience_score()
-        if country_display in ers.index:
-            metrics_data.append(("Resilience", ers[country_display], ers.mean()))
-    except Exception:
-        pass
+    metric_series = []
+
+    for metric_label, accessor in RADAR_METRICS:
+        try:
+            series = accessor(ds)
+        except Exception:
+            continue
+        if country_display in series.index:
+            peer_values = series[series.index.isin(ds.matrix.names[peers])]
+            metrics_data.append((metric_label, series[country_display], peer_values.mean()))
+            metric_series.append(series)
+
+    # Selected countries as one aggregate band (min-max) plus their median, so the
+    # radar stays readable however many countries are selected
+    selected_names = ds.matrix.names[store_ids(selected_countries, ds)]
+    band = None
+    if len(selected_names) >= 2 and metric_series:
+        sel_values = pd.DataFrame([s.reindex(selected_names).to_numpy() for s in metric_series])
+        if sel_values.notna().any(axis=1).all():
+            band = (
+                sel_values.min(axis=1).tolist(),
+                sel_values.max(axis=1).tolist(),
+                sel_values.median(axis=1).tolist(),
+            )
 
     radar_element = html.Div("No complex metrics available", className="radar-placeholder")
 
@@ -630,6 +645,37 @@ def update_detailed_info(ranking_click, scatter_click, selected_countries):
                 hovertemplate="%{theta}: %{r:.3f}<extra>Global Avg</extra>",
             )
         )
+        if band is not None:
+            band_lo, band_hi, band_med = band
+            radar_fig.add_trace(
+                go.Scatterpolar(
+                    r=band_lo + [band_lo[0]],
+                    theta=labels_closed,
+                    line=dict(color="rgba(249, 115, 22, 0.4)", width=0.5),
+                    showlegend=False,
+                    hoverinfo="skip",
+                )
+            )
+            radar_fig.add_trace(
+                go.Scatterpolar(
+                    r=band_hi + [band_hi[0]],
+                    theta=labels_closed,
+                    name=f"Selected ({len(selected_names)})",
+                    fill="tonext",
+                    fillcolor="rgba(249, 115, 22, 0.15)",
+                    line=dict(color="rgba(249, 115, 22, 0.4)", width=0.5),
+                    hoverinfo="skip",
+                )
+            )
+            radar_fig.add_trace(
+                go.Scatterpolar(
+                    r=band_med + [band_med[0]],
+                    theta=labels_closed,
+                    name="Selected median",
+                    line=dict(color=COLOR_SELECTED, width=1.5, dash="dash"),
+                    hovertemplate="%{theta}: %{r:.3f}<extra>Selected median</extra>",
+                )
+            )
         radar_fig.add_trace(
             go.Scatterpolar(
                 r=country_closed,
@@ -745,6 +791,7 @@ def update_selected_indicator(ranking_click, scatter_click):
 
 
 # ===== TRACK CLICKED COUNTRY =====
+# Stored as the clicked country's entity id in an entity store (None when nothing is clicked)
 @app.callback(
     Output("selected_country", "data"),
     Input("detailed-ranking-bar", "clickData"),
@@ -758,9 +805,13 @@ def update_selected_country(ranking_click, scatter_click):
         trigger_id = ctx.triggered[0]["prop_id"].split(".")[0]
         if trigger_id == "detailed-scatterplot" and scatter_click:
             country_name, iso3 = _extract_country_iso3_from_click(scatter_click)
-            clicked_country = (iso3 or country_name or "").upper().strip()
+            clicked_country = iso3 or country_name
         elif trigger_id == "detailed-ranking-bar" and ranking_click:
             country_name, iso3 = _extract_country_iso3_from_click(ranking_click)
-            clicked_country = (iso3 or country_name or "").upper().strip()
+            clicked_country = iso3 or country_name
 
-    return clicked_country
+    if not clicked_country:
+        return None
+    ds = get_dataset()
+    entity = ds.matrix.id_of(clicked_country)
+    return entity_store([entity], ds) if entity is not None else None
@@ -2,6 +2,8 @@
 # Features: histogram + rug plot for each of 5 complex metrics (ASF, IEC, SCC, WSI, ERS)
 # Supports: brushing/selection on rug plots, expand/collapse individual cards,
 # linked highlighting across cards and scatterplot
+# Selection, brush and clicked country arrive as entity ids and are applied as
+# boolean masks indexed by each row's id
 
 from __future__ import annotations
 
@@ -13,8 +15,7 @@ from dash.dependencies import Input, Output, State
 from dash import callback_context
 
 from jbi100_app.app_instance import app
-from jbi100_app.data import get_data
-from jbi100_app.utils.country_meta import attach_country_meta
+from jbi100_app.data import entity_store, get_columns, get_dataset, level_mask, store_mask
 
 # Reuse complex score computation from shared utility
 from jbi100_app.utils.complex_scores import compute_complex_scores
@@ -22,20 +23,30 @@ from jbi100_app.utils.complex_scores import compute_complex_scores
 # Five complex metrics displayed in cards
 METRIC_KEYS = ["ASF", "IEC", "SCC", "WSI", "ERS"]
 
-# Build dataset with all 5 metrics for visualization
-def _build_all_metrics_df() -> pd.DataFrame:
+# Build dataset with all 5 metrics for visualization, for the entities of one level
+# (countries need an ISO3 code; admin-1 units have none and get iso3 "")
+def _build_all_metrics_df(dataset, level: str = "country") -> pd.DataFrame:
     scores_df = compute_complex_scores(
         1, 1, 1, 1, 1,   # dummy equal weights
-        True, True, True, True, True
+        True, True, True, True, True,
+        dataset=dataset,
     )
 
-    base = attach_country_meta(get_data()).copy()
-    base = base.dropna(subset=["iso3"]).copy()
+    base = get_columns([], dataset=dataset)[level_mask(level, dataset)].copy()
+    if level == "country":
+        base = base.dropna(subset=["iso3"]).copy()
+    base["iso3"] = base["iso3"].fillna("")
     base["Country"] = base["Country"].astype(str)
-    base["iso3"] = base["iso3"].astype(str).str.upper().str.strip()
 
-    out = base[["Country", "iso3"]].drop_duplicates().merge(scores_df, on="Country", how="inner")
+    # Frame rows are entity ids; keep them as a column through the merge
+    ids = base[["Country", "iso3"]].drop_duplicates()
+    ids = ids.assign(id=ids.index.to_numpy())
+    out = ids.merge(scores_df, on="Country", how="inner")
     out = out.dropna(subset=METRIC_KEYS).copy()
+
+    # Rug jitter seed per row, hashed once here rather than per card and trace
+    codes = out["iso3"].to_numpy()
+    out["jitter"] = _jitter_seed(np.where(codes != "", codes, out["Country"].to_numpy()))
     return out
 
 
@@ -61,31 +72,36 @@ def _empty_fig(message: str) -> go.Figure:
     return fig
 
 
-def _stable_jitter_from_codes(codes: np.ndarray, scale: float) -> np.ndarray:
-    h = np.array([(abs(hash(str(c))) % 1000) / 1000.0 for c in codes], dtype=float)
+def _jitter_seed(codes: np.ndarray) -> np.ndarray:
+    return np.array([(abs(hash(str(c))) % 1000) / 1000.0 for c in codes], dtype=float)
+
+
+def _stable_jitter(h: np.ndarray, scale: float) -> np.ndarray:
     return (h - 0.5) * 2.0 * scale
 
 
 def _metric_card_fig(
     df_all: pd.DataFrame,
     metric_key: str,
-    selected_iso3: set[str],
-    brushed_iso3: set[str],
-    active_iso3: str | None,
+    selected_mask: np.ndarray,
+    brushed_mask: np.ndarray,
+    active_mask: np.ndarray,
     collapsed: bool = False,
     brush_rev: int = 0,
 ) -> go.Figure:
     if df_all.empty or metric_key not in df_all.columns:
         return _empty_fig("No data available.")
 
-    brushed_iso3 = {str(x).upper().strip() for x in (brushed_iso3 or set()) if x}
-    selected_iso3 = {str(x).upper().strip() for x in (selected_iso3 or set()) if x}
-    active_iso3 = (str(active_iso3).upper().strip() if active_iso3 else None)
-
     x_all = df_all[metric_key].to_numpy(dtype=float)
     iso_all = df_all["iso3"].to_numpy()
     country_all = df_all["Country"].to_numpy()
 
+    # Entity-id masks -> masks over these rows (integer fancy-indexing)
+    id_all = df_all["id"].to_numpy()
+    sel_mask = selected_mask[id_all]
+    brushed_mask_all = brushed_mask[id_all]
+    active_mask_all = active_mask[id_all]
+
     # Histogram bins over [0,1]
     bins = np.linspace(0, 1, 21)  # 20 bins
     counts, edges = np.histogram(x_all, bins=bins)
@@ -108,8 +124,7 @@ def _metric_card_fig(
     )
 
     # Highlight bins containing selected countries
-    if selected_iso3:
-        sel_mask = np.isin(iso_all, list(selected_iso3))
+    if sel_mask.any():
         x_sel_for_bins = x_all[sel_mask]
         if x_sel_for_bins.size > 0:
             idx = np.digitize(x_sel_for_bins, bins) - 1
@@ -129,23 +144,21 @@ def _metric_card_fig(
             )
 
     # Highlight bin containing ACTIVE (clicked) country (green)
-    if active_iso3:
-        act_row = df_all[df_all["iso3"] == active_iso3]
-        if not act_row.empty:
-            x_act = float(act_row.iloc[0][metric_key])
-            act_idx = np.digitize([x_act], bins) - 1
-            act_idx = int(np.clip(act_idx[0], 0, len(centers) - 1))
-
-            fig.add_trace(
-                go.Bar(
-                    x=[centers[act_idx]],
-                    y=[counts[act_idx]],
-                    width=bin_w,
-                    marker=dict(color="rgba(34,197,94,0.45)"),
-                    hoverinfo="skip",
-                    name="Active bin",
-                )
+    if active_mask_all.any():
+        x_act = float(x_all[active_mask_all][0])
+        act_idx = np.digitize([x_act], bins) - 1
+        act_idx = int(np.clip(act_idx[0], 0, len(centers) - 1))
+
+        fig.add_trace(
+            go.Bar(
+                x=[centers[act_idx]],
+                y=[counts[act_idx]],
+                width=bin_w,
+                marker=dict(color="rgba(34,197,94,0.45)"),
+                hoverinfo="skip",
+                name="Active bin",
             )
+        )
 
     # Median line
     global_median = float(np.nanmedian(x_all))
@@ -184,22 +197,19 @@ def _metric_card_fig(
         return fig
 
     # Expanded: add rug + brushing visuals
-    x_jit_all = _stable_jitter_from_codes(iso_all, scale=0.006)
-    y_all = _stable_jitter_from_codes(iso_all, scale=0.30)
+    h_all = df_all["jitter"].to_numpy()
+    x_jit_all = _stable_jitter(h_all, scale=0.006)
+    y_all = _stable_jitter(h_all, scale=0.30)
 
-    sel_mask = np.isin(iso_all, list(selected_iso3))
     x_sel_raw = x_all[sel_mask]
     iso_sel = iso_all[sel_mask]
     country_sel = country_all[sel_mask]
-    x_jit_sel = _stable_jitter_from_codes(iso_sel, scale=0.004)
-    y_sel = _stable_jitter_from_codes(iso_sel, scale=0.22)
+    x_jit_sel = _stable_jitter(h_all[sel_mask], scale=0.004)
+    y_sel = _stable_jitter(h_all[sel_mask], scale=0.22)
 
-    has_brush = len(brushed_iso3) > 0
-    brushed_mask_all = np.isin(iso_all, list(brushed_iso3))
-    brushed_mask_sel = np.isin(iso_sel, list(brushed_iso3))
-
-    active_mask_all = (iso_all == active_iso3) if active_iso3 else np.zeros(len(iso_all), dtype=bool)
-    active_mask_sel = (iso_sel == active_iso3) if active_iso3 else np.zeros(len(iso_sel), dtype=bool)
+    has_brush = bool(brushed_mask.any())
+    brushed_mask_sel = brushed_mask_all[sel_mask]
+    active_mask_sel = active_mask_all[sel_mask]
 
     base_op_all = np.where(brushed_mask_all, 0.85, 0.25 if has_brush else 0.25)
     base_sz_all = np.where(brushed_mask_all, 9, 6)
@@ -209,13 +219,12 @@ def _metric_card_fig(
     base_sz_sel = np.where(brushed_mask_sel, 12, 9)
     base_lw_sel = np.where(brushed_mask_sel, 3.0, 1.0)
 
-    colors_all = np.array(["rgba(100,116,139,0.55)"] * len(iso_all), dtype=object)
-    colors_sel = np.array(["#fb923c"] * len(iso_sel), dtype=object)
-
-    if active_iso3:
-        colors_all[active_mask_all] = "#22c55e"
-        colors_sel[active_mask_sel] = "#22c55e"
+    # Point colours as 0/1 (active) over a two-colour scale: plotly validates a
+    # numeric array in one pass instead of every colour string
+    colors_all = active_mask_all.astype(float)
+    colors_sel = active_mask_sel.astype(float)
 
+    if active_mask_all.any():
         base_op_all[active_mask_all] = 0.5
         base_sz_all[active_mask_all] = 12
         base_lw_all[active_mask_all] = 1
@@ -238,6 +247,9 @@ def _metric_card_fig(
             ),
             marker=dict(
                 color=colors_all,
+                colorscale=[[0, "rgba(100,116,139,0.55)"], [1, "#22c55e"]],
+                cmin=0,
+                cmax=1,
                 size=base_sz_all,
                 opacity=base_op_all,
                 line=dict(color="rgba(0,0,0,0.45)", width=base_lw_all),
@@ -261,6 +273,9 @@ def _metric_card_fig(
             ),
             marker=dict(
                 color=colors_sel,
+                colorscale=[[0, "#fb923c"], [1, "#22c55e"]],
+                cmin=0,
+                cmax=1,
                 size=base_sz_sel,
                 opacity=base_op_sel,
                 line=dict(color="rgba(0,0,0,0.75)", width=base_lw_sel),
@@ -323,22 +338,16 @@ def bump_brush_revision(_brush, rev):
     Input("metric-brush-rev", "data"),
     Input("expanded-metric", "data"),
     Input("selected_country", "data"),
+    Input("entity-level", "value"),
 )
-def update_metric_cards(selected_countries, brushed, brush_rev, expanded_metric, clicked_country):
-    df_all = _build_all_metrics_df()
-
-    selected_set = {str(x).upper().strip() for x in (selected_countries or []) if x}
-    brushed_set = {str(x).upper().strip() for x in (brushed or []) if x}
-
-    active_iso3 = None
-    if clicked_country:
-        cc = str(clicked_country).upper().strip()
-        if "iso3" in df_all.columns and (df_all["iso3"] == cc).any():
-            active_iso3 = cc
-        else:
-            m = df_all[df_all["Country"].astype(str).str.upper() == cc]
-            if not m.empty:
-                active_iso3 = str(m.iloc[0]["iso3"]).upper().strip()
+def update_metric_cards(selected_countries, brushed, brush_rev, expanded_metric, clicked_country, level=None):
+    # Pin one dataset version for the whole callback
+    ds = get_dataset()
+    df_all = _build_all_metrics_df(ds, level or "country")
+
+    selected_mask = store_mask(selected_countries, ds)
+    brushed_mask = store_mask(brushed, ds)
+    active_mask = store_mask(clicked_country, ds)
 
     expanded_metric = (expanded_metric or "").strip().upper()
 
@@ -348,11 +357,11 @@ def update_metric_cards(selected_countries, brushed, brush_rev, expanded_metric,
     brush_rev = int(brush_rev or 0)
 
     return (
-        _metric_card_fig(df_all, "ASF", selected_set, brushed_set, active_iso3, collapsed=is_collapsed("ASF"), brush_rev=brush_rev),
-        _metric_card_fig(df_all, "IEC", selected_set, brushed_set, active_iso3, collapsed=is_collapsed("IEC"), brush_rev=brush_rev),
-        _metric_card_fig(df_all, "SCC", selected_set, brushed_set, active_iso3, collapsed=is_collapsed("SCC"), brush_rev=brush_rev),
-        _metric_card_fig(df_all, "WSI", selected_set, brushed_set, active_iso3, collapsed=is_collapsed("WSI"), brush_rev=brush_rev),
-        _metric_card_fig(df_all, "ERS", selected_set, brushed_set, active_iso3, collapsed=is_collapsed("ERS"), brush_rev=brush_rev),
+        _metric_card_fig(df_all, "ASF", selected_mask, brushed_mask, active_mask, collapsed=is_collapsed("ASF"), brush_rev=brush_rev),
+        _metric_card_fig(df_all, "IEC", selected_mask, brushed_mask, active_mask, collapsed=is_collapsed("IEC"), brush_rev=brush_rev),
+        _metric_card_fig(df_all, "SCC", selected_mask, brushed_mask, active_mask, collapsed=is_collapsed("SCC"), brush_rev=brush_rev),
+        _metric_card_fig(df_all, "WSI", selected_mask, brushed_mask, active_mask, collapsed=is_collapsed("WSI"), brush_rev=brush_rev),
+        _metric_card_fig(df_all, "ERS", selected_mask, brushed_mask, active_mask, collapsed=is_collapsed("ERS"), brush_rev=brush_rev),
     )
 
 
@@ -375,22 +384,22 @@ def store_metric_brush(
     sel_scatter, scatter_relayout, clear_clicks, current_brush
 ):
     """
-    Stores the brushed ISO3s from *rug/scatter point* selection.
+    Stores the entity ids (as an entity store) brushed by *rug/scatter point* selection.
 
     Rules:
     - Histogram bar-only selections produce selectedData with no [Country, ISO3] customdata: keep current brush.
-    - Clear button resets brush to [].
-    - Double-click reset in scatterplot (relayoutData autorange) resets brush to [].
+    - Clear button resets brush to no ids.
+    - Double-click reset in scatterplot (relayoutData autorange) resets brush to no ids.
     """
     trig = callback_context.triggered_id
-    current_brush = current_brush or []
+    ds = get_dataset()
 
     if trig == "metric-brush-clear" and clear_clicks:
-        return []
+        return entity_store([], ds)
 
     if trig == "detailed-scatterplot" and isinstance(scatter_relayout, dict):
         if scatter_relayout.get("xaxis.autorange") or scatter_relayout.get("yaxis.autorange"):
-            return []
+            return entity_store([], ds)
 
     selectedData = None
     if trig == "metric-card-asf":
@@ -409,14 +418,15 @@ def store_metric_brush(
     if not selectedData or "points" not in selectedData:
         return current_brush
 
-    iso3s: list[str] = []
+    # ISO3 code, or the name for admin-1 units (which have no code)
+    keys: list[str] = []
     for p in selectedData["points"]:
         cd = p.get("customdata")
         if isinstance(cd, (list, tuple)) and len(cd) >= 2:
-            iso3s.append(str(cd[1]).upper().strip())
+            keys.append(cd[1] or cd[0])
 
-    iso3s = [x for x in iso3s if x]
-    if not iso3s:
+    ids = ds.matrix.ids_of(keys)
+    if ids.size == 0:
         return current_brush
 
-    return sorted(set(iso3s))
+    return entity_store(ids, ds)
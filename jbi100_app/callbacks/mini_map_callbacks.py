@@ -1,6 +1,7 @@
 # Mini-map callback - shows zoomed-in view of selected countries in detailed view
 # Highlights selected countries (orange) and currently clicked country (green)
 # Read-only map - no interaction, just visualization of current state
+# Admin-1 units are shown as their parent country
 
 from dash.dependencies import Input
 from dash import Output
@@ -8,8 +9,7 @@ import plotly.graph_objects as go
 import pandas as pd
 
 from jbi100_app.app_instance import app
-from jbi100_app.data import get_data
-from jbi100_app.utils.country_meta import attach_country_meta
+from jbi100_app.data import get_columns, get_dataset, store_mask
 
 
 @app.callback(
@@ -19,26 +19,19 @@ from jbi100_app.utils.country_meta import attach_country_meta
 )
 def update_mini_map(selected_countries, clicked_country):
     """Display a read-only map highlighting selected countries (orange) and clicked country (green)."""
-    selected_countries = selected_countries or []
-    selected_set = {str(x).upper().strip() for x in selected_countries if x}
-    
     # Get data with country metadata (iso3 codes)
-    df = attach_country_meta(get_data()).dropna(subset=["iso3"]).copy()
-    
-    # Convert clicked country name to ISO3 code
-    clicked_iso3 = None
-    if clicked_country:
-        clicked_country_upper = str(clicked_country).upper().strip()
-        # Try to find matching country by name or iso3
-        match = df[
-            (df["Country"].str.upper() == clicked_country_upper) | 
-            (df["iso3"].str.upper() == clicked_country_upper)
-        ]
-        if not match.empty:
-            clicked_iso3 = match.iloc[0]["iso3"]
-            # Remove from selected set to avoid double-rendering
-            selected_set.discard(clicked_country_upper)
-            selected_set.discard(clicked_iso3)
+    ds = get_dataset()
+    df = get_columns([], dataset=ds).dropna(subset=["iso3"]).copy()
+
+    # Stores hold entity ids; the map needs ISO3 codes (the parent's for admin-1)
+    codes = ds.frame["iso3"].fillna(ds.frame["parent_iso3"]).fillna("").to_numpy()
+    selected_mask = store_mask(selected_countries, ds)
+    clicked_mask = store_mask(clicked_country, ds)
+    clicked_codes = codes[clicked_mask]
+    clicked_iso3 = clicked_codes[0] if clicked_codes.size and clicked_codes[0] else None
+    selected_set = {code for code in codes[selected_mask] if code}
+    # Leave the clicked country out of the selected layer to avoid double-rendering
+    selected_set.discard(clicked_iso3)
     
     # Create base figure with all countries in light gray
     fig = go.Figure()
@@ -10,8 +10,8 @@ import plotly.graph_objects as go
 from dash.dependencies import Input, Output
 
 from jbi100_app.app_instance import app
-from jbi100_app.data import get_data
-from jbi100_app.utils.country_meta import attach_country_meta
+from jbi100_app.data import get_columns, get_dataset, store_mask
+from jbi100_app.utils.normalize import normalize_columns
 
 # Available metrics for ranking - each has display label, data column, and optimization direction
 METRICS = {
@@ -24,16 +24,6 @@ METRICS = {
 }
 
 
-# Normalize metric to 0-1 range, optionally inverting if lower is better (e.g., unemployment)
-def _minmax(series: pd.Series, higher_is_better: bool) -> pd.Series:
-    s = pd.to_numeric(series, errors="coerce")
-    mn, mx = s.min(), s.max()
-    if pd.isna(mn) or pd.isna(mx) or mn == mx:
-        return pd.Series(np.nan, index=s.index)
-    norm = (s - mn) / (mx - mn)
-    return norm if higher_is_better else (1 - norm)
-
-
 # Calculate weighted composite score from selected metrics
 # Returns: (DataFrame with scores, error_message) or (None, error_message)
 def compute_scores(df: pd.DataFrame, selected_keys: list[str], weights: dict[str, float]):
@@ -46,22 +36,38 @@ def compute_scores(df: pd.DataFrame, selected_keys: list[str], weights: dict[str
     if kept == 0:
         return None, "No countries have complete data for the selected metrics."
 
-    for k in selected_keys:
-        c = METRICS[k]["col"]
-        work[c + "__norm"] = _minmax(work[c], METRICS[k]["higher_is_better"])
+    # Min-max scale every metric to 0-1 in one pass, inverting those where lower is
+    # better (e.g., unemployment); a metric without spread scores NaN
+    norm = normalize_columns(
+        work[cols].to_numpy(dtype=float), None,
+        [METRICS[k]["higher_is_better"] for k in selected_keys], log=False, constant=np.nan,
+    )
 
     w = np.array([max(0.0, float(weights.get(k, 0.0))) for k in selected_keys], dtype=float)
     if w.sum() == 0:
         w = np.ones(len(selected_keys), dtype=float)
     w = w / w.sum()
 
-    norm_cols = [METRICS[k]["col"] + "__norm" for k in selected_keys]
-    work["score"] = (work[norm_cols].values * w).sum(axis=1)
+    work["score"] = (norm * w).sum(axis=1)
 
     note = f"{kept}/{total} countries included ({total-kept} excluded due to missing data)."
     return work[["Country", "iso3", "score"] + cols], note
 
 
+# ISO3 codes of the n best-scoring countries for the given metrics and weights
+# (same score as the map); empty when no metric is selected
+# dataset: the caller's pinned dataset (None = the current one)
+def top_countries(selected_keys: list[str], weights: dict[str, float], n: int, dataset=None) -> list[str]:
+    if not selected_keys or n <= 0:
+        return []
+    cols = [METRICS[k]["col"] for k in selected_keys]
+    df = get_columns(cols, dataset=dataset).dropna(subset=["iso3"])
+    scored, _ = compute_scores(df, selected_keys, weights)
+    if scored is None:
+        return []
+    return scored.nlargest(n, "score")["iso3"].astype(str).str.upper().tolist()
+
+
 @app.callback(
     Output("globe-map", "figure"),
     Output("map-subtitle", "children"),
@@ -93,7 +99,10 @@ def update_global_map(
     cap_sel = cap_sel or []
     selected_metric_keys = unemp_sel + gdp_sel + youth_sel + pop_sel + access_sel + cap_sel
 
-    df = attach_country_meta(get_data()).dropna(subset=["iso3"]).copy()
+    metric_cols = [METRICS[k]["col"] for k in selected_metric_keys]
+    # Pin one dataset version; frame rows (and so df's index) are entity ids
+    ds = get_dataset()
+    df = get_columns(metric_cols, dataset=ds).dropna(subset=["iso3"]).copy()
 
     if not selected_metric_keys:
         fig = px.choropleth(
@@ -133,15 +142,9 @@ def update_global_map(
         )
         return fig, note
 
-    selected_set = {
-        str(x).strip().upper()
-        for x in (selected_countries or [])
-        if x
-    }
-    available = set(scored["iso3"].astype(str).str.upper())
-    selected_set &= available
-
-    metric_cols = [METRICS[k]["col"] for k in selected_metric_keys]
+    # Selected entity ids that have a score, as ISO3 codes for the overlay
+    selected_mask = store_mask(selected_countries, ds)
+    selected_set = set(scored["iso3"].to_numpy()[selected_mask[scored.index.to_numpy()]])
 
     fig = px.choropleth(
         scored,
@@ -3,205 +3,667 @@ Data loading and preprocessing module.
 Handles CSV imports, data cleaning, and metric calculations for the visualization.
 """
 
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
 from pathlib import Path
+import threading
 import pandas as pd
 import numpy as np
-from functools import reduce
+import warnings
+
+from jbi100_app.utils import frame_join, geo, snapshot, unit_parser
+from jbi100_app.utils.country_meta import REGION_COLUMNS, attach_admin1_meta, attach_country_meta
+from jbi100_app.utils.data_watcher import DataWatcher, stat_fingerprint
+from jbi100_app.utils.indicator_matrix import IndicatorMatrix
+from jbi100_app.utils.metric_graph import MetricGraph, Node
+from jbi100_app.utils.metric_matrix import MetricMatrix
+from jbi100_app.utils.normalize import normalize_columns
 
 # Standardized country column name used across all metrics
 COUNTRY_COL = 'Country'
 
-# Cached dataframe to avoid reloading from disk on every callback
-DATA_DF = None
+# Identity columns returned with every projection (see get_columns)
+ID_COLUMNS = [COUNTRY_COL, 'iso3']
+
+# Columns read from each source CSV (keyed by file stem). Everything else in the
+# files is skipped at parse time. The metric functions below only use these.
+COLUMN_MANIFEST = {
+    'economy_data': [
+        'Real_GDP_PPP_billion_USD', 'GDP_Official_Exchange_Rate_billion_USD',
+        'Real_GDP_Growth_Rate_percent', 'Real_GDP_per_Capita_USD',
+        'Unemployment_Rate_percent', 'Youth_Unemployment_Rate_percent',
+        'Budget_billion_USD', 'Budget_Surplus_billion_USD',
+        'Budget_Deficit_percent_of_GDP', 'Public_Debt_percent_of_GDP', 'Fiscal_Year',
+        'Exports_billion_USD', 'Imports_billion_USD', 'Population_Below_Poverty_Line_percent',
+    ],
+    'demographics_data': [
+        'Total_Population', 'Population_Growth_Rate', 'Birth_Rate', 'Median_Age',
+        'Total_Literacy_Rate', 'Youth_Unemployment_Rate',
+    ],
+    'energy_data': ['electricity_access_percent', 'electricity_generating_capacity_kW'],
+    'transportation_data': ['airports_paved_runways_count', 'roadways_km', 'railways_km', 'waterways_km'],
+    'geography_data': ['Geographic_Coordinates', 'Area_Total', 'Land_Area'],
+}
+
+# Geographic_Coordinates text is replaced by these decimal-degree columns
+COORDINATE_COLUMNS = ['Latitude', 'Longitude']
+
+# Unit of each text-encoded numeric column kept after cleaning (see utils/unit_parser).
+# A value whose suffix does not match its column's unit is treated as missing.
+COLUMN_UNITS = {
+    'Total_Population': 'plain',
+    'Population_Growth_Rate': 'percent',
+    'Total_Literacy_Rate': 'percent',
+    'Youth_Unemployment_Rate': 'percent',
+    'Area_Total': 'sq km',
+    'Land_Area': 'sq km',
+    'airports_paved_runways_count': 'plain',
+    'roadways_km': 'plain',
+    'railways_km': 'plain',
+    'waterways_km': 'plain',
+}
+
+# Countries below this population are left out of the complex metrics
+MIN_POPULATION = 5000000
+
+# Sub-national (admin-1) units - provinces, states - are an optional second entity
+# level. Their CSVs go in data_sets/admin1/ (editions/<year>/admin1/ for older
+# editions) with the same file names and columns as the country files, plus
+# PARENT_COL naming the country each unit belongs to. Columns a file lacks are
+# left empty. Units are named "<unit> (<parent>)" so names stay unique.
+ADMIN1_SUBDIR = "admin1"
+PARENT_COL = 'Parent_Country'
+
+# Admin-1 units below this population are left out of the complex metrics
+MIN_ADMIN1_POPULATION = 100000
+
+# Region levels (columns added by attach_country_meta) and the statistics kept per
+# region for every indicator and complex metric
+REGION_LEVELS = tuple(REGION_COLUMNS.values())
+REGION_STATS = ['count', 'mean', 'median', 'min', 'max']
+
+# Source layout. The CSVs directly in data_sets/ are the current edition; older
+# Factbook editions go in data_sets/editions/<year>/ with the same file names.
+# Each edition (and entity level) is cleaned into its own columnar snapshot partition.
+DATA_DIR = Path(__file__).parent / "data_sets"
+EDITIONS_DIR = DATA_DIR / "editions"
+ADMIN1_DIR = DATA_DIR / ADMIN1_SUBDIR
+
+
+# Immutable, process-wide view of one edition handed to every callback and metric.
+# version: unique per (re)load of any edition; caches key on it
+# edition: Factbook year, or None for the current edition
+# matrix:  entity x indicator float block with interned entity ids (row = id)
+# frame:   full cleaned table with ISO metadata (iso_key, iso3, country_display),
+#          entity_level and parent_iso3; all countries come first, then the
+#          admin-1 units, so country ids do not depend on the admin-1 files.
+#          Its numeric columns are views into matrix.values
+# core:    countries with at least MIN_POPULATION inhabitants
+# metrics: the five complex metric series (ASF, IEC, SCC, WSI, ERS), computed on
+#          core and, separately, on admin-1 units with MIN_ADMIN1_POPULATION
+#          (each level is normalized on its own); countries first
+# metric_matrix: the metric series aligned as one entity x metric block over all
+#          entity names, for the weighted composite (see utils/complex_scores)
+# regions: level -> region x (column, stat) aggregate cube over the countries,
+#          see region_stats()
+# geo:     great-circle distances between entities (row = id)
+# Numeric arrays are read-only; .copy() before modifying a frame or series.
+@dataclass(frozen=True)
+class Dataset:
+    version: int
+    edition: Optional[int]
+    matrix: IndicatorMatrix
+    frame: pd.DataFrame
+    core: pd.DataFrame
+    metrics: Mapping[str, pd.Series]
+    metric_matrix: MetricMatrix
+    regions: Mapping[str, pd.DataFrame]
+    geo: geo.ProximityIndex
+
+
+# Rebuild df on read-only numeric arrays, for frames shared between callers (the
+# dataset's, cached scores). Numeric columns listed in `matrix` become views into
+# its block instead of separate copies. Text columns stay writable because
+# several pandas string routines reject read-only object buffers.
+def freeze_frame(df, matrix=None):
+    columns = {}
+    for col in df.columns:
+        if matrix is not None and col in matrix.col_index:
+            columns[col] = matrix.column(col)
+            continue
+        values = df[col].to_numpy(copy=True)
+        if values.dtype != object:
+            values.setflags(write=False)
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def _freeze_series(series):
+    values = series.to_numpy(copy=True)
+    values.setflags(write=False)
+    return pd.Series(values, index=series.index, name=series.name, copy=False)
+
+
+# Data versions whose entity names the registry keeps for remapping stored ids
+NAME_HISTORY = 8
+
+
+# Holds one Dataset per edition and hands the same object to every caller.
+# Editions are loaded lazily: the first get(edition) reads only that edition's
+# partition, under a lock, so concurrent first requests wait for a single load.
+# Each Dataset carries its own metric series, so switching editions never
+# recomputes them. reload() builds a complete new Dataset off the request path and
+# then swaps the mapping in one assignment (double buffering): callers that
+# already hold the old Dataset finish against it, later calls see the new one.
+class DatasetRegistry:
+    def __init__(self, min_pop=MIN_POPULATION):
+        self._min_pop = min_pop
+        self._lock = threading.Lock()
+        self._datasets = {}
+        self._version = 0
+        # Entity names of the most recent versions, so ids held by a client from an
+        # earlier version can be mapped to the current one (see store_ids)
+        self._names = OrderedDict()
+
+    # Entity names (id -> name) of a recent data version, or None if unknown
+    def entity_names(self, version):
+        return self._names.get(version)
+
+    def get(self, edition=None):
+        ds = self._datasets.get(edition)
+        if ds is None:
+            with self._lock:
+                ds = self._datasets.get(edition)
+                if ds is None:
+                    ds = self._build(edition)
+                    self._datasets = {**self._datasets, edition: ds}
+        return ds
+
+    # Rebuild the current edition and swap it in; other editions are dropped and
+    # reload lazily (cheaply, from their snapshots, when their files are unchanged).
+    # The lock only serializes rebuilds.
+    def reload(self):
+        with self._lock:
+            ds = self._build(None)
+            self._datasets = {None: ds}
+        return ds
+
+    # Drop all loaded editions; the next get() reloads them with new versions
+    def invalidate(self):
+        with self._lock:
+            self._datasets = {}
+
+    def _build(self, edition):
+        countries = attach_country_meta(get_data(edition=edition)).assign(entity_level='country')
+        core = freeze_frame(countries[countries['Total_Population'] >= self._min_pop].reset_index(drop=True))
+        metrics = load_metrics(core, self._min_pop, edition)
+        region_frame = countries
+
+        frame = countries.assign(**{PARENT_COL: None, 'parent_iso3': None})
+        if _source_files(edition, 'admin1'):
+            admin1 = attach_admin1_meta(get_data(edition=edition, level='admin1')).assign(entity_level='admin1')
+            admin1_core = admin1[admin1['Total_Population'] >= MIN_ADMIN1_POPULATION].reset_index(drop=True)
+            admin1_metrics = load_metrics(admin1_core, MIN_ADMIN1_POPULATION, edition, level='admin1')
+            frame = pd.concat([frame, admin1], ignore_index=True)
+            metrics = {key: pd.concat([s, admin1_metrics[key]]) for key, s in metrics.items()}
+
+        matrix = IndicatorMatrix.from_frame(frame)
+        metrics = {key: _freeze_series(s) for key, s in metrics.items()}
+        regions = {level: _region_cube(region_frame, matrix.columns, metrics, level)
+                   for level in REGION_LEVELS}
+        proximity = geo.ProximityIndex(*(matrix.column(c) for c in COORDINATE_COLUMNS))
+        self._version += 1
+        self._names[self._version] = matrix.names
+        while len(self._names) > NAME_HISTORY:
+            self._names.popitem(last=False)
+        return Dataset(
+            version=self._version,
+            edition=edition,
+            matrix=matrix,
+            frame=freeze_frame(frame, matrix),
+            core=core,
+            metrics=MappingProxyType(metrics),
+            metric_matrix=MetricMatrix.from_series(metrics, frame[COUNTRY_COL]),
+            regions=MappingProxyType(regions),
+            geo=proximity,
+        )
+
+
+REGISTRY = DatasetRegistry()
+
 
-# Load and cache the global dataset, filtering out small countries.
+# Shared dataset for callbacks and metric functions.
+# Callbacks should call this once and pass the result on, so one request never
+# mixes two data versions.
+# edition: Factbook year from list_editions(), or None for the current edition
+def get_dataset(edition=None):
+    return REGISTRY.get(edition)
+
+
+# Version number of the current dataset (for cache keys)
+def get_data_version(edition=None):
+    return get_dataset(edition).version
+
+
+# Selection stores (selected-countries, selected_country, metric-brush)
+# Entity ids are rows of one data version: a reload or another edition can add or
+# drop entities and shift them. A store therefore records the version its ids belong
+# to, {"version": ds.version, "ids": [...]}; ids of another version are mapped by
+# name through the registry's recent versions, or dropped once that version is gone.
+def entity_store(ids, dataset):
+    return {'version': dataset.version, 'ids': sorted({int(i) for i in ids})}
+
+
+# Sorted entity ids of a store in `dataset` (unknown or dropped entities are skipped)
+def store_ids(store, dataset):
+    if not isinstance(store, dict):
+        return np.empty(0, dtype=np.intp)
+    ids = [i for i in store.get('ids') or [] if isinstance(i, (int, np.integer)) and not isinstance(i, bool)]
+    version = store.get('version')
+    if version == dataset.version:
+        return np.flatnonzero(dataset.matrix.id_mask(ids))
+    names = REGISTRY.entity_names(version)
+    if names is None:
+        return np.empty(0, dtype=np.intp)
+    ids = np.array(ids, dtype=np.intp)
+    return dataset.matrix.name_ids(names[ids[(ids >= 0) & (ids < len(names))]])
+
+
+# Boolean entity mask of a store in `dataset`
+def store_mask(store, dataset):
+    mask = np.zeros(len(dataset.matrix), dtype=bool)
+    mask[store_ids(store, dataset)] = True
+    return mask
+
+
+# Years of the older editions found under data_sets/editions/, oldest first
+def list_editions():
+    if not EDITIONS_DIR.is_dir():
+        return []
+    return sorted(int(p.name) for p in EDITIONS_DIR.iterdir() if p.is_dir() and p.name.isdigit())
+
+
+# Start polling data_sets/ and hot-swap a rebuilt dataset when a CSV changes.
+# interval: seconds between polls
+def start_data_watcher(interval=30.0):
+    def fingerprint():
+        return (stat_fingerprint(DATA_DIR) + stat_fingerprint(ADMIN1_DIR)
+                + stat_fingerprint(EDITIONS_DIR, "*/*.csv") + stat_fingerprint(EDITIONS_DIR, f"*/{ADMIN1_SUBDIR}/*.csv"))
+    watcher = DataWatcher(fingerprint, REGISTRY.reload, interval)
+    watcher.start()
+    return watcher
+
+
+# Region x (column, stat) table for one region level, computed once per version.
+# Columns are every numeric indicator plus the five metric keys, each with the
+# REGION_STATS; countries without a region at that level are left out.
+def _region_cube(frame, indicators, metrics, level):
+    table = frame[[COUNTRY_COL, level] + list(indicators)].set_index(COUNTRY_COL)
+    for key, series in metrics.items():
+        table[key] = series.reindex(table.index)
+    cube = table.groupby(level, sort=True).agg(REGION_STATS)
+    values = cube.to_numpy(dtype=float)
+    values.setflags(write=False)
+    return pd.DataFrame(values, index=cube.index, columns=cube.columns, copy=False)
+
+
+# Regional aggregates without a groupby on the request path.
+# level: 'region', 'sub_region' or 'intermediate_region'
+# stat:  one of REGION_STATS to get a region x column table; None for the full cube
+def region_stats(level='region', stat=None, dataset=None, edition=None):
+    cube = (dataset or get_dataset(edition)).regions[level]
+    if stat is None:
+        return cube
+    return cube.xs(stat, axis=1, level=1)
+
+
+# Population-filtered table of countries used by the complex metrics.
 # min_pop: Minimum population threshold (default 5 million)
-def ensure_data_loaded(min_pop = 5000000):
-    global DATA_DF
-    if DATA_DF is None:
-        DATA_DF = get_data()
-        # Filter out countries with small populations to focus on major economies
-        DATA_DF = DATA_DF[DATA_DF['Total_Population'] >= min_pop].reset_index(drop=True)
-    return DATA_DF
+def ensure_data_loaded(min_pop=MIN_POPULATION, dataset=None, edition=None):
+    ds = dataset or get_dataset(edition)
+    if min_pop == MIN_POPULATION:
+        return ds.core
+    frame = ds.frame
+    keep = (frame['entity_level'] == 'country') & (frame['Total_Population'] >= min_pop)
+    return frame[keep].reset_index(drop=True)
+
+# Boolean mask over the entity ids of one level ('country' or 'admin1')
+def level_mask(level='country', dataset=None, edition=None):
+    ds = dataset or get_dataset(edition)
+    return (ds.frame['entity_level'] == (level or 'country')).to_numpy()
+
+# Locate the source CSV files of an edition (None = current edition) and level;
+# an edition without admin-1 files has none at that level
+def _source_files(edition=None, level='country'):
+    if edition is None:
+        data_dir = DATA_DIR
+    else:
+        data_dir = EDITIONS_DIR / str(int(edition))
+        if not data_dir.is_dir():
+            raise KeyError(f"Unknown edition {edition!r}; available: {list_editions()}")
+    if level == 'admin1':
+        data_dir = data_dir / ADMIN1_SUBDIR
+    return [str(p) for p in data_dir.glob("*.csv")]
+
+# Snapshot name of an edition's (and level's) partition
+def _partition(name, edition, level='country'):
+    if level != 'country':
+        name = f"{name}-{level}"
+    return name if edition is None else f"{name}-{int(edition)}"
+
+# Snapshot key for the cleaned table: manifest/unit edits change it too
+def _data_spec():
+    return repr((sorted(COLUMN_MANIFEST.items()), sorted(COLUMN_UNITS.items())))
 
 # Load and merge all CSV files from the data_sets directory.
-# Performs data cleaning and type conversion.
-def get_data():
-    # Locate CSV files in the package data directory
-    data_dir = Path(__file__).parent / "data_sets"
-    all_files = [str(p) for p in data_dir.glob("*.csv")]
-    
+# The cleaned result is served from an on-disk snapshot keyed by the CSV contents,
+# so the parsing/cleaning below only runs when a source file changes.
+# columns: optional list of columns to return (Country is always included); only
+#          those arrays are read from the snapshot.
+# edition: Factbook year (None = current); only that edition's partition is read.
+# level:   'country', or 'admin1' for the sub-national units (with PARENT_COL)
+def get_data(columns=None, edition=None, level='country'):
+    all_files = _source_files(edition, level)
+    if columns is not None:
+        columns = [COUNTRY_COL] + [c for c in columns if c != COUNTRY_COL]
+    return snapshot.load_or_build(
+        _partition("countries", edition, level), all_files, lambda: _build_data(all_files, level),
+        extra=_data_spec(), columns=columns
+    )
+
+# Parse, merge and clean the given CSV files.
+# Only the columns listed in COLUMN_MANIFEST are parsed (usecols); files without
+# a manifest entry are read in full. Admin-1 files may omit manifest columns; their
+# units are renamed "<unit> (<parent>)" and PARENT_COL is re-attached after the join.
+def _build_data(all_files, level='country'):
     # Read each CSV into its own DataFrame
-    dfs = [pd.read_csv(f) for f in all_files]
+    frames = {}
+    parents = {}
+    for f in all_files:
+        wanted = COLUMN_MANIFEST.get(Path(f).stem)
+        if level == 'admin1':
+            wanted = None if wanted is None else {COUNTRY_COL, PARENT_COL, *wanted}
+            usecols = None if wanted is None else (lambda c: c in wanted)
+        else:
+            usecols = None if wanted is None else [COUNTRY_COL] + wanted
+        df = pd.read_csv(f, usecols=usecols)
+        if level == 'admin1':
+            parent = df.pop(PARENT_COL).astype(str).str.strip()
+            df[COUNTRY_COL] = df[COUNTRY_COL].astype(str).str.strip() + " (" + parent + ")"
+            for key, name in zip(frame_join.country_key(df[COUNTRY_COL].to_numpy()), parent):
+                parents.setdefault(key, name)
+        frames[Path(f).stem] = df
     
-    # Merge all DataFrames on 'Country' column using outer join
+    # Outer-join all files on the normalized country key in one aligned concat
     # This preserves all countries even if they don't appear in all datasets
-    df = reduce(lambda left, right: pd.merge(left, right, on='Country', how='outer'), dfs)
-    
-    # Remove columns not needed for the analysis
-    df = df.drop(columns=['coal_metric_tons', 'petroleum_bbl_per_day', 'refined_petroleum_products_bbl_per_day', 
-                          'refined_petroleum_exports_bbl_per_day', 'refined_petroleum_imports_bbl_per_day', 
-                          'natural_gas_cubic_meters', 'Geographic_Coordinates', 'Highest_Elevation', 'Lowest_Elevation', 
-                          'airports_unpaved_runways_count', 'heliports_count', 'Water_Area', 'gas_pipelines_km',
-                          'oil_pipelines_km', 'refined_products_pipelines', 'water_pipelines_km', 'Forest_Land',
-                          'Male_Literacy_Rate', 'Female_Literacy_Rate', 'Sex_Ratio', 'Death_Rate',
-                          'Land_Boundaries', 'Coastline', 'Ohter_Land', 'Agricultural_Land', 'Arable_Land (%% of Total Agricultural Land)',
-                          'Permanent_Crops (%% of Total Agricultural Land)', 'Permanent_Pasture (%% of Total Agricultural Land)', 
-                          'refined_products_pipelines_km', 'Irrigated_Land', 'Other_Land', 'Infant_Mortality_Rate', 
-                          'Total_Fertility_Rate', 'Net_Migration_Rate', 'Exchange_Rate_per_USD', 
-                          'carbon_dioxide_emissions_Mt'], errors='ignore')
+    df, report = frame_join.aligned_join(frames, COUNTRY_COL)
+    if report:
+        warnings.warn(f"Problems while joining data_sets/*.csv: {report}", stacklevel=2)
+
+    if level == 'admin1':
+        df.insert(1, PARENT_COL, [parents.get(k) for k in frame_join.country_key(df[COUNTRY_COL].to_numpy())])
+        for col in (c for cols in COLUMN_MANIFEST.values() for c in cols):
+            if col not in df:
+                df[col] = np.nan
+
+    # "33 00 N, 65 00 E" -> decimal latitude / longitude
+    coords = df.pop('Geographic_Coordinates') if 'Geographic_Coordinates' in df else pd.Series(np.nan, index=df.index)
+    for col, values in zip(COORDINATE_COLUMNS, geo.parse_coordinates(coords)):
+        df[col] = values
     
     # Columns that should remain as strings (not converted to numeric)
-    text_columns = ['Country', 'Fiscal_Year']
+    text_columns = ['Country', 'Fiscal_Year', PARENT_COL]
     
-    # Clean and convert numeric columns
-    for col in df.columns:
-        if col in text_columns:
-            continue  # Skip text columns
-            
-        if df[col].dtype == 'object':
-            df[col] = df[col].astype(str).str.replace(',', '', regex=True)
-            
-            # million sq km is handled differently, otherwise we couldnt multiply
-            million_mask = df[col].str.contains('million sq km', na=False)
-            df.loc[million_mask, col] = df.loc[million_mask, col].str.replace(' million sq km', '', regex=True)
-            df.loc[million_mask, col] = pd.to_numeric(df.loc[million_mask, col], errors='coerce') * 1_000_000
-            
-            # clean regular sq km
-            sq_km_mask = df[col].str.contains(' sq km', na=False) & ~million_mask
-            df.loc[sq_km_mask, col] = df.loc[sq_km_mask, col].str.replace(' sq km', '', regex=True)
-            
-            # clean the rest
-            df[col] = df[col].astype(str).str.replace('km', '', regex=True)
-            df[col] = df[col].str.replace('%', '', regex=True)
-            df[col] = df[col].str.strip()
-            
-            # convert to numeric
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    # Parse all text-encoded numeric columns in one pass (see COLUMN_UNITS)
+    object_cols = [c for c in df.columns if c not in text_columns and df[c].dtype == 'object']
+    for col, values in unit_parser.parse_columns(df[object_cols], COLUMN_UNITS).items():
+        df[col] = values
     
     return df
 
+# Projection over the shared dataset: Country, iso3 and the requested columns only.
+# Callbacks use this instead of copying the whole wide table.
+def get_columns(columns, dataset=None, edition=None):
+    frame = (dataset or get_dataset(edition)).frame
+    columns = [c for c in columns if c not in ID_COLUMNS]
+    missing = [c for c in columns if c not in frame.columns]
+    if missing:
+        raise KeyError(f"Unknown column(s): {missing}")
+    return frame[ID_COLUMNS + columns]
+
 # Robust normalization for global datasets:
 # 1. Log-transforms the data to reduce skew
 # 2. Clips outliers at a specific percentile (default 90th)
 # 3. Min-Max scales the result to [0, 1]
+# One column of utils.normalize.normalize_columns, which normalizes a whole block
+# of columns in one pass
 def normalize_series(series, clip_percentile=0.90):
-    if series.empty or series.max() == series.min():
-        return series * 0
-    
-    # Work on a copy to avoid warnings
-    s = series.copy()
-
-    # Log Transformation (for 'Density' and 'Population' metrics)
-    if s.min() < 0:
-        s = s - s.min()
-    s = np.log1p(s)
-
-    # Percentile Clipping
-    # This caps the 'Max' at the 90th percentile so the top 10% of outliers don't skew the scale
-    upper_bound = s.quantile(clip_percentile)
-    s = s.clip(upper=upper_bound)
-
-    # Standard Min-Max of the clipped/log data
-    denom = s.max() - s.min()
-    if denom == 0:
-        return s * 0
-        
-    return (s - s.min()) / denom
-
-# Calculate workforce availability score based on literacy, unemployment, and population
-def available_skilled_workforce():
-    df = ensure_data_loaded()
-    required = [COUNTRY_COL, 'Total_Literacy_Rate', 'Unemployment_Rate_percent', 'Total_Population']
-    sub = df[required].copy().set_index(COUNTRY_COL)
-    sub = sub.dropna()
-    
-    # Calculate the 'Quality' of the workforce
-    quality_score = (sub['Total_Literacy_Rate'] / 100) * (sub['Unemployment_Rate_percent'] / 100)
-    
-    # Apply Scale Factor.
-    scale_factor = np.log10(sub['Total_Population'])
-
-    metric = quality_score * scale_factor
-    return normalize_series(metric)
-
-# Calculate industrial energy capacity based on per-capita generation and grid scale
-def industrial_energy_capacity():
-    df = ensure_data_loaded()
-    required = [COUNTRY_COL, 'electricity_generating_capacity_kW', 'Total_Population', 'electricity_access_percent']
-    sub = df[required].copy().set_index(COUNTRY_COL)
-    sub = sub.dropna()
-    
-    # Base Capacity: How much power per person with access?
-    pop_with_access = sub['Total_Population'] * (sub['electricity_access_percent'] / 100)
-    per_capita_capacity = sub['electricity_generating_capacity_kW'] / pop_with_access.replace(0, np.nan)
-    
-    # Scale Factor: Log of Total generating capacity. 
-    grid_scale = np.log10(sub['electricity_generating_capacity_kW'].clip(lower=1))
-    
-    metric = per_capita_capacity * grid_scale
-    
-    return normalize_series(metric.dropna())
-
-# Measure infrastructure density (airports, railways, waterways relative to land area)
-def supply_chain_connectivity_score():
-    df = ensure_data_loaded()
-    required = [COUNTRY_COL, 'airports_paved_runways_count', 'railways_km', 'waterways_km', 'Land_Area']
-    sub = df[required].copy().set_index(COUNTRY_COL)
-    sub = sub.dropna()
-    
-    # Calculate Density
-    area_factor = sub['Land_Area'] + 1
-    
-    air_density = sub['airports_paved_runways_count'] / area_factor
-    rail_density = sub['railways_km'] / area_factor
-    water_density = sub['waterways_km'] / area_factor
-    
-    # Normalize the densities
-    airports_norm = normalize_series(air_density)
-    railways_norm = normalize_series(rail_density)
-    waterways_norm = normalize_series(water_density)
-    
-    # Apply weights 
-    metric = (0.35 * airports_norm) + (0.3 * railways_norm) + (0.35 * waterways_norm)
-    
-    return normalize_series(metric)
+    values = normalize_columns(series.to_numpy(dtype=float), clip_percentile)
+    return pd.Series(values, index=series.index, name=series.name)
 
+# Node functions of the metric graph below. Each takes one series per declared
+# input (plus the node's parameters) and returns a series on the same rows.
+def _scaled_product(a, b, scale=1.0):
+    return (a / scale) * (b / scale)
 
-# Calculate wage sustainability using GDP per capita adjusted for fiscal risk
-# Index = Real_GDP_per_Capita_USD * (1 + |Budget_Deficit|/100 + Public_Debt/200)
-def wage_sustainability_index():
-    df = ensure_data_loaded()
-    sub = df[[COUNTRY_COL, 'Real_GDP_per_Capita_USD', 'Budget_Deficit_percent_of_GDP', 
-        'Public_Debt_percent_of_GDP']].copy().set_index(COUNTRY_COL)
-    sub = sub.dropna()
-    
-    budget_risk = sub['Budget_Deficit_percent_of_GDP'].abs() / 100.0
-    debt_risk = sub['Public_Debt_percent_of_GDP'] / 200.0
-    risk_multiplier = 1.0 + budget_risk + debt_risk
+def _product(a, b):
+    return a * b
 
-    # This reflects the "True" cost of labor when accounting for fiscal instability.
-    metric = sub['Real_GDP_per_Capita_USD'] * risk_multiplier
-    
-    return 1.0 - normalize_series(metric)
-
-# Calculate economic resilience combining GDP growth, budget stability, and debt management
-# Weighted: 0.4 * GDP Growth + 0.3 * Budget Stability + 0.3 * Debt Management
-def economic_resilience_score():
-    df = ensure_data_loaded()
-    sub = df[[COUNTRY_COL, 'Real_GDP_Growth_Rate_percent', 
-        'Budget_Deficit_percent_of_GDP', 
-        'Public_Debt_percent_of_GDP']].copy().set_index(COUNTRY_COL)
-    sub = sub.dropna()
-    
-    gdp_growth_norm = normalize_series(sub['Real_GDP_Growth_Rate_percent'])
-    
-    budget_stability = -sub['Budget_Deficit_percent_of_GDP'].abs()
-    budget_norm = normalize_series(budget_stability)
-    
-    debt_inverted = -sub['Public_Debt_percent_of_GDP']
-    debt_norm = normalize_series(debt_inverted)
-    
-    metric = (0.4 * gdp_growth_norm) + (0.3 * budget_norm) + (0.3 * debt_norm)
-    
-    return normalize_series(metric)
\ No newline at end of file
+def _log10(series, lower=None):
+    return np.log10(series if lower is None else series.clip(lower=lower))
+
+def _share_of(total, percent):
+    return total * (percent / 100)
+
+def _per_unit(amount, units):
+    return amount / units.replace(0, np.nan)
+
+def _ratio(a, b):
+    return a / b
+
+def _shift(series, offset):
+    return series + offset
+
+def _divide(series, divisor):
+    return series / divisor
+
+def _negate(series):
+    return -series
+
+def _absolute(series):
+    return series.abs()
+
+def _risk_multiplier(budget_risk, debt_risk):
+    return 1.0 + budget_risk + debt_risk
+
+def _weighted_sum(*series, weights):
+    total = weights[0] * series[0]
+    for weight, s in zip(weights[1:], series[1:]):
+        total = total + weight * s
+    return total
+
+def _complement(series):
+    return 1.0 - series
+
+def _normalize_present(series, clip_percentile=0.90):
+    return normalize_series(series.dropna(), clip_percentile)
+
+
+# Complex metric graph: node -> Node(function, inputs, parameters, element-wise).
+# Inputs are source columns or other nodes. Element-wise nodes over source columns
+# (densities, per-capita values, fiscal risk terms) are computed once and shared by
+# every metric; normalizations run on the rows where all of the metric's source
+# columns are present. Results are memoized on the content of their inputs (see
+# utils/metric_graph), so a new metric built from these nodes reuses them.
+METRIC_NODES = {
+    # Available Skilled Workforce: (literacy x unemployment) x log10(population)
+    'workforce_quality': Node(_scaled_product, ('Total_Literacy_Rate', 'Unemployment_Rate_percent'),
+                              {'scale': 100}, elementwise=True),
+    'population_scale': Node(_log10, ('Total_Population',), elementwise=True),
+    'workforce': Node(_product, ('workforce_quality', 'population_scale'), elementwise=True),
+    'ASF': Node(normalize_series, ('workforce',)),
+
+    # Industrial Energy Capacity: per-capita capacity (of people with access) x grid scale
+    'pop_with_access': Node(_share_of, ('Total_Population', 'electricity_access_percent'), elementwise=True),
+    'capacity_per_capita': Node(_per_unit, ('electricity_generating_capacity_kW', 'pop_with_access'),
+                                elementwise=True),
+    'grid_scale': Node(_log10, ('electricity_generating_capacity_kW',), {'lower': 1}, elementwise=True),
+    'energy_capacity': Node(_product, ('capacity_per_capita', 'grid_scale'), elementwise=True),
+    'IEC': Node(_normalize_present, ('energy_capacity',)),
+
+    # Supply Chain Connectivity: weighted normalized airport/rail/waterway densities
+    'area_factor': Node(_shift, ('Land_Area',), {'offset': 1}, elementwise=True),
+    'air_density': Node(_ratio, ('airports_paved_runways_count', 'area_factor'), elementwise=True),
+    'rail_density': Node(_ratio, ('railways_km', 'area_factor'), elementwise=True),
+    'water_density': Node(_ratio, ('waterways_km', 'area_factor'), elementwise=True),
+    'air_density_norm': Node(normalize_series, ('air_density',)),
+    'rail_density_norm': Node(normalize_series, ('rail_density',)),
+    'water_density_norm': Node(normalize_series, ('water_density',)),
+    'connectivity': Node(_weighted_sum, ('air_density_norm', 'rail_density_norm', 'water_density_norm'),
+                         {'weights': (0.35, 0.3, 0.35)}, elementwise=True),
+    'SCC': Node(normalize_series, ('connectivity',)),
+
+    # Wage Sustainability: 1 - normalized GDP per capita x (1 + |deficit|/100 + debt/200),
+    # the "true" cost of labor when accounting for fiscal instability
+    'abs_deficit': Node(_absolute, ('Budget_Deficit_percent_of_GDP',), elementwise=True),
+    'budget_risk': Node(_divide, ('abs_deficit',), {'divisor': 100.0}, elementwise=True),
+    'debt_risk': Node(_divide, ('Public_Debt_percent_of_GDP',), {'divisor': 200.0}, elementwise=True),
+    'risk_multiplier': Node(_risk_multiplier, ('budget_risk', 'debt_risk'), elementwise=True),
+    'labor_cost': Node(_product, ('Real_GDP_per_Capita_USD', 'risk_multiplier'), elementwise=True),
+    'labor_cost_norm': Node(normalize_series, ('labor_cost',)),
+    'WSI': Node(_complement, ('labor_cost_norm',), elementwise=True),
+
+    # Economic Resilience: 0.4 GDP growth + 0.3 budget stability + 0.3 debt management
+    'budget_stability': Node(_negate, ('abs_deficit',), elementwise=True),
+    'debt_management': Node(_negate, ('Public_Debt_percent_of_GDP',), elementwise=True),
+    'growth_norm': Node(normalize_series, ('Real_GDP_Growth_Rate_percent',)),
+    'budget_stability_norm': Node(normalize_series, ('budget_stability',)),
+    'debt_management_norm': Node(normalize_series, ('debt_management',)),
+    'resilience': Node(_weighted_sum, ('growth_norm', 'budget_stability_norm', 'debt_management_norm'),
+                       {'weights': (0.4, 0.3, 0.3)}, elementwise=True),
+    'ERS': Node(normalize_series, ('resilience',)),
+}
+
+# The complex metrics, in display order; computed once per dataset version on its core
+METRIC_KEYS = ('ASF', 'IEC', 'SCC', 'WSI', 'ERS')
+METRIC_GRAPH = MetricGraph(METRIC_NODES)
+
+# Public accessors: return the series precomputed for the given dataset, or for
+# the given edition (default: current)
+def available_skilled_workforce(dataset=None, edition=None):
+    return (dataset or get_dataset(edition)).metrics['ASF']
+
+def industrial_energy_capacity(dataset=None, edition=None):
+    return (dataset or get_dataset(edition)).metrics['IEC']
+
+def supply_chain_connectivity_score(dataset=None, edition=None):
+    return (dataset or get_dataset(edition)).metrics['SCC']
+
+def wage_sustainability_index(dataset=None, edition=None):
+    return (dataset or get_dataset(edition)).metrics['WSI']
+
+def economic_resilience_score(dataset=None, edition=None):
+    return (dataset or get_dataset(edition)).metrics['ERS']
+
+
+# Proximity to a set of countries: 1 for the selected countries, falling towards 0
+# with (log-scaled, clipped) great-circle distance to the closest one. Computed on
+# demand for the complex-metric countries (core) from the precomputed distances.
+# selected: entity ids (as held by the selection stores); an empty result when none
+# is valid
+def market_proximity(selected, dataset=None, edition=None):
+    ds = dataset or get_dataset(edition)
+    distance = ds.geo.distance_to(ds.matrix.id_mask(selected))
+    ids = ds.matrix.ids_of(ds.core[COUNTRY_COL])
+    s = pd.Series(distance[ids], index=pd.Index(ds.matrix.names[ids], name=COUNTRY_COL)).dropna()
+    if s.empty:
+        return s
+    return 1 - normalize_series(s)
+
+# The n countries closest to a country: Country, iso3, distance_km (nearest first)
+# key: ISO3 code or country name
+def nearest_countries(key, n=5, dataset=None, edition=None):
+    ds = dataset or get_dataset(edition)
+    i = ds.matrix.id_of(key)
+    ids, dist = ds.geo.nearest(i, n) if i is not None else (np.empty(0, dtype=np.intp), np.empty(0))
+    return _proximity_frame(ds, ids, dist)
+
+# Countries within radius_km of any selected country (excluding the selection):
+# Country, iso3, distance_km to the closest selected country (nearest first)
+# selected: entity ids (as held by the selection stores)
+def countries_within(selected, radius_km, dataset=None, edition=None):
+    ds = dataset or get_dataset(edition)
+    mask = ds.matrix.id_mask(selected)
+    ids = np.flatnonzero(ds.geo.within(mask, radius_km))
+    dist = ds.geo.distance_to(mask)[ids]
+    order = np.argsort(dist, kind="stable")
+    return _proximity_frame(ds, ids[order], dist[order])
+
+def _proximity_frame(ds, ids, dist):
+    return pd.DataFrame({
+        COUNTRY_COL: ds.matrix.names[ids],
+        'iso3': ds.matrix.iso3[ids],
+        'distance_km': dist,
+    })
+
+
+# One metric across editions: Country x edition table (NaN where a country has no
+# value). Only the requested editions are loaded.
+# editions: years to include (default: all older editions plus the current one)
+def metric_trend(key, editions=None):
+    if editions is None:
+        editions = list_editions() + [None]
+    columns = {
+        ('current' if ed is None else ed): get_dataset(ed).metrics[key]
+        for ed in editions
+    }
+    return pd.DataFrame(columns)
+
+
+# Precomputed complex metrics
+# `python preprocessing.py` writes the five metric series for the current sources to
+# data_sets/processed/complex_metrics-<key>.npz; the app loads that artifact instead
+# of re-deriving the metrics. The key covers the source CSVs, the cleaning spec, the
+# population threshold and the metric code, so a stale artifact is never used.
+PROCESSED_DIR = DATA_DIR / "processed"
+
+
+def _metrics_spec(min_pop):
+    code = snapshot.code_fingerprint(normalize_series, normalize_columns, *METRIC_GRAPH.functions())
+    return f"{_data_spec()};min_pop={min_pop};graph={METRIC_GRAPH.spec()};code={code}"
+
+
+# Long table (metric, Country, value) holding every metric series in order
+def _metrics_table(core):
+    parts = []
+    for key, series in METRIC_GRAPH.evaluate(core, METRIC_KEYS, COUNTRY_COL).items():
+        parts.append(pd.DataFrame({
+            'metric': key,
+            COUNTRY_COL: series.index.to_numpy(dtype=object),
+            'value': series.to_numpy(dtype=float),
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+
+# Metric key -> series for `core`, read from the artifact when it matches the
+# edition's (and level's) current sources; computed (and written for the next
+# start) otherwise.
+def load_metrics(core, min_pop=MIN_POPULATION, edition=None, level='country'):
+    table = snapshot.load_or_build(
+        _partition("complex_metrics", edition, level), _source_files(edition, level), lambda: _metrics_table(core),
+        extra=_metrics_spec(min_pop), directory=PROCESSED_DIR,
+    )
+    metrics = {}
+    for key in METRIC_KEYS:
+        rows = table[table['metric'] == key]
+        index = pd.Index(rows[COUNTRY_COL].to_numpy(dtype=object), name=COUNTRY_COL)
+        metrics[key] = pd.Series(rows['value'].to_numpy(dtype=float), index=index)
+    return metrics
+
+
+# Make sure the metric artifact for the current data_sets/*.csv exists (used by
+# preprocessing.py); building the dataset writes it on a miss.
+def build_metrics_artifact():
+    return get_dataset().metrics
@@ -2,20 +2,99 @@
 Complex metric calculation module.
 Computes weighted composite scores from individual metrics based on user-selected
 weights and toggles from the detailed view panel.
+
+Results are kept in a process-wide LRU cache (SCORE_CACHE) keyed on the dataset
+version, the enabled metrics and their weights normalized to sum to 1, so the
+ranking, the scatterplot and the metric cards share one computation per
+configuration, and weightings that differ only in scale (20/30 vs. 40/60) share
+an entry.
 """
 
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
 import pandas as pd
-from jbi100_app.data import (
-    available_skilled_workforce,
-    industrial_energy_capacity,
-    supply_chain_connectivity_score,
-    wage_sustainability_index,
-    economic_resilience_score,
-)
+from jbi100_app.data import COUNTRY_COL, freeze_frame, level_mask, market_proximity, get_dataset
+
+# Metric order of the weight and toggle columns of sweep_complex_scores
+SWEEP_KEYS = ("ASF", "IEC", "SCC", "WSI", "ERS")
+
+# Scenarios scored, sorted and ranked per block, so each block's intermediates
+# stay in cache
+SWEEP_CHUNK = 256
+# Largest rank histogram (entities x ranks) accumulated while sorting; above it,
+# the rank matrix is built and its medians counted a block of entities at a time
+SWEEP_HISTOGRAM = 2**22
+
+
+class ScoreCache:
+    """
+    Bounded LRU cache of composite score frames.
+
+    Entries are dropped least recently used first once there are more than
+    max_entries or they hold more than max_bytes. Cached frames are shared
+    between callers: their numeric columns are read-only (.copy() to modify).
+
+    Attributes:
+        hits, misses: lookups served from / missing in the cache
+        nbytes: memory held by the cached frames
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, frame):
+        frame = freeze_frame(frame)
+        size = int(frame.memory_usage(index=True, deep=False).sum())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (frame, size)
+            self.nbytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.nbytes -= dropped
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+SCORE_CACHE = ScoreCache()
 
 def compute_complex_scores(
     w_asf, w_iec, w_scc, w_wsi, w_ers,
-    t_asf, t_iec, t_scc, t_wsi, t_ers
+    t_asf, t_iec, t_scc, t_wsi, t_ers,
+    dataset=None,
+    edition=None,
+    w_prx=0,
+    t_prx=False,
+    selected=None,
 ) -> pd.DataFrame:
     """
     Calculate weighted composite scores from enabled metrics.
@@ -23,46 +102,296 @@ def compute_complex_scores(
     Args:
         w_asf, w_iec, w_scc, w_wsi, w_ers: Weights (0-100) for each metric
         t_asf, t_iec, t_scc, t_wsi, t_ers: Toggles (True/False) for each metric
+        dataset: Dataset to score (defaults to the current one from the registry)
+        edition: Factbook year to score when no dataset is given (None = current)
+        w_prx, t_prx: Weight and toggle of Market Proximity (PRX), the sixth metric
+        selected: Entity ids of the selected countries that PRX measures proximity
+            to (see data.store_ids); PRX is left out while nothing is selected
     
     Returns:
-        DataFrame with Country, individual metric columns, and Complex_Score
+        DataFrame with Country, individual metric columns, and Complex_Score;
+        shared through SCORE_CACHE, so its numeric columns are read-only
     """
-    scores = {}
-    weights = {}
+    if dataset is None:
+        dataset = get_dataset(edition)
 
     # Only include metrics that are toggled on
-    if t_asf:
-        scores["ASF"] = available_skilled_workforce()
-        weights["ASF"] = w_asf
-    if t_iec:
-        scores["IEC"] = industrial_energy_capacity()
-        weights["IEC"] = w_iec
-    if t_scc:
-        scores["SCC"] = supply_chain_connectivity_score()
-        weights["SCC"] = w_scc
-    if t_wsi:
-        scores["WSI"] = wage_sustainability_index()
-        weights["WSI"] = w_wsi
-    if t_ers:
-        scores["ERS"] = economic_resilience_score()
-        weights["ERS"] = w_ers
-
-    # Return empty if no metrics are enabled
-    if not scores:
-        return pd.DataFrame({"Country": [], "Complex_Score": []})
-
-    # Merge all enabled metrics into a single DataFrame
-    result_df = None
-    for name, series in scores.items():
-        temp_df = pd.DataFrame({"Country": series.index, name: series.values})
-        result_df = temp_df if result_df is None else result_df.merge(temp_df, on="Country", how="outer")
-
-    # Calculate weighted average of enabled metrics
-    total_weight = sum(weights.values()) or 1
-    score_cols = list(scores.keys())
-    result_df["Complex_Score"] = 0
-    for col in score_cols:
-        # Normalize by total weight and add to composite score
-        result_df["Complex_Score"] += (weights[col] / total_weight) * result_df[col].fillna(0)
-
-    return result_df[["Country", "Complex_Score"] + score_cols]
+    weights = {}
+    for key, weight, enabled in (
+        ("ASF", w_asf, t_asf),
+        ("IEC", w_iec, t_iec),
+        ("SCC", w_scc, t_scc),
+        ("WSI", w_wsi, t_wsi),
+        ("ERS", w_ers, t_ers),
+    ):
+        if enabled:
+            weights[key] = weight
+
+    use_prx = bool(t_prx) and selected is not None and len(selected) > 0
+    if use_prx:
+        weights["PRX"] = w_prx
+
+    # Key: the composite only depends on weight / total weight of each enabled
+    # metric (computed as in MetricMatrix.composite, so equal keys give equal
+    # scores), plus the selection PRX measures proximity to
+    total = sum(weights.values()) or 1
+    key = (
+        dataset.version,
+        tuple((k, weights[k] / total) for k in weights),
+        tuple(np.unique(np.asarray(selected)).tolist()) if use_prx else None,
+    )
+    scores = SCORE_CACHE.get(key)
+    if scores is not None:
+        return scores
+
+    # PRX depends on the selection, so it is aligned per call
+    extra = {"PRX": market_proximity(selected, dataset)} if use_prx else {}
+
+    # Weighted average of the enabled metrics as one masked product over the
+    # dataset's aligned metric matrix (missing values count as 0)
+    return SCORE_CACHE.put(key, dataset.metric_matrix.composite(weights, extra))
+
+
+@dataclass(frozen=True)
+class WeightSweep:
+    """
+    Complex scores of K weight scenarios over N entities.
+
+    The rank aggregates are computed by sweep_complex_scores; the (K, N) score and
+    rank matrices are only built when first read (scores: one matrix product,
+    ranks: another sort of every scenario) and then kept.
+
+    Attributes:
+        names  : the N entities (those of the level with at least one metric), sorted
+        best, worst : (N,) best and worst rank over the scenarios that rank the
+                 entity (0 if none does)
+        median : (N,) median rank over those scenarios (NaN if none does)
+        scores : (K, N) float64 composite scores; NaN where none of the scenario's
+                 enabled metrics covers the entity
+        ranks  : (K, N) unsigned ints, 1 = best score in that scenario; 0 where the
+                 score is NaN (not ranked)
+    """
+    names: np.ndarray
+    best: np.ndarray
+    worst: np.ndarray
+    median: np.ndarray
+    # (K, 5) enabled weights over their sum, (5, N) metric values (missing = 0) and
+    # the flat (scenario, entity) positions without a score
+    weights: np.ndarray = field(repr=False)
+    filled: np.ndarray = field(repr=False)
+    unranked_at: np.ndarray = field(repr=False)
+
+    @cached_property
+    def scores(self) -> np.ndarray:
+        # Block by block, as sorted: BLAS may round a row differently in another shape
+        scores = np.empty((len(self.weights), len(self.names)))
+        for start in range(0, len(scores), SWEEP_CHUNK):
+            np.dot(self.weights[start:start + SWEEP_CHUNK], self.filled, out=scores[start:start + SWEEP_CHUNK])
+        scores.reshape(-1)[self.unranked_at] = np.nan
+        return scores
+
+    @cached_property
+    def ranks(self) -> np.ndarray:
+        k, n = len(self.weights), len(self.names)
+        ranks = np.zeros((k, n), dtype=np.min_scalar_type(n))
+        descending = np.arange(n, 0, -1, dtype=ranks.dtype)
+        for start, stop, order in _sweep_orders(self.weights, self.filled, self.unranked_at):
+            np.put_along_axis(ranks[start:stop], order, descending, axis=1)
+        ranks.reshape(-1)[self.unranked_at] = 0
+        return ranks
+
+    def summary(self) -> pd.DataFrame:
+        """Country, best_rank, median_rank, worst_rank; best median rank first."""
+        return pd.DataFrame({
+            "Country": self.names,
+            "best_rank": self.best,
+            "median_rank": self.median,
+            "worst_rank": self.worst,
+        }).sort_values(["median_rank", "best_rank"], kind="stable").reset_index(drop=True)
+
+
+# Per block of SWEEP_CHUNK scenarios: (start, stop, order), order[i] being the
+# entities of scenario start + i sorted by score, ascending. Each score's bits (as
+# an int64 whose order is the float's) are sorted with the entity in the low bits
+# in place of the last mantissa bits, so equal keys cannot occur and the entity
+# comes for free. Rows where two neighbours share those truncated bits may hold
+# exact ties or be in the wrong order: they are re-sorted with an argsort of the
+# exact scores, then on (tie group, descending entity), so that read from the
+# top, ties rank in name order. Unranked entities sort first, larger ones first.
+def _sweep_orders(weights, filled, unranked_at):
+    k, n = len(weights), filled.shape[1]
+    low = max(1, (n - 1).bit_length())
+    entity = np.arange(n)
+    entity_bits = (1 << low) - 1
+    # Negative floats sort in reverse as ints: flip their magnitude bits, and
+    # shift them up by one so that -0.0 meets 0.0
+    signed = bool(np.signbit(filled).any())
+    block_buf = np.empty((min(k, SWEEP_CHUNK), n))
+    keys_buf = np.empty(block_buf.shape, dtype=np.int64)
+    bounds = np.searchsorted(unranked_at, np.arange(0, k + SWEEP_CHUNK, SWEEP_CHUNK) * n)
+    for i, start in enumerate(range(0, k, SWEEP_CHUNK)):
+        stop = min(start + SWEEP_CHUNK, k)
+        block, keys = block_buf[:stop - start], keys_buf[:stop - start]
+        np.dot(weights[start:stop], filled, out=block)
+        bits = block.view(np.int64)
+        if signed:
+            sign = bits >> 63
+            np.bitwise_xor(bits, sign & np.iinfo(np.int64).max, out=keys)
+            keys -= sign
+            keys &= -1 << low
+        else:
+            np.bitwise_and(bits, -1 << low, out=keys)
+        keys |= entity
+        at = unranked_at[bounds[i]:bounds[i + 1]] - start * n
+        keys.reshape(-1)[at] = np.iinfo(np.int64).min + ((n - 1 - at % n) << low | at % n)
+
+        keys.sort(axis=1)
+        order = keys & entity_bits
+        keys &= ~entity_bits
+        tied = np.flatnonzero((keys[:, 1:] == keys[:, :-1]).any(axis=1))
+        if len(tied):
+            exact = block[tied]
+            rows, unranked = np.divmod(at, n)
+            in_tied = np.isin(rows, tied)
+            exact[np.searchsorted(tied, rows[in_tied]), unranked[in_tied]] = -np.inf
+            exact_order = np.argsort(exact, axis=1)
+            ordered = np.take_along_axis(exact, exact_order, axis=1)
+            group = np.zeros(exact.shape, dtype=np.intp)
+            np.cumsum(ordered[:, 1:] != ordered[:, :-1], axis=1, out=group[:, 1:])
+            order[tied] = (n - 1) - np.sort(group * n + (n - 1) - exact_order, axis=1) % n
+        yield start, stop, order
+
+
+# Median rank per entity from its rank histogram (counts[e, r] = scenarios that
+# rank entity e at r; column 0, unranked, is ignored)
+def _median_from_counts(counts):
+    counts = counts[:, 1:]
+    cum = counts.cumsum(axis=1)
+    m = counts.sum(axis=1)
+    # Ranks at the 1-based positions of the middle value(s) among the ranked scenarios
+    lo = (cum < ((m + 1) // 2)[:, None]).sum(axis=1) + 1
+    hi = (cum < (m // 2 + 1)[:, None]).sum(axis=1) + 1
+    return np.where(m > 0, (lo + hi) / 2, np.nan)
+
+
+# Rank histogram (entity x rank 0..n) of a (scenarios, entities) rank block
+def _rank_counts(ranks, n):
+    flat = ranks.astype(np.intp)
+    flat += np.arange(ranks.shape[1]) * (n + 1)
+    return np.bincount(flat.ravel(), minlength=ranks.shape[1] * (n + 1)).reshape(-1, n + 1)
+
+
+# Median rank per entity when the full histogram would be too large: built a
+# block of entities at a time
+def _median_ranks(ranks, n):
+    k, n_cols = ranks.shape
+    step = max(1, min(SWEEP_HISTOGRAM // max(k, 1), SWEEP_HISTOGRAM // (n + 1)))
+    return np.concatenate([_median_from_counts(_rank_counts(ranks[:, i:i + step], n))
+                           for i in range(0, n_cols, step)] or [np.empty(0)])
+
+
+# Rank histogram (entity x rank 0..n) straight from the sorted blocks, without
+# building the rank matrix: position p of a row holds rank n - p, so rows are
+# counted by (position, entity), bin p * n + entity
+def _position_counts(weights, filled, unranked_at):
+    n = filled.shape[1]
+    shift = np.arange(n) * n
+    by_position = np.zeros(n * n, dtype=np.intp)
+    for _, _, order in _sweep_orders(weights, filled, unranked_at):
+        order += shift
+        by_position += np.bincount(order.reshape(-1), minlength=n * n)
+
+    # Unranked entities were sorted first, larger entities first: take them back
+    # out of the low positions they were counted at
+    rows, entities = np.divmod(unranked_at, max(n, 1))
+    position = np.searchsorted(rows, rows, side="right") - 1 - np.arange(len(rows))
+    by_position -= np.bincount(position * n + entities, minlength=n * n)
+
+    counts = np.zeros((n, n + 1), dtype=np.intp)
+    counts[:, 0] = np.bincount(entities, minlength=n)
+    counts[:, 1:] = by_position.reshape(n, n)[::-1].T
+    return counts
+
+
+def sweep_complex_scores(weights, toggles=True, dataset=None, edition=None, level="country") -> WeightSweep:
+    """
+    Score and rank many weight scenarios at once (scenario analysis).
+
+    Scenario k scores every entity as compute_complex_scores would with weights
+    weights[k] and toggles toggles[k] (Market Proximity is left out, it depends
+    on a selection), up to floating-point rounding: the enabled weights are
+    divided by their sum and applied to the aligned metric matrix, one matrix
+    product per block of scenarios. Ranks follow the exact scores, sorted a block
+    at a time; equal scores rank in entity name order.
+
+    Args:
+        weights: (K, 5) finite, non-negative weights in SWEEP_KEYS order, or one row
+        toggles: (K, 5) or (5,) booleans, or one bool for every metric
+        dataset: Dataset to score (defaults to the current one from the registry)
+        edition: Factbook year to score when no dataset is given (None = current)
+        level: 'country' or 'admin1' - which entities are scored and ranked
+
+    Returns:
+        WeightSweep with the per-entity rank aggregates; its (K, N) scores and
+        ranks are built on first access
+    """
+    if dataset is None:
+        dataset = get_dataset(edition)
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    if weights.ndim != 2 or weights.shape[1] != len(SWEEP_KEYS):
+        raise ValueError(f"weights must have shape (K, {len(SWEEP_KEYS)}), got {weights.shape}")
+    if not np.isfinite(weights).all():
+        raise ValueError("weights must be finite")
+    if (weights < 0).any():
+        raise ValueError("weights must be non-negative")
+    toggles = np.broadcast_to(np.asarray(toggles, dtype=bool), weights.shape)
+
+    # Entities of the level covered by at least one metric, in matrix (name) order
+    mm = dataset.metric_matrix
+    cols = [mm.col_index[key] for key in SWEEP_KEYS]
+    level_names = dataset.frame.loc[level_mask(level, dataset), COUNTRY_COL]
+    rows = np.flatnonzero(mm.index.isin(level_names) & mm.present[:, cols].any(axis=1))
+    filled = np.ascontiguousarray(mm.filled[np.ix_(rows, cols)].T)
+    n = len(rows)
+
+    # Enabled weights over their sum (1 if 0), as in MetricMatrix.composite
+    # (> 0 keeps -0.0 weights out, so scores of non-negative metrics are never -0.0)
+    w = np.where(toggles & (weights > 0), weights, 0.0)
+    total = w.sum(axis=1, keepdims=True)
+    w /= np.where(total == 0, 1.0, total)
+
+    # covered[t, e]: entity e has one of the metrics in toggle pattern t (a 5-bit
+    # code); the others are unranked in scenarios with that pattern
+    bits = 1 << np.arange(len(SWEEP_KEYS))
+    pattern = toggles @ bits
+    covered = (np.arange(2 ** len(SWEEP_KEYS))[:, None] & (mm.present[np.ix_(rows, cols)] @ bits)) != 0
+    partial = np.flatnonzero(~covered.all(axis=1)[pattern])
+    scenario, entity = np.nonzero(~covered[pattern[partial]])
+    unranked_at = partial[scenario] * n + entity
+
+    sweep = dict(names=mm.names[rows], weights=w, filled=filled, unranked_at=unranked_at)
+    if 0 < n * n <= SWEEP_HISTOGRAM:
+        counts = _position_counts(w, filled, unranked_at)
+        ranked = counts[:, 1:] > 0
+        seen = ranked.any(axis=1)
+        dtype = np.min_scalar_type(n)
+        return WeightSweep(
+            best=np.where(seen, ranked.argmax(axis=1) + 1, 0).astype(dtype),
+            worst=np.where(seen, n - ranked[:, ::-1].argmax(axis=1), 0).astype(dtype),
+            median=_median_from_counts(counts),
+            **sweep,
+        )
+
+    # No entities, or too many for a (position, entity) histogram: aggregate the rank
+    # matrix, which the sweep then keeps
+    ranks = WeightSweep(best=None, worst=None, median=None, **sweep).ranks
+    # Unranked scenarios (rank 0) wrap to the dtype's maximum under "- 1", so they
+    # never win the minimum; an entity ranked nowhere wraps back to 0
+    result = WeightSweep(
+        best=(ranks - 1).min(axis=0, initial=np.iinfo(ranks.dtype).max) + 1,
+        worst=ranks.max(axis=0, initial=0),
+        median=_median_ranks(ranks, n),
+        **sweep,
+    )
+    vars(result)["ranks"] = ranks
+    return result
@@ -6,12 +6,37 @@ from __future__ import annotations
 
 from pathlib import Path
 from functools import lru_cache
+import hashlib
+import os
 import re
-import difflib
+import sys
+import tempfile
+import threading
 import unicodedata
 
 import pandas as pd
 
+from jbi100_app.utils.fuzzy_match import TrigramIndex
+from jbi100_app.utils.snapshot import code_fingerprint
+
+
+ISO_PATH = Path(__file__).parent / "all.csv"
+
+# Persisted raw name -> iso_key -> iso3 table, built from the resolver below.
+# The first line records the resolver key (hash of all.csv, ALIASES and the
+# matching code); a table written under another key is discarded.
+RESOLUTION_PATH = Path(__file__).parent / "country_resolution.csv"
+
+# Minimum SequenceMatcher ratio for a fuzzy name match (kept fairly strict)
+FUZZY_CUTOFF = 0.85
+
+# all.csv region columns -> column names attached to the dataset
+REGION_COLUMNS = {
+    "region": "region",
+    "sub-region": "sub_region",
+    "intermediate-region": "intermediate_region",
+}
+
 
 # Maps non-standard country names in CIA data to ISO standard names
 # e.g., "Burma" -> "Myanmar", "Russia" -> "Russian Federation"
@@ -93,24 +118,59 @@ def _norm(s: str) -> str:
     return s
 
 
+# Translation tables for normalize_names(): one pass each instead of a regex per rule
+_PUNCT_TABLE = str.maketrans({
+    "&": " AND ",
+    "’": None, "'": None,                                  # remove apostrophes
+    "(": " ", ")": " ", ".": " ", ",": " ", "-": " ",      # punctuation -> space
+})
+
+
+@lru_cache(maxsize=1)
+def _combining_table() -> dict:
+    """Every combining code point -> None (what _strip_accents drops)."""
+    return {cp: None for cp in range(sys.maxunicode + 1) if unicodedata.combining(chr(cp))}
+
+
+def normalize_names(names) -> list[str]:
+    """
+    Batch version of _norm: same output, aligned with `names`.
+    Each distinct value is normalized once; ASCII names skip the Unicode
+    decomposition, and the punctuation rules are a single str.translate.
+    (str.split() splits on exactly the characters the regex \\s matches.)
+    """
+    names = list(names)
+    combining = None
+    table = {}
+    for value in dict.fromkeys(names):
+        s = str(value).strip()
+        if not s.isascii():
+            if combining is None:
+                combining = _combining_table()
+            s = unicodedata.normalize("NFKD", s).translate(combining)
+        table[value] = " ".join(s.upper().translate(_PUNCT_TABLE).split())
+    return [table[value] for value in names]
+
+
 @lru_cache(maxsize=1)
 def _iso_table() -> pd.DataFrame:
     """
     Load ISO metadata from utils/all.csv. Expects columns: name, alpha-3.
-    Region data is ignored/optional because regions are no longer used.
+    Region columns (region, sub-region, intermediate-region) are optional.
     """
-    path = Path(__file__).parent / "all.csv"
+    path = ISO_PATH
     if not path.exists():
         raise FileNotFoundError(
             "Missing jbi100_app/utils/all.csv. Place the ISO reference file there."
         )
 
-    iso = pd.read_csv(path)
+    # Only empty cells are missing: "NA" is Namibia's alpha-2 code
+    iso = pd.read_csv(path, keep_default_na=False, na_values=[""])
     if "name" not in iso.columns or "alpha-3" not in iso.columns:
         raise ValueError("all.csv must contain at least columns: name, alpha-3")
 
     # Normalize ISO names using the same normalization as the dataset
-    iso["iso_key"] = iso["name"].apply(_norm)
+    iso["iso_key"] = normalize_names(iso["name"])
     return iso
 
 
@@ -122,20 +182,43 @@ def _iso_maps():
     return iso_keys, a3_map
 
 
+@lru_cache(maxsize=1)
+def _region_maps() -> dict[str, dict[str, str]]:
+    """Attached column -> {iso3: region name}; codes without that level are left out."""
+    iso = _iso_table()
+    maps = {}
+    for src, col in REGION_COLUMNS.items():
+        sub = iso[["alpha-3", src]].dropna() if src in iso.columns else iso.iloc[:0]
+        maps[col] = dict(zip(sub["alpha-3"], sub[src]))
+    return maps
+
+
 @lru_cache(maxsize=1)
 def _norm_aliases():
     # Normalize aliases once so you can write them in a readable way above.
     return {_norm(k): _norm(v) for k, v in ALIASES.items()}
 
 
+@lru_cache(maxsize=1)
+def _fuzzy_index() -> TrigramIndex:
+    """Trigram index over the ISO keys plus the aliases that point at one."""
+    iso_keys, _ = _iso_maps()
+    keys = sorted(iso_keys)
+    aliases = sorted((k, v) for k, v in _norm_aliases().items() if v in iso_keys)
+    return TrigramIndex(keys + [k for k, _ in aliases], keys + [v for _, v in aliases])
+
+
 def resolve_iso_key(country_name: str) -> str | None:
     """
     Convert your dataset's Country string into the normalized iso_key used by utils/all.csv.
     Returns None if no match found.
     """
-    iso_keys, _ = _iso_maps()
-    c = _norm(country_name)
+    return _resolve_normalized(_norm(country_name))
 
+
+def _resolve_normalized(c: str) -> str | None:
+    """resolve_iso_key for a name that already went through _norm."""
+    iso_keys, _ = _iso_maps()
     if c in iso_keys:
         return c
 
@@ -145,9 +228,115 @@ def resolve_iso_key(country_name: str) -> str | None:
         if cand in iso_keys:
             return cand
 
-    # Fuzzy fallback (kept fairly strict)
-    match = difflib.get_close_matches(c, list(iso_keys), n=1, cutoff=0.85)
-    return match[0] if match else None
+    # Fuzzy fallback over ISO names and aliases
+    return _fuzzy_index().best_match(c, cutoff=FUZZY_CUTOFF)
+
+
+@lru_cache(maxsize=1)
+def _resolver_key() -> str:
+    """Changes whenever all.csv, ALIASES or the matching code changes."""
+    h = hashlib.sha1(ISO_PATH.read_bytes())
+    h.update(repr((sorted(ALIASES.items()), FUZZY_CUTOFF)).encode())
+    h.update(code_fingerprint(_strip_accents, _norm, normalize_names, _resolve_normalized,
+                              _fuzzy_index, TrigramIndex).encode())
+    return h.hexdigest()[:16]
+
+
+# raw name -> (iso_key, iso3); loaded from RESOLUTION_PATH once per process
+_resolved: dict[str, tuple[str | None, str | None]] | None = None
+_resolved_lock = threading.Lock()
+
+
+def _read_resolutions() -> dict:
+    try:
+        with open(RESOLUTION_PATH, encoding="utf-8") as fh:
+            if fh.readline().strip() != f"# resolver={_resolver_key()}":
+                return {}
+            table = pd.read_csv(fh, dtype=str, keep_default_na=False)
+    except (OSError, ValueError):
+        return {}
+    return {
+        name: (key or None, a3 or None)
+        for name, key, a3 in zip(table["name"], table["iso_key"], table["iso3"])
+    }
+
+
+def _write_resolutions(resolved: dict) -> None:
+    """Atomically rewrite the table; a read-only checkout just skips persisting."""
+    table = pd.DataFrame(
+        [(name, key or "", a3 or "") for name, (key, a3) in sorted(resolved.items())],
+        columns=["name", "iso_key", "iso3"],
+    )
+    try:
+        fd, tmp = tempfile.mkstemp(dir=RESOLUTION_PATH.parent, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as fh:
+            fh.write(f"# resolver={_resolver_key()}\n")
+            table.to_csv(fh, index=False)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, RESOLUTION_PATH)
+    except OSError:
+        pass
+    finally:
+        # Left behind only if writing or the rename failed
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def resolve_names(names) -> dict[str, tuple[str | None, str | None]]:
+    """
+    (iso_key, iso3) for every distinct name in `names`.
+    Names already in the persisted table are plain lookups; only new names go
+    through resolve_iso_key (regex + fuzzy matching), and are then added to it.
+    """
+    global _resolved
+    with _resolved_lock:
+        if _resolved is None:
+            _resolved = _read_resolutions()
+        new = [n for n in pd.unique(pd.Series(names, dtype=object).astype(str)) if n not in _resolved]
+        if new:
+            _, a3_map = _iso_maps()
+            resolved = dict(_resolved)
+            for name, normalized in zip(new, normalize_names(new)):
+                key = _resolve_normalized(normalized)
+                resolved[name] = (key, a3_map.get(key) if key else None)
+            _write_resolutions(resolved)
+            _resolved = resolved
+        return _resolved
+
+
+@lru_cache(maxsize=1)
+def _code_map() -> dict[str, str]:
+    """ISO alpha-3 and alpha-2 code -> alpha-3 code."""
+    iso = _iso_table()
+    codes = {a3.upper(): a3 for a3 in iso["alpha-3"]}
+    for a2, a3 in zip(iso["alpha-2"], iso["alpha-3"]):
+        if isinstance(a2, str) and a2:
+            codes.setdefault(a2.upper(), a3)
+    return codes
+
+
+def resolve_iso3(values) -> list[str | None]:
+    """
+    ISO alpha-3 code for every country name or ISO2/ISO3 code in `values` (None
+    where nothing matches), in input order. All values are normalized in one batch
+    and each distinct one is resolved once: codes first, then the name resolver.
+    Unlike resolve_names(), results are not added to the persisted table, so free
+    text typed by users does not end up in it.
+    """
+    normalized = normalize_names(["" if v is None else str(v) for v in values])
+    codes = _code_map()
+    _, a3_map = _iso_maps()
+    lookup = {}
+    for c in dict.fromkeys(normalized):
+        if c in codes:
+            lookup[c] = codes[c]
+        else:
+            key = _resolve_normalized(c) if c else None
+            lookup[c] = a3_map.get(key) if key else None
+    return [lookup[c] for c in normalized]
 
 
 def attach_country_meta(df: pd.DataFrame) -> pd.DataFrame:
@@ -157,11 +346,40 @@ def attach_country_meta(df: pd.DataFrame) -> pd.DataFrame:
             - iso_key : normalized country key used internally
             - iso3    : ISO alpha-3 code
             - country_display : title-cased country name for UI
+            - region, sub_region, intermediate_region : UN M49 groups from all.csv
+        Resolution is a dictionary map over the persisted name table; see
+        resolve_names().
+        """
+        names = df["Country"].astype(str)
+        resolved = resolve_names(names)
+
+        out = df.copy()
+        out["iso_key"] = names.map({n: key for n, (key, _) in resolved.items()})
+        out["iso3"] = names.map({n: a3 for n, (_, a3) in resolved.items() if a3})
+        out["country_display"] = names.str.title()
+        for col, regions in _region_maps().items():
+            out[col] = out["iso3"].map(regions)
+        return out
+
+
+def attach_admin1_meta(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Return a copy of an admin-1 table (Country = "<unit> (<parent>)" plus
+        Parent_Country) with the same metadata columns as attach_country_meta.
+        Units have no ISO3 code of their own:
+            - iso_key, iso3 : missing
+            - parent_iso3   : ISO alpha-3 code of the parent country
+            - country_display : title-cased unit name for UI
+            - region, sub_region, intermediate_region : those of the parent country
         """
-        _, a3_map = _iso_maps()
+        parents = df["Parent_Country"].astype(str)
+        resolved = resolve_names(parents)
 
         out = df.copy()
-        out["iso_key"] = out["Country"].apply(resolve_iso_key)
-        out["iso3"] = out["iso_key"].map(a3_map)
+        out["iso_key"] = None
+        out["iso3"] = None
+        out["parent_iso3"] = parents.map({n: a3 for n, (_, a3) in resolved.items() if a3})
         out["country_display"] = out["Country"].astype(str).str.title()
+        for col, regions in _region_maps().items():
+            out[col] = out["parent_iso3"].map(regions)
         return out
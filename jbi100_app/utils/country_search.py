@@ -0,0 +1,103 @@
+# Typeahead country search
+# A sorted index of normalized search terms (display names and every word inside
+# them, ALIASES keys, ISO2/ISO3 codes). A keystroke is two binary searches for the
+# range of terms starting with the query plus ranking that small range, so lookups
+# stay in the microsecond range regardless of how many countries are indexed.
+
+from __future__ import annotations
+
+from bisect import bisect_left
+
+import pandas as pd
+
+from jbi100_app.utils.country_meta import (
+    ALIASES,
+    _iso_maps,
+    _iso_table,
+    _norm,
+    normalize_names,
+)
+
+# Match kinds, best first
+CODE_EXACT, NAME_PREFIX, ALIAS_PREFIX, CODE_PREFIX, WORD_PREFIX = range(5)
+
+# Sorts after every character a normalized term can contain
+_HIGH = "\U0010ffff"
+
+
+class CountrySearch:
+    """
+    Prefix search over a fixed set of countries.
+
+    Args:
+        iso3: ISO alpha-3 code per country (the value a search returns)
+        display: label shown for each country
+        terms: (normalized term, country position, match kind) triples
+    """
+
+    def __init__(self, iso3: list[str], display: list[str], terms: list[tuple[str, int, int]]):
+        self.iso3 = list(iso3)
+        self.display = list(display)
+        terms = sorted(terms)
+        self._terms = [t for t, _, _ in terms]
+        self._owner = [i for _, i, _ in terms]
+        self._kind = [k for _, _, k in terms]
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "CountrySearch":
+        """Index the countries of an attach_country_meta() frame that have an ISO3 code."""
+        rows = frame.dropna(subset=["iso3"]).drop_duplicates("iso3")
+        iso3 = rows["iso3"].astype(str).str.upper().tolist()
+        display = rows["country_display"].astype(str).tolist()
+        pos = {code: i for i, code in enumerate(iso3)}
+
+        terms = []
+        for i, name in enumerate(normalize_names(rows["Country"])):
+            words = name.split(" ")
+            terms.append((name, i, NAME_PREFIX))
+            for w in range(1, len(words)):
+                terms.append((" ".join(words[w:]), i, WORD_PREFIX))
+
+        # Aliases point at ISO keys; keep those whose country is in the frame
+        _, a3_map = _iso_maps()
+        for alias, target in zip(normalize_names(ALIASES), normalize_names(ALIASES.values())):
+            i = pos.get(a3_map.get(target))
+            if i is not None:
+                terms.append((alias, i, ALIAS_PREFIX))
+
+        iso = _iso_table()
+        for a2, a3 in zip(iso["alpha-2"], iso["alpha-3"]):
+            i = pos.get(a3)
+            if i is None:
+                continue
+            terms.append((a3, i, CODE_PREFIX))
+            if isinstance(a2, str) and a2:
+                terms.append((a2.upper(), i, CODE_PREFIX))
+        return cls(iso3, display, terms)
+
+    def __len__(self) -> int:
+        return len(self.iso3)
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, str]]:
+        """
+        Up to `limit` (iso3, display) pairs whose terms start with the query,
+        ranked: exact code, name prefix, alias prefix, code prefix, later word
+        of a name; ties by shorter label, then alphabetically.
+        """
+        q = _norm(query) if query else ""
+        if not q:
+            return []
+        lo = bisect_left(self._terms, q)
+        hi = bisect_left(self._terms, q + _HIGH, lo)
+
+        best: dict[int, int] = {}
+        for j in range(lo, hi):
+            kind = self._kind[j]
+            if kind == CODE_PREFIX and self._terms[j] == q:
+                kind = CODE_EXACT
+            i = self._owner[j]
+            if kind < best.get(i, WORD_PREFIX + 1):
+                best[i] = kind
+
+        ranked = sorted(best, key=lambda i: (best[i], len(self.display[i]), self.display[i]))
+        return [(self.iso3[i], self.display[i]) for i in ranked[:limit]]
@@ -0,0 +1,62 @@
+# Background watcher for the data_sets directory
+# Polls a cheap stat-based fingerprint of the source files and calls a reload hook
+# when it changes, so refreshed CSVs are picked up without restarting the server.
+# Polling (instead of inotify) keeps it dependency-free and portable.
+
+from __future__ import annotations
+
+import threading
+import warnings
+from pathlib import Path
+from typing import Callable
+
+
+def stat_fingerprint(directory: Path, pattern: str = "*.csv") -> tuple:
+    """(relative path, size, mtime_ns) of every matching file; changes when any file does."""
+    entries = []
+    for p in sorted(directory.glob(pattern)):
+        try:
+            st = p.stat()
+        except OSError:
+            continue  # file vanished between glob and stat
+        entries.append((p.relative_to(directory).as_posix(), st.st_size, st.st_mtime_ns))
+    return tuple(entries)
+
+
+class DataWatcher(threading.Thread):
+    """
+    Daemon thread that calls on_change() whenever fingerprint() returns a new value.
+
+    A change is only acted on once it has been stable for one extra poll, so a
+    file that is still being written is not loaded half-way. If on_change()
+    raises, the error is reported and the reload is retried on the next change.
+    """
+
+    def __init__(self, fingerprint: Callable[[], object], on_change: Callable[[], object],
+                 interval: float = 30.0):
+        super().__init__(name="data-watcher", daemon=True)
+        self._fingerprint = fingerprint
+        self._on_change = on_change
+        self._interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        current = self._fingerprint()
+        pending = None
+        while not self._stop_event.wait(self._interval):
+            latest = self._fingerprint()
+            if latest == current:
+                pending = None
+                continue
+            if latest != pending:
+                pending = latest  # wait one more poll for writes to settle
+                continue
+            try:
+                self._on_change()
+                current = latest
+            except Exception as exc:  # keep serving the previous version
+                warnings.warn(f"Data reload failed, keeping previous version: {exc!r}")
+            pending = None
@@ -0,0 +1,115 @@
+# Index-aligned join of many per-country indicator files
+# Each file is indexed once by its normalized country key and the wide table is
+# built with a single aligned concat, instead of k-1 chained outer merges that
+# each copy the growing frame.
+# Also reports problems a chained merge would silently hide: repeated countries
+# inside a file and the same column name appearing in several files.
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class JoinReport:
+    """Problems found while joining; empty (falsy) when the inputs were clean."""
+    missing_keys: dict[str, int] = field(default_factory=dict)             # source -> rows without a country
+    duplicate_keys: dict[str, list[str]] = field(default_factory=dict)     # source -> repeated country keys
+    duplicate_columns: dict[str, list[str]] = field(default_factory=dict)  # column -> sources, values agree
+    conflicting_columns: dict[str, list[str]] = field(default_factory=dict)  # column -> sources, values differ
+
+    def __bool__(self) -> bool:
+        return bool(self.missing_keys or self.duplicate_keys
+                    or self.duplicate_columns or self.conflicting_columns)
+
+    def __str__(self) -> str:
+        lines = []
+        for src, n in self.missing_keys.items():
+            lines.append(f"{src}: {n} row(s) without a country were dropped")
+        for src, keys in self.duplicate_keys.items():
+            lines.append(f"{src}: repeated countries kept once: {', '.join(keys[:10])}"
+                         + (" ..." if len(keys) > 10 else ""))
+        for col, srcs in self.duplicate_columns.items():
+            lines.append(f"column '{col}' appears in {', '.join(srcs)} (identical values, kept first)")
+        for col, srcs in self.conflicting_columns.items():
+            lines.append(f"column '{col}' differs between {', '.join(srcs)} (kept {srcs[0]})")
+        return "; ".join(lines)
+
+
+def country_key(values) -> np.ndarray:
+    """Normalized join key: trimmed, upper-cased country name."""
+    return np.array([str(v).strip().upper() for v in values], dtype=object)
+
+
+def _same_values(a: pd.Series, b: pd.Series) -> bool:
+    """Compare two columns on their shared keys, treating NaN == NaN."""
+    common = a.index.intersection(b.index)
+    x = a.loc[common].to_numpy(dtype=object)
+    y = b.loc[common].to_numpy(dtype=object)
+    both_missing = pd.isna(x) & pd.isna(y)
+    return bool(np.all(both_missing | (x == y)))
+
+
+def aligned_join(frames: dict[str, pd.DataFrame], key_col: str = "Country") -> tuple[pd.DataFrame, JoinReport]:
+    """
+    Outer-join per-country frames on their normalized key_col.
+
+    Args:
+        frames: source name -> frame containing key_col (joined in dict order)
+        key_col: country column shared by all frames
+
+    Returns:
+        (wide frame sorted by key with key_col first, JoinReport)
+        key_col holds the first non-missing original name across sources.
+    """
+    report = JoinReport()
+    display: dict[str, object] = {}
+    blocks = []
+    seen: dict[str, tuple[str, pd.DataFrame]] = {}
+
+    for src, df in frames.items():
+        if key_col not in df.columns:
+            raise ValueError(f"'{src}' is missing a '{key_col}' column.")
+
+        missing = df[key_col].isna().to_numpy()
+        if missing.any():
+            report.missing_keys[src] = int(missing.sum())
+            df = df[~missing]
+
+        raw_names = df[key_col].to_numpy()
+        key = country_key(raw_names)
+        dup = pd.Index(key).duplicated()
+        if dup.any():
+            report.duplicate_keys[src] = sorted(set(key[dup]))
+            df = df[~dup]
+            key = key[~dup]
+            raw_names = raw_names[~dup]
+
+        # First spelling seen for each key wins
+        for k, name in zip(key, raw_names):
+            display.setdefault(k, name)
+
+        df = df.set_axis(pd.Index(key), axis=0)
+        keep = []
+        for col in df.columns:
+            if col == key_col:
+                continue
+            if col in seen:
+                first_src, first = seen[col]
+                same = _same_values(first[col], df[col])
+                bucket = report.duplicate_columns if same else report.conflicting_columns
+                bucket.setdefault(col, [first_src]).append(src)
+                continue
+            seen[col] = (src, df)
+            keep.append(col)
+        blocks.append(df[keep])
+
+    if not blocks:
+        return pd.DataFrame({key_col: []}), report
+
+    wide = pd.concat(blocks, axis=1, join="outer", sort=True).sort_index()
+    wide.insert(0, key_col, [display[k] for k in wide.index])
+    return wide.reset_index(drop=True), report
@@ -0,0 +1,111 @@
+# Trigram-indexed fuzzy string matcher
+# Replaces difflib.get_close_matches for resolving country names. Candidates are
+# indexed once by their padded character trigrams; a query only scores the
+# candidates that share a trigram with it and pass difflib's length and
+# character-count bounds (computed for all of them at once), instead of running
+# SequenceMatcher against every candidate.
+# Scoring is difflib's own (real_quick_ratio -> quick_ratio -> ratio, best by
+# (score, candidate)), so results and the cutoff mean the same as before.
+
+from __future__ import annotations
+
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Iterable
+
+import numpy as np
+
+
+def trigrams(s: str) -> set[str]:
+    """Character trigrams of s padded with two leading and one trailing space."""
+    padded = f"  {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index trigram -> candidate ids over a fixed list of strings.
+
+    Args:
+        keys: candidate strings (already normalized); repeated keys keep the first
+        targets: value returned for each key (default: the key itself), e.g. the
+            ISO key an alias points to
+    """
+
+    def __init__(self, keys: Iterable[str], targets: Iterable[str] | None = None):
+        keys = list(keys)
+        targets = keys if targets is None else list(targets)
+        if len(targets) != len(keys):
+            raise ValueError("keys and targets must have the same length")
+
+        self.keys: list[str] = []
+        self.targets: list[str] = []
+        seen = set()
+        for key, target in zip(keys, targets):
+            if key in seen:
+                continue
+            seen.add(key)
+            self.keys.append(key)
+            self.targets.append(target)
+
+        self._lengths = np.array([len(k) for k in self.keys], dtype=float)
+
+        # Character counts per candidate, for a vectorized quick_ratio
+        self._char_ids = {ch: j for j, ch in enumerate(sorted(set("".join(self.keys))))}
+        self._char_counts = np.zeros((len(self.keys), len(self._char_ids)), dtype=np.int32)
+        for i, key in enumerate(self.keys):
+            for ch in key:
+                self._char_counts[i, self._char_ids[ch]] += 1
+
+        postings = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings[gram].append(i)
+        self._postings = {g: np.array(ids, dtype=np.intp) for g, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def shortlist(self, query: str, cutoff: float = 0.0) -> np.ndarray:
+        """
+        Ids of candidates sharing at least one trigram with query whose length and
+        character counts allow a ratio >= cutoff, most shared trigrams first.
+        """
+        lists = [self._postings[g] for g in trigrams(query) if g in self._postings]
+        if not lists:
+            return np.empty(0, dtype=np.intp)
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.keys))
+        ids = np.flatnonzero(counts)
+
+        # SequenceMatcher.real_quick_ratio, vectorized
+        lq = float(len(query))
+        lk = self._lengths[ids]
+        keep = 2.0 * np.minimum(lk, lq) / (lk + lq) >= cutoff
+        ids, lk = ids[keep], lk[keep]
+
+        # SequenceMatcher.quick_ratio (shared character multiset), vectorized
+        q = np.zeros(len(self._char_ids), dtype=np.int32)
+        for ch in query:
+            j = self._char_ids.get(ch)
+            if j is not None:
+                q[j] += 1
+        shared = np.minimum(self._char_counts[ids], q).sum(axis=1)
+        ids = ids[2.0 * shared / (lk + lq) >= cutoff]
+        return ids[np.argsort(-counts[ids], kind="stable")]
+
+    def best_match(self, query: str, cutoff: float = 0.6) -> str | None:
+        """
+        Target of the candidate most similar to query with a SequenceMatcher ratio
+        of at least cutoff, or None. Ties go to the larger candidate string, like
+        difflib.get_close_matches(query, keys, n=1, cutoff=cutoff).
+        """
+        sm = SequenceMatcher()
+        sm.set_seq2(query)
+        best = None
+        for i in self.shortlist(query, cutoff):
+            key = self.keys[i]
+            sm.set_seq1(key)
+            score = sm.ratio()
+            if score >= cutoff and (best is None or (score, key) > best[:2]):
+                best = (score, key, i)
+        return None if best is None else self.targets[best[2]]
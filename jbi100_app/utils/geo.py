@@ -0,0 +1,104 @@
+# Geographic coordinates and country-to-country distances
+# The Factbook's Geographic_Coordinates text ("33 00 N, 65 00 E") is parsed into
+# decimal latitude/longitude. Great-circle distances between all countries are
+# computed once per dataset as a dense haversine matrix (a few hundred countries is
+# well under 1 MB), so "nearest N", "within R km" and distance to a selection are
+# plain array reductions instead of per-pair trigonometry on every request. Past
+# DENSE_LIMIT entities (e.g. with admin-1 units) the matrix would not fit in
+# memory, and only the columns a query needs are computed, on demand.
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# Mean Earth radius (IUGG)
+EARTH_RADIUS_KM = 6371.0088
+
+# Largest entity count that gets a precomputed (n, n) distance matrix (~32 MB)
+DENSE_LIMIT = 2000
+
+# Degrees, minutes, hemisphere for latitude then longitude. Entries that list
+# several places ("metropolitan France: 46 00 N, 2 00 E; ...") use the first one.
+_COORD_PATTERN = r"(\d+)\s+(\d+)\s*([NS]),\s*(\d+)\s+(\d+)\s*([EW])"
+
+
+def parse_coordinates(values) -> tuple[np.ndarray, np.ndarray]:
+    """Decimal (latitude, longitude) arrays for Factbook coordinate strings; NaN where unparseable."""
+    parts = pd.Series(values, dtype=object).fillna("").astype(str).str.extract(_COORD_PATTERN)
+    lat = parts[0].astype(float) + parts[1].astype(float) / 60.0
+    lon = parts[3].astype(float) + parts[4].astype(float) / 60.0
+    lat = np.where(parts[2] == "S", -lat, lat)
+    lon = np.where(parts[5] == "W", -lon, lon)
+    return lat.astype(float), lon.astype(float)
+
+
+def haversine_matrix(lat: np.ndarray, lon: np.ndarray, cols: np.ndarray | None = None) -> np.ndarray:
+    """
+    (n, n) great-circle distances in km between all points, or (n, len(cols)) to the
+    points in cols only; NaN rows/columns for missing coordinates.
+    """
+    phi = np.radians(np.asarray(lat, dtype=float))
+    lam = np.radians(np.asarray(lon, dtype=float))
+    phi_c, lam_c = (phi, lam) if cols is None else (phi[cols], lam[cols])
+    dphi = phi[:, None] - phi_c[None, :]
+    dlam = lam[:, None] - lam_c[None, :]
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi)[:, None] * np.cos(phi_c)[None, :] * np.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ProximityIndex:
+    """
+    Pairwise distances between countries, indexed by country id
+    (IndicatorMatrix row). Precomputed up to DENSE_LIMIT entities (`distances`),
+    computed per query above that (`distances` is then None).
+
+    Args:
+        lat, lon: decimal coordinates per country id (NaN where unknown)
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.valid = ~(np.isnan(self.lat) | np.isnan(self.lon))
+        self.distances = None
+        if len(self.lat) <= DENSE_LIMIT:
+            self.distances = haversine_matrix(self.lat, self.lon)
+            self.distances.setflags(write=False)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def _columns(self, cols: np.ndarray) -> np.ndarray:
+        """(n, len(cols)) distances from every country to the countries in cols."""
+        if self.distances is not None:
+            return self.distances[:, cols]
+        return haversine_matrix(self.lat, self.lon, cols)
+
+    def nearest(self, i: int, n: int = 5) -> tuple[np.ndarray, np.ndarray]:
+        """Ids and distances (km) of the n countries closest to country i, nearest first."""
+        if not self.valid[i]:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        d = np.where(self.valid, self._columns(np.array([i]))[:, 0], np.inf)
+        d[i] = np.inf
+        n = min(n, int(np.isfinite(d).sum()))
+        if n <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        ids = np.argpartition(d, n - 1)[:n]
+        ids = ids[np.argsort(d[ids], kind="stable")]
+        return ids, d[ids]
+
+    def distance_to(self, mask: np.ndarray) -> np.ndarray:
+        """Distance (km) from every country to the closest country in mask; NaN if undefined."""
+        cols = np.flatnonzero(np.asarray(mask, dtype=bool) & self.valid)
+        if cols.size == 0:
+            return np.full(len(self), np.nan)
+        d = self._columns(cols).min(axis=1)
+        d[~self.valid] = np.nan
+        return d
+
+    def within(self, mask: np.ndarray, radius_km: float) -> np.ndarray:
+        """Boolean mask of the countries (outside mask) within radius_km of any country in mask."""
+        with np.errstate(invalid="ignore"):
+            near = self.distance_to(mask) <= radius_km
+        return near & ~np.asarray(mask, dtype=bool)
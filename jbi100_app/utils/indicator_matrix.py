@@ -0,0 +1,127 @@
+# Compact country x indicator matrix with interned country ids
+# The numeric part of the dataset is held as one contiguous float64 block; every
+# country gets a dense integer id (its row), and ISO3 / name lookups are plain dict
+# hits instead of uppercasing and scanning DataFrame columns on every callback.
+
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+def _key(value) -> str:
+    return str(value).strip().upper()
+
+
+class IndicatorMatrix:
+    """
+    Read-only country x indicator matrix.
+
+    Attributes:
+        values  : (n_countries, n_indicators) float64 array, C-contiguous
+        columns : indicator names, aligned with values' columns
+        names   : dataset country names (row id -> name)
+        iso3    : ISO alpha-3 codes ("" where unresolved)
+        display : title-cased names for the UI
+    """
+
+    def __init__(self, values: np.ndarray, columns: list[str], names: np.ndarray,
+                 iso3: np.ndarray, display: np.ndarray):
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self.values.setflags(write=False)
+        self.columns = list(columns)
+        self.col_index = {c: i for i, c in enumerate(self.columns)}
+        self.names = names
+        self.iso3 = iso3
+        self.display = display
+
+        # First occurrence wins if a key appears twice
+        self._by_iso3: dict[str, int] = {}
+        self._by_name: dict[str, int] = {}
+        for i, (name, code) in enumerate(zip(names, iso3)):
+            if code:
+                self._by_iso3.setdefault(code, i)
+            self._by_name.setdefault(_key(name), i)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, country_col: str = "Country") -> "IndicatorMatrix":
+        """Build from a frame with Country/iso3/country_display plus numeric columns."""
+        numeric = [c for c in frame.columns if pd.api.types.is_numeric_dtype(frame[c])]
+        iso3 = frame["iso3"].fillna("").astype(str).str.upper().to_numpy() if "iso3" in frame else \
+            np.full(len(frame), "", dtype=object)
+        display = frame["country_display"].to_numpy() if "country_display" in frame else \
+            frame[country_col].astype(str).str.title().to_numpy()
+        return cls(
+            frame[numeric].to_numpy(dtype=float),
+            numeric,
+            frame[country_col].to_numpy(),
+            iso3,
+            display,
+        )
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def id_of(self, key) -> int | None:
+        """
+        Row id for an ISO3 code or a country name (case-insensitive), or an entity
+        id itself when it is in range; else None.
+        """
+        if key is None or isinstance(key, bool):
+            return None
+        if isinstance(key, (int, np.integer)):
+            return int(key) if 0 <= key < len(self) else None
+        k = _key(key)
+        i = self._by_iso3.get(k)
+        if i is None:
+            i = self._by_name.get(k)
+        return i
+
+    def ids_of(self, keys: Iterable) -> np.ndarray:
+        """Row ids for many ISO3 codes / names / ids; unknown keys are skipped."""
+        ids = (self.id_of(k) for k in keys if k is not None)
+        return np.array(sorted({i for i in ids if i is not None}), dtype=np.intp)
+
+    def name_ids(self, names: Iterable) -> np.ndarray:
+        """Row ids of dataset country names only (no ISO3 lookup); unknown names are skipped."""
+        ids = (self._by_name.get(_key(n)) for n in names if n is not None)
+        return np.array(sorted({i for i in ids if i is not None}), dtype=np.intp)
+
+    def mask_of(self, keys: Iterable) -> np.ndarray:
+        """
+        Boolean row mask for many ISO3 codes / names / ids (unknown keys are ignored).
+        Set membership for a selection of any size is then one array index.
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.ids_of(keys or [])] = True
+        return mask
+
+    def id_mask(self, ids: Iterable | None) -> np.ndarray:
+        """
+        Boolean row mask from entity ids (e.g. a store's integer list); None and
+        out-of-range ids are ignored.
+        """
+        ids = np.array([i for i in ([] if ids is None else ids) if i is not None], dtype=np.intp)
+        mask = np.zeros(len(self), dtype=bool)
+        mask[ids[(ids >= 0) & (ids < len(self))]] = True
+        return mask
+
+    def iso3_of(self, key) -> str | None:
+        i = self.id_of(key)
+        if i is None or not self.iso3[i]:
+            return None
+        return self.iso3[i]
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of one indicator across all countries."""
+        return self.values[:, self.col_index[name]]
+
+    def frame(self) -> pd.DataFrame:
+        """Numeric columns as a DataFrame sharing this matrix' memory (no copy)."""
+        return pd.DataFrame(self.values, columns=self.columns, copy=False)
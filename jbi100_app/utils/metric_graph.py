@@ -0,0 +1,150 @@
+# Declarative metric engine - complex metrics as a graph of derived quantities
+# Every intermediate (a density, a risk multiplier, a normalized component) is a
+# node with declared inputs (source columns or other nodes) and parameters. Node
+# results are memoized under a key built from the content of their inputs, so a
+# rebuilt dataset only recomputes the nodes whose input columns actually changed,
+# and a new metric built from existing nodes reuses their cached results.
+
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Iterable, Mapping, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class Node(NamedTuple):
+    """
+    One derived quantity: fn(*input series, **params) -> Series.
+
+    elementwise: the result for a row depends on that row only. Element-wise nodes
+        over source columns (and other such nodes) are computed once over all rows
+        and shared by every metric; all other nodes - normalizations and anything
+        downstream of them - run on the rows of the metric being evaluated.
+    """
+    fn: Callable[..., pd.Series]
+    inputs: tuple[str, ...]
+    params: Mapping = {}
+    elementwise: bool = False
+
+
+def _digest(*parts) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _content_key(values: pd.Series | pd.Index) -> str:
+    return _digest(pd.util.hash_pandas_object(values).to_numpy().tobytes())
+
+
+class MetricGraph:
+    """
+    Evaluates named nodes on a table with memoized intermediates.
+
+    A metric (any node asked for by evaluate) is computed on the rows where every
+    source column it depends on, directly or through other nodes, is present -
+    the same rows a hand-written `df[required].dropna()` would keep.
+
+    Args:
+        nodes: node name -> Node; input names that are not nodes are source columns
+        max_entries: memoized node results kept (least recently used dropped first)
+    """
+
+    def __init__(self, nodes: Mapping[str, Node], max_entries: int = 256):
+        self.nodes = dict(nodes)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memo: OrderedDict[str, pd.Series] = OrderedDict()
+        self._shared = {}
+        for name in self.nodes:
+            self._is_shared(name)
+
+    def _is_shared(self, name: str) -> bool:
+        if name not in self.nodes:
+            return True
+        if name not in self._shared:
+            node = self.nodes[name]
+            self._shared[name] = node.elementwise and all(self._is_shared(i) for i in node.inputs)
+        return self._shared[name]
+
+    def columns(self, name: str) -> list[str]:
+        """Source columns a node depends on, in first-use order."""
+        if name not in self.nodes:
+            return [name]
+        out = []
+        for i in self.nodes[name].inputs:
+            out.extend(c for c in self.columns(i) if c not in out)
+        return out
+
+    def functions(self) -> list[Callable]:
+        """Distinct node functions (for code fingerprints of derived artifacts)."""
+        return list(dict.fromkeys(node.fn for node in self.nodes.values()))
+
+    def spec(self) -> str:
+        """Inputs and parameters of every node, for cache keys of derived artifacts."""
+        return repr(sorted(
+            (name, node.fn.__name__, node.inputs, sorted(node.params.items()), node.elementwise)
+            for name, node in self.nodes.items()
+        ))
+
+    def clear(self) -> None:
+        self._memo.clear()
+
+    def evaluate(self, frame: pd.DataFrame, names: Iterable[str], index_col: str) -> dict[str, pd.Series]:
+        """
+        Series per requested node, indexed by `index_col` and restricted to the
+        rows where all of its source columns are present.
+        """
+        data = frame.set_index(index_col)
+        state = {"data": data, "index_key": _content_key(data.index), "full": {}}
+        results = {}
+        for name in names:
+            mask = data[self.columns(name)].notna().all(axis=1).to_numpy()
+            rows = (mask, _digest(state["index_key"], mask.tobytes()))
+            results[name] = self._on_rows(name, rows, state, {})[1]
+        return results
+
+    # (key, series over all rows) of a source column or a shared node
+    def _full(self, name: str, state: dict) -> tuple[str, pd.Series]:
+        done = state["full"]
+        if name not in done:
+            if name not in self.nodes:
+                column = state["data"][name]
+                done[name] = (_digest(name, _content_key(column)), column)
+            else:
+                inputs = [self._full(i, state) for i in self.nodes[name].inputs]
+                done[name] = self._compute(name, inputs)
+        return done[name]
+
+    # (key, series over the metric's rows) of any column or node
+    def _on_rows(self, name: str, rows: tuple[np.ndarray, str], state: dict, done: dict) -> tuple[str, pd.Series]:
+        if name not in done:
+            if self._is_shared(name):
+                key, values = self._full(name, state)
+                mask, rows_key = rows
+                done[name] = (_digest(key, rows_key), values[mask])
+            else:
+                inputs = [self._on_rows(i, rows, state, done) for i in self.nodes[name].inputs]
+                done[name] = self._compute(name, inputs)
+        return done[name]
+
+    def _compute(self, name: str, inputs: list[tuple[str, pd.Series]]) -> tuple[str, pd.Series]:
+        node = self.nodes[name]
+        key = _digest(name, sorted(node.params.items()), *(k for k, _ in inputs))
+        value = self._memo.get(key)
+        if value is not None:
+            self.hits += 1
+            self._memo.move_to_end(key)
+            return key, value
+        self.misses += 1
+        value = node.fn(*(v for _, v in inputs), **node.params)
+        self._memo[key] = value
+        if len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+        return key, value
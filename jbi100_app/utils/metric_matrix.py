@@ -0,0 +1,125 @@
+# Aligned entity x metric matrix of the complex metric series
+# The five normalized metric series (ASF, IEC, SCC, WSI, ERS) have different
+# entities (each drops rows with missing inputs). They are aligned once per dataset
+# version into one float block plus a presence mask, so a weighted composite is a
+# masked matrix-vector product instead of one DataFrame and one outer merge per
+# metric on every slider move.
+
+from __future__ import annotations
+
+from typing import Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+
+
+class MetricMatrix:
+    """
+    Read-only entity x metric matrix.
+
+    Attributes:
+        values  : (n_entities, n_metrics) float64, NaN where a metric has no value
+        filled  : values with NaN replaced by 0 (what the composite adds up)
+        present : (n_entities, n_metrics) bool, entity is in that metric's series
+        keys    : metric keys, aligned with the columns
+        names   : row labels, sorted (the row order of an outer merge on them)
+        order   : metric key -> row positions in that series' own index order
+    """
+
+    def __init__(self, values: np.ndarray, present: np.ndarray, keys: list[str],
+                 names: np.ndarray, order: Mapping[str, np.ndarray]):
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self.filled = np.where(np.isnan(self.values), 0.0, self.values)
+        self.present = np.ascontiguousarray(present, dtype=bool)
+        for block in (self.values, self.filled, self.present):
+            block.setflags(write=False)
+        self.keys = list(keys)
+        self.col_index = {k: i for i, k in enumerate(self.keys)}
+        self.names = names
+        self.index = pd.Index(names)
+        self.order = dict(order)
+
+    @classmethod
+    def from_series(cls, series: Mapping[str, pd.Series], names: Iterable | None = None) -> "MetricMatrix":
+        """
+        Align metric key -> series (indexed by entity name). Rows are every name in
+        the series plus `names` (e.g. all dataset entities, so per-request series
+        over the same entities can be aligned too), in sorted order.
+        """
+        labels = set(names if names is not None else [])
+        for s in series.values():
+            labels.update(s.index)
+        row_names = np.array(sorted(labels), dtype=object)
+        index = pd.Index(row_names)
+
+        values = np.full((len(row_names), len(series)), np.nan)
+        present = np.zeros((len(row_names), len(series)), dtype=bool)
+        order = {}
+        for j, (key, s) in enumerate(series.items()):
+            rows = index.get_indexer(s.index)
+            values[rows, j] = s.to_numpy(dtype=float)
+            present[rows, j] = True
+            order[key] = rows
+        return cls(values, present, list(series), row_names, order)
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.filled.nbytes + self.present.nbytes
+
+    def align(self, s: pd.Series) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(values, present, order) of another series over these rows; labels not in the rows are dropped."""
+        rows = self.index.get_indexer(s.index)
+        keep = rows >= 0
+        rows = rows[keep]
+        values = np.full(len(self), np.nan)
+        values[rows] = s.to_numpy(dtype=float)[keep]
+        present = np.zeros(len(self), dtype=bool)
+        present[rows] = True
+        return values, present, rows
+
+    def composite(self, weights: Mapping[str, float], extra: Mapping[str, pd.Series] | None = None,
+                  name: str = "Complex_Score", label: str = "Country") -> pd.DataFrame:
+        """
+        Weighted composite of the metrics in `weights` (key -> weight, in column
+        order; metrics left out are toggled off), plus `extra` series aligned on the
+        fly (e.g. a per-request metric). Missing values count as 0; weights are
+        divided by their sum (1 if 0).
+
+        Returns the frame the merge-based computation produced: label, name and one
+        column per metric; rows are the entities in any of the series, sorted, or
+        in the series' own order when there is only one.
+        """
+        extra = {k: self.align(s) for k, s in (extra or {}).items()}
+        keys = [k for k in weights if k in self.col_index]
+        names = keys + list(extra)
+        if not names:
+            return pd.DataFrame({label: [], name: []})
+
+        # Toggled-off metrics get weight 0, so the composite is one product over the
+        # whole block. The row sum adds the columns left to right, matching the
+        # former column-by-column accumulation bit for bit (x + 0.0 == x).
+        total = sum(weights[k] for k in names) or 1
+        w = np.zeros(len(self.keys))
+        cols = [self.col_index[k] for k in keys]
+        w[cols] = [weights[k] / total for k in keys]
+        score = (self.filled * w).sum(axis=1)
+        for key, (values, _, _) in extra.items():
+            score += (weights[key] / total) * np.where(np.isnan(values), 0.0, values)
+
+        if len(names) > 1:
+            present = self.present[:, cols].any(axis=1)
+            for _, mask, _ in extra.values():
+                present |= mask
+            rows = np.flatnonzero(present)
+        else:
+            rows = self.order[keys[0]] if keys else next(iter(extra.values()))[2]
+
+        out = {label: self.names[rows], name: score[rows]}
+        for key in keys:
+            out[key] = self.values[rows, self.col_index[key]]
+        for key, (values, _, _) in extra.items():
+            out[key] = values[rows]
+        return pd.DataFrame(out)
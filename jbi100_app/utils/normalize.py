@@ -0,0 +1,103 @@
+# Batched column normalization
+# One NumPy pass over a 2-D block (rows x columns) replaces per-Series
+# normalization calls: the robust metric normalization of data.normalize_series
+# (shift, log1p, percentile clip, min-max) and the plain min-max scaling of the
+# ranking map and the preprocessing pipeline. NaNs are skipped per column the way
+# pandas' min/max/quantile skip them, and each column may have its own clip
+# percentile and direction. Results match the per-Series versions bit for bit.
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+
+def _per_column(value, n_cols: int, dtype) -> np.ndarray:
+    return np.broadcast_to(np.asarray(value, dtype=dtype), (n_cols,))
+
+
+def _range(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-column (min, max) skipping NaNs; NaN for columns without values."""
+    return np.fmin.reduce(x, axis=0), np.fmax.reduce(x, axis=0)
+
+
+def _quantile(x: np.ndarray, q: float) -> float:
+    """
+    Quantile of the non-NaN values of `x`, with the linear interpolation of
+    np.percentile (which pandas' Series.quantile calls with q * 100).
+    """
+    n = np.count_nonzero(~np.isnan(x))
+    if n == 0:
+        return np.nan
+    virtual = (n - 1) * ((q * 100) / 100)
+    below = np.floor(virtual)
+    lo = min(int(below), n - 1)
+    hi = min(lo + 1, n - 1)
+    a, b = np.partition(x, [lo, hi])[[lo, hi]]  # NaNs partition last
+    gamma = virtual - below
+    diff = b - a
+    return b - diff * (1 - gamma) if gamma >= 0.5 else a + diff * gamma
+
+
+def normalize_columns(values: np.ndarray, clip_percentile: float | Sequence[float | None] | None = 0.90,
+                      higher_is_better: bool | Sequence[bool] = True, log: bool = True,
+                      constant: float = 0.0) -> np.ndarray:
+    """
+    Scale every column of `values` to [0, 1], ignoring NaNs (which stay NaN).
+
+    Per column: shift so the minimum is 0 if it is negative and take log1p (when
+    `log`), cap at the `clip_percentile` quantile (None: no cap), then min-max
+    scale; columns that are lower-is-better are flipped (1 - x).
+
+    Args:
+        values: (n_rows, n_cols) array, or a 1-D array for a single column
+        clip_percentile: one quantile in (0, 1], or one per column
+        higher_is_better: one direction, or one per column
+        log: shift + log1p before clipping (the robust metric normalization);
+            False gives plain min-max scaling
+        constant: value of the present entries of a column without spread
+            (all values equal before or after clipping); NaN marks it unusable
+
+    Returns:
+        float64 array shaped like `values`
+    """
+    values = np.asarray(values, dtype=float)
+    column = values.ndim == 1
+    # Column-major, so the per-column reductions and partitions read contiguous memory
+    # (DataFrame.to_numpy of a float block usually already is)
+    x = np.asfortranarray(values[:, None] if column else values)
+    n_cols = x.shape[1]
+    if not len(x):
+        return values.copy()
+
+    clip = np.array([np.nan if c is None else c for c in
+                     np.broadcast_to(np.asarray(clip_percentile, dtype=object), (n_cols,))], dtype=float)
+    higher = _per_column(higher_is_better, n_cols, bool)
+
+    lowest, highest = _range(x)
+    flat = lowest == highest
+
+    s = x
+    if log:
+        s = np.log1p(x - np.minimum(lowest, 0.0))
+    capped = np.flatnonzero(~np.isnan(clip))
+    if len(capped):
+        upper = np.full(n_cols, np.inf)
+        for j in capped:
+            upper[j] = _quantile(s[:, j], clip[j])
+        s = np.minimum(s, upper)
+    if log or len(capped):
+        lowest, highest = _range(s)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denom = highest - lowest
+        flat |= (denom == 0) | np.isnan(denom)
+        out = (s - lowest) / denom
+    lower = np.flatnonzero(~higher)
+    if len(lower):
+        out[:, lower] = 1 - out[:, lower]
+    flat = np.flatnonzero(flat)
+    if len(flat):
+        out[:, flat] = s[:, flat] * 0 + constant
+    return out[:, 0] if column else out
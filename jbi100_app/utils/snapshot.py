@@ -0,0 +1,163 @@
+# Columnar on-disk snapshots of the cleaned dataset
+# get_data() parses, merges and cleans five CSVs; the result is written here as an
+# uncompressed NumPy .npz bundle (one array per column) so later calls and process
+# starts only have to memory-load arrays instead of re-parsing text.
+# Snapshots are keyed by a hash of the source file contents, so editing any CSV
+# automatically produces a new key and the stale snapshot is rebuilt.
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+
+# Snapshots live next to the data they were built from (ignored by git)
+SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / "data_sets" / ".snapshots"
+
+# Bump whenever the cleaning logic or the on-disk layout changes so old snapshots
+# are not picked up by new code.
+SNAPSHOT_FORMAT = 2
+
+# (path, size, mtime_ns) -> content digest, so unchanged files are not re-read
+_DIGEST_CACHE: dict[tuple[str, int, int], str] = {}
+
+
+def _file_digest(path: Path) -> str:
+    """Content hash of a single file, memoized on its size and mtime."""
+    st = path.stat()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    digest = _DIGEST_CACHE.get(key)
+    if digest is None:
+        digest = hashlib.sha1(path.read_bytes()).hexdigest()
+        _DIGEST_CACHE[key] = digest
+    return digest
+
+
+def source_fingerprint(paths: Iterable[str | Path], extra: str = "") -> str:
+    """
+    Hash of the source files' names and contents (plus an optional extra key,
+    e.g. build parameters). Independent of the order paths are given in.
+    """
+    h = hashlib.sha1(f"format={SNAPSHOT_FORMAT};{extra}".encode())
+    for p in sorted(Path(x) for x in paths):
+        h.update(p.name.encode())
+        h.update(b"\0")
+        h.update(_file_digest(p).encode())
+    return h.hexdigest()[:16]
+
+
+def code_fingerprint(*funcs: Callable) -> str:
+    """
+    Hash of the source code of the given functions, so artifacts derived by them
+    are rebuilt when their logic is edited (not only when their inputs change).
+    """
+    h = hashlib.sha1()
+    for fn in funcs:
+        h.update(inspect.getsource(fn).encode())
+    return h.hexdigest()[:16]
+
+
+def write_snapshot(df: pd.DataFrame, path: Path) -> None:
+    """
+    Write df as a columnar .npz bundle. Numeric columns are stored as their native
+    arrays; text columns as unicode arrays plus a missing-value mask.
+    The file is written to a temp name first and renamed, so readers never see a
+    half-written snapshot.
+    """
+    arrays = {"__columns__": np.array([str(c) for c in df.columns], dtype=str)}
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        if s.dtype == object:
+            missing = s.isna().to_numpy()
+            arrays[f"c{i}"] = np.where(missing, "", s.astype(str).to_numpy()).astype(str)
+            arrays[f"m{i}"] = missing
+        else:
+            arrays[f"c{i}"] = s.to_numpy()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.stem, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_snapshot(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Load a snapshot written by write_snapshot back into a DataFrame.
+    With `columns`, only those arrays are read from the bundle (in that order).
+    """
+    with np.load(path, allow_pickle=False) as bundle:
+        stored = bundle["__columns__"].tolist()
+        if columns is None:
+            columns = stored
+        missing = [c for c in columns if c not in stored]
+        if missing:
+            raise KeyError(f"Column(s) not in snapshot: {missing}")
+        positions = {col: i for i, col in enumerate(stored)}
+        data = {}
+        for col in columns:
+            i = positions[col]
+            values = bundle[f"c{i}"]
+            if f"m{i}" in bundle.files:
+                values = values.astype(object)
+                values[bundle[f"m{i}"]] = np.nan
+            data[col] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def load_or_build(
+    name: str,
+    sources: Iterable[str | Path],
+    build: Callable[[], pd.DataFrame],
+    extra: str = "",
+    columns: list[str] | None = None,
+    directory: Path = SNAPSHOT_DIR,
+) -> pd.DataFrame:
+    """
+    Return the snapshot called `name` for the given source files, building it with
+    `build()` when no snapshot matches their current contents. With `columns`, only
+    those columns are loaded (or returned from the fresh build).
+    Snapshots are kept in `directory` (SNAPSHOT_DIR unless given).
+    Older snapshots with the same name (not names extending it) are removed after
+    a rebuild. An unreadable snapshot (corrupt or truncated) is rebuilt too. If
+    the snapshot directory is not writable the freshly built frame is returned
+    uncached.
+    """
+    sources = list(sources)
+    key = source_fingerprint(sources, extra)
+    path = Path(directory) / f"{name}-{key}.npz"
+
+    if path.exists():
+        try:
+            return read_snapshot(path, columns)
+        except (OSError, ValueError, EOFError, KeyError, zipfile.BadZipFile):
+            pass  # corrupt/partial file -> rebuild below
+
+    df = build()
+    try:
+        write_snapshot(df, path)
+        for stale in path.parent.glob(f"{name}-{'?' * len(key)}.npz"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+    except OSError:
+        pass
+    if columns is not None:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise KeyError(f"Column(s) not in snapshot: {missing}")
+        df = df[columns]
+    return df
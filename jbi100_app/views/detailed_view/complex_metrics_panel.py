@@ -1,11 +1,12 @@
-# Complex metrics panel - sidebar with 5 toggleable weighted metrics
+# Complex metrics panel - sidebar with 6 toggleable weighted metrics
 # Each metric has: checkbox to enable/disable, weight slider (0-100), description
-# Metrics: ASF (workforce), IEC (energy), SCC (supply chain), WSI (wages), ERS (resilience)
+# Metrics: ASF (workforce), IEC (energy), SCC (supply chain), WSI (wages), ERS (resilience),
+# PRX (proximity to the selected countries; off by default, needs a selection)
 # These weights feed into the composite score calculation for scatterplot and ranking
 
 from dash import html, dcc
 
-# Build the left sidebar panel with all 5 complex metrics
+# Build the left sidebar panel with all 6 complex metrics
 def complex_metrics_panel():
     return html.Div(
         id="complex-metrics-panel",
@@ -169,6 +170,38 @@ def complex_metrics_panel():
                         marks={0: "0", 100: "100"},
                         tooltip={"placement": "bottom", "always_visible": True},
                     ),
+                    html.Div(className="slider-spacer"),
+                ],
+            ),
+
+            # Market Proximity
+            html.Div(
+                className="complex-metric",
+                children=[
+                    html.Div(
+                        [
+                            html.H2("Market Proximity"),
+                            dcc.Checklist(
+                                id="toggle-prx",
+                                options=[{"label": "", "value": "enabled"}],
+                                value=[],
+                                className="metric-checklist",
+                            ),
+                        ],
+                        className="metric-header",
+                    ),
+                    html.Div("Distance to the closest selected country",
+                             className="metric-description"),
+                    html.Div("weight", className="importance-label"),
+                    dcc.Slider(
+                        id="weight-prx",
+                        min=0,
+                        max=100,
+                        step=1,
+                        value=20,
+                        marks={0: "0", 100: "100"},
+                        tooltip={"placement": "bottom", "always_visible": True},
+                    ),
                 ],
             ),
         ]
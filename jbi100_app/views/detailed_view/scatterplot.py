@@ -4,6 +4,7 @@
 # Note: actual figure generation happens in detail_callbacks.py
 
 from dash import dcc, html
+import numpy as np
 import plotly.graph_objects as go
 
 # Scatterplot wrapper class providing structure for interactive scatter charts
@@ -65,8 +66,8 @@ class Scatterplot(html.Div):
 
         if selected_countries:
             is_sel = countries.isin(selected_countries)
-            marker_opacity = [1.0 if s else 0.2 for s in is_sel]
-            marker_size = [10 if s else 7 for s in is_sel]
+            marker_opacity = np.where(is_sel, 1.0, 0.2)
+            marker_size = np.where(is_sel, 10, 7)
         else:
             marker_opacity = 0.85
             marker_size = 8
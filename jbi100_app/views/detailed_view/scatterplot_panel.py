@@ -30,6 +30,7 @@ def scatterplot_panel():
                                     {"label": "Supply Chain", "value": "SCC"},
                                     {"label": "Wage Sustainability", "value": "WSI"},
                                     {"label": "Economic Resilience", "value": "ERS"},
+                                    {"label": "Market Proximity", "value": "PRX"},
                                 ],
                             ),
                         ],
@@ -48,6 +49,7 @@ def scatterplot_panel():
                                     {"label": "Supply Chain", "value": "SCC"},
                                     {"label": "Wage Sustainability", "value": "WSI"},
                                     {"label": "Economic Resilience", "value": "ERS"},
+                                    {"label": "Market Proximity", "value": "PRX"},
                                 ],
                             ),
                         ],
@@ -1,10 +1,23 @@
 # Selected ranking panel - shows computed composite scores for selected countries
 # Displays: bar chart ranking countries by weighted metric combination
-# Formula: (ASF × w1 + IEC × w2 + SCC × w3 + WSI × w4 + ERS × w5) / total_weights
+# Formula: (ASF × w1 + IEC × w2 + SCC × w3 + WSI × w4 + ERS × w5 [+ PRX × w6]) / total_weights
 # Updates when: metric weights change or country selection changes
+# Level switch: ranks countries or admin-1 units (provinces, states); it also sets
+# the entities shown in the scatterplot and the metric cards
 
 from dash import html, dcc
 
+from jbi100_app.data import get_dataset, level_mask
+
+
+# Entity level options; admin-1 is disabled when no admin-1 files are loaded
+def _level_options():
+    has_admin1 = bool(level_mask("admin1", get_dataset()).any())
+    return [
+        {"label": "Countries", "value": "country"},
+        {"label": "Admin-1 regions", "value": "admin1", "disabled": not has_admin1},
+    ]
+
 # Create ranking panel with composite score bar chart
 def selected_ranking_panel():
     """
@@ -39,6 +52,19 @@ def selected_ranking_panel():
                             ),
                         ],
                     ),
+                    html.Div(
+                        className="control-group",
+                        children=[
+                            html.Label("Show:", className="control-label"),
+                            dcc.RadioItems(
+                                id="entity-level",
+                                value="country",
+                                options=_level_options(),
+                                inline=True,
+                                className="entity-level-radio",
+                            ),
+                        ],
+                    ),
                     dcc.Store(id="detailed-ranking-order", data="desc"),
                 ],
             ),
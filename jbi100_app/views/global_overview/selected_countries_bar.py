@@ -1,9 +1,66 @@
 # Selected countries bar - displays currently selected countries with remove buttons
 # Shows: list of selected countries with × buttons to deselect individual countries
 # Updates: when countries are clicked on map or selected via dropdown
+# Search: typeahead box that adds the chosen country (by name, alias or ISO code)
+# Bulk select: adds a pasted list of names/codes, a whole region or the top N by score
 
 from dash import html, dcc
 
+from jbi100_app.data import REGION_LEVELS, get_dataset
+
+# Suffix shown after region names per level in the bulk-select dropdown
+REGION_LEVEL_LABELS = {
+    "region": "",
+    "sub_region": " (sub-region)",
+    "intermediate_region": " (intermediate region)",
+}
+
+
+# Regions present in the current data, as "<level>|<name>" dropdown options
+def _region_options():
+    frame = get_dataset().frame
+    options = []
+    for level in REGION_LEVELS:
+        for name in sorted(frame[level].dropna().unique()):
+            options.append({"label": f"{name}{REGION_LEVEL_LABELS[level]}", "value": f"{level}|{name}"})
+    return options
+
+
+# Popover with the bulk-selection inputs (applied together with one click)
+def _bulk_select():
+    return html.Details(
+        [
+            html.Summary("Bulk select"),
+            html.Div(
+                [
+                    dcc.Textarea(
+                        id="bulk-select-text",
+                        placeholder="Paste names or ISO codes, one per line",
+                    ),
+                    dcc.Dropdown(
+                        id="bulk-select-region",
+                        options=_region_options(),
+                        value=None,
+                        placeholder="Add a region...",
+                        clearable=True,
+                    ),
+                    dcc.Input(
+                        id="bulk-select-top-n",
+                        type="number",
+                        min=0,
+                        step=1,
+                        placeholder="Top N by score",
+                    ),
+                    html.Button("Add", id="bulk-select-apply", n_clicks=0),
+                    html.Div(id="bulk-select-status"),
+                ],
+                className="bulk-select-body",
+            ),
+        ],
+        id="bulk-select",
+    )
+
+
 # Build the selection display bar
 def selected_countries_bar():
     return html.Div(
@@ -20,6 +77,15 @@ def selected_countries_bar():
                     ),
                     html.Div(
                         [
+                            dcc.Dropdown(
+                                id="country-search",
+                                options=[],
+                                value=None,
+                                placeholder="Search country...",
+                                searchable=True,
+                                clearable=True,
+                            ),
+                            _bulk_select(),
                             html.Button(
                                 "Clear",
                                 id="clear-selected",
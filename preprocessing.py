@@ -2,28 +2,51 @@
 # Inputs: 5 separate CSV files (economy, demographics, energy, transportation, geography)
 # Outputs: countries_processed.csv (merged clean data), data_quality_report.csv (statistics)
 # Processing: numeric coercion, outlier clipping (1-99 percentile), NaN filling, column renaming
-# Run this script before launching the app to prepare data
+#
+# The work is split into named stages. load, coerce and censor run per source file
+# in a worker pool; merge, winsorize, derive, normalize and report run once on the
+# merged table. Each stage's output is cached under <out-dir>/.stages, keyed by a
+# hash of its input, its parameters (WINSOR_Q, PCT_COLS, ...) and its code, so a
+# rerun only redoes the stages whose inputs changed. A per-stage, per-file timing
+# breakdown is printed at the end.
+# Finally the app's complex metrics are precomputed, so the app loads them instead
+# of re-deriving them at startup. They always come from the app's own data set, so
+# this step is skipped when --raw-dir points elsewhere.
+#
+# Usage: python preprocessing.py [--raw-dir DIR] [--out-dir DIR] [--force]
+#                                [--workers N] [--executor process|thread] [--no-app-metrics]
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
+
+from jbi100_app.utils import snapshot
+from jbi100_app.utils.normalize import normalize_columns
 
 # =========================================
 # CONFIG (paths + output names)
 # =========================================
-RAW_DIR = Path("data_sets/raw")
-OUT_DIR = Path("data_sets/processed")
-OUT_DIR.mkdir(parents=True, exist_ok=True)
-
-PATHS = {
-    "economy": RAW_DIR / "economy_data.csv",
-    "demographics": RAW_DIR / "demographics_data.csv",
-    "energy": RAW_DIR / "energy_data.csv",
-    "transportation": RAW_DIR / "transportation_data.csv",
-    "geography": RAW_DIR / "geography_data.csv",
+# Defaults are resolved relative to this file, not the working directory
+RAW_DIR = Path(__file__).resolve().parent / "jbi100_app" / "data_sets"
+OUT_DIR = RAW_DIR / "processed"
+
+SOURCES = {
+    "economy": "economy_data.csv",
+    "demographics": "demographics_data.csv",
+    "energy": "energy_data.csv",
+    "transportation": "transportation_data.csv",
+    "geography": "geography_data.csv",
 }
-OUT_CLEAN = "data_sets/processed/countries_processed.csv"
-OUT_REPORT = OUT_DIR / "data_quality_report.csv"
+OUT_CLEAN = "countries_processed.csv"
+OUT_REPORT = "data_quality_report.csv"
 
 WINSOR_Q = (0.01, 0.99)  # 1st–99th percentile clipping
 
@@ -88,18 +111,8 @@ def minmax01(df: pd.DataFrame, col: str, out_col: str, invert: bool = False) ->
         df[out_col] = np.nan
         return df
 
-    x = df[col].astype(float)
-    mn, mx = x.min(skipna=True), x.max(skipna=True)
-
-    if pd.isna(mn) or pd.isna(mx) or mn == mx:
-        df[out_col] = np.nan
-        return df
-
-    scaled = (x - mn) / (mx - mn)
-    if invert:
-        scaled = 1.0 - scaled
-
-    df[out_col] = scaled
+    df[out_col] = normalize_columns(df[col].to_numpy(dtype=float), None, not invert,
+                                    log=False, constant=np.nan)
     return df
 
 
@@ -110,22 +123,6 @@ def safe_div(a: pd.Series, b: pd.Series) -> np.ndarray:
     return np.where((b == 0) | np.isnan(b), np.nan, a / b)
 
 
-# load raw datasets
-dfs = {}
-for name, path in PATHS.items():
-    if not path.exists():
-        raise FileNotFoundError(f"Missing file: {path}")
-    dfs[name] = pd.read_csv(path)
-
-for name, df in dfs.items():
-    if "Country" not in df.columns:
-        raise ValueError(f"'{name}' dataset is missing a 'Country' column.")
-
-processed_countries = dfs["economy"].copy()
-for k in ["demographics", "energy", "transportation", "geography"]:
-    processed_countries = processed_countries.merge(dfs[k], on="Country", how="outer", suffixes=("", f"_{k}"))
-
-
 # numeric columns
 
 NUM_COLS = [
@@ -151,13 +148,6 @@ NUM_COLS = [
     "Public_Debt_percent_of_GDP",
 ]
 
-for c in NUM_COLS:
-    if c in processed_countries.columns:
-        processed_countries[c] = coerce_numeric(processed_countries[c])
-
-
-# Censoring invalid values (do not delete)
-
 # Percentages must be within [0,100]
 PCT_COLS = [
     "Unemployment_Rate_percent",
@@ -166,17 +156,12 @@ PCT_COLS = [
     "Total_Literacy_Rate",
     "Public_Debt_percent_of_GDP",
 ]
-for c in PCT_COLS:
-    processed_countries = censor_range(processed_countries, c, lo=0, hi=100)
-
-# Population growth: allow negative, censor extreme
-if "Population_Growth_Rate" in processed_countries.columns:
-    processed_countries = censor_range(processed_countries, "Population_Growth_Rate", lo=-10, hi=10)
 
-# Inflation: allow deflation, censor extreme (only if present)
-if "Inflation_Rate_percent" in processed_countries.columns:
-    processed_countries["Inflation_Rate_percent"] = coerce_numeric(processed_countries["Inflation_Rate_percent"])
-    processed_countries = censor_range(processed_countries, "Inflation_Rate_percent", lo=-20, hi=200)
+# Signed rates: allow negative values, censor extremes
+RATE_BOUNDS = {
+    "Population_Growth_Rate": (-10, 10),
+    "Inflation_Rate_percent": (-20, 200),  # allow deflation
+}
 
 # Positive-only quantities
 POS_ONLY = [
@@ -185,17 +170,9 @@ POS_ONLY = [
     "Total_Population",
     "Real_GDP_per_Capita_USD",
 ]
-for c in POS_ONLY:
-    processed_countries = censor_range(processed_countries, c, gt0=True)
 
 # Non-negative transport lengths/counts
 NONNEG = ["airports_paved_runways_count", "airports_unpaved_runways_count", "railways_km", "waterways_km"]
-for c in NONNEG:
-    processed_countries = censor_range(processed_countries, c, ge0=True)
-
-
-
-# 2) OUTLIERS: winsorize heavy-tailed metrics
 
 HEAVY_TAIL = [
     "Real_GDP_PPP_billion_USD",
@@ -204,100 +181,372 @@ HEAVY_TAIL = [
     "waterways_km",
     "Real_GDP_per_Capita_USD",
 ]
-for c in HEAVY_TAIL:
-    processed_countries = winsorize(processed_countries, c)
 
+INFLATION_TARGET = 2.5  # “ideal” inflation zone ~2–3%
 
-# derived metrics
-#  Available Skilled Workforce
-if {"Total_Literacy_Rate", "Unemployment_Rate_percent"}.issubset(processed_countries.columns):
-    processed_countries["Available_Skilled_Workforce"] = (
-        processed_countries["Total_Literacy_Rate"]
-        * (100.0 - processed_countries["Unemployment_Rate_percent"]) / 100.0
-    )
+# Global metrics normalized to [0,1]: (source column, output column, invert)
+GLOBAL_TO_NORM = [
+    ("Unemployment_Rate_percent", "Unemployment__norm_inv", True),
+    ("Real_GDP_PPP_billion_USD", "GDP__norm", False),
+    ("Youth_Unemployment_Rate_percent", "Youth_Unemp__norm_inv", True),
+    ("Population_Growth_Rate", "Pop_Growth__norm", False),
+    ("electricity_access_percent", "Elec_Access__norm", False),
+    ("electricity_generating_capacity_kW", "Elec_Capacity__norm", False),
+]
 
-#  Industrial Energy Capacity
-if {"electricity_generating_capacity_kW", "Total_Population", "electricity_access_percent"}.issubset(processed_countries.columns):
-    cap_per_capita = safe_div(processed_countries["electricity_generating_capacity_kW"], processed_countries["Total_Population"])
-    processed_countries["Industrial_Energy_Capacity"] = cap_per_capita * (processed_countries["electricity_access_percent"] / 100.0)
+# Normalize derived metrics too (useful for composites / UI)
+DERIVED_TO_NORM = [
+    "Available_Skilled_Workforce",
+    "Industrial_Energy_Capacity",
+    "Supply_Chain_Connectivity_Score",
+    "Wage_Sustainability_Index",
+    "Economic_Resilience_Score",
+]
 
-# Supply Chain Connectivity Score
-if {"airports_paved_runways_count", "airports_unpaved_runways_count"}.issubset(processed_countries.columns):
-    processed_countries["airports_total"] = (
-        processed_countries["airports_paved_runways_count"].fillna(0)
-        + processed_countries["airports_unpaved_runways_count"].fillna(0)
-    )
 
-# Normalize components first
-processed_countries = minmax01(processed_countries, "airports_total", "airports_total__norm", invert=False)
-processed_countries = minmax01(processed_countries, "railways_km", "railways_km__norm", invert=False)
-processed_countries = minmax01(processed_countries, "waterways_km", "waterways_km__norm", invert=False)
+# =========================================
+# STAGES
+# =========================================
 
-if {"airports_total__norm", "railways_km__norm", "waterways_km__norm"}.issubset(processed_countries.columns):
-    processed_countries["Supply_Chain_Connectivity_Score"] = (
-        0.4 * processed_countries["airports_total__norm"]
-        + 0.3 * processed_countries["railways_km__norm"]
-        + 0.3 * processed_countries["waterways_km__norm"]
-    )
+# load one raw dataset
+def load_stage(path: Path) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    if "Country" not in df.columns:
+        raise ValueError(f"'{path.name}' is missing a 'Country' column.")
+    return df
 
-#  Wage Sustainability Index (only if inflation exists)
-if {"Real_GDP_per_Capita_USD", "Inflation_Rate_percent"}.issubset(processed_countries.columns):
-    processed_countries["Wage_Sustainability_Index"] = (
-        processed_countries["Real_GDP_per_Capita_USD"] / (1.0 + processed_countries["Inflation_Rate_percent"] / 100.0)
-    )
 
-# Economic Resilience Score (simple proxy if debt + inflation exist)
-if {"Public_Debt_percent_of_GDP", "Inflation_Rate_percent"}.issubset(processed_countries.columns):
-    processed_countries = minmax01(processed_countries, "Public_Debt_percent_of_GDP", "Debt__norm_inv", invert=True)
+def coerce_stage(df: pd.DataFrame) -> pd.DataFrame:
+    for c in NUM_COLS:
+        if c in df.columns:
+            df[c] = coerce_numeric(df[c])
+    return df
 
-    target = 2.5  # “ideal” inflation zone ~2–3%
-    processed_countries["Inflation_Distance"] = (processed_countries["Inflation_Rate_percent"] - target).abs()
-    processed_countries = minmax01(processed_countries, "Inflation_Distance", "Inflation_Control__norm_inv", invert=True)
 
-    processed_countries["Economic_Resilience_Score"] = (
-        0.5 * processed_countries["Debt__norm_inv"]
-        + 0.5 * processed_countries["Inflation_Control__norm_inv"]
-    )
+# Censoring invalid values (do not delete)
+def censor_stage(df: pd.DataFrame) -> pd.DataFrame:
+    for c in PCT_COLS:
+        df = censor_range(df, c, lo=0, hi=100)
 
+    for c, (lo, hi) in RATE_BOUNDS.items():
+        if c in df.columns:
+            df[c] = coerce_numeric(df[c])
+            df = censor_range(df, c, lo=lo, hi=hi)
 
-# normalize global metrics to [0,1]
-processed_countries = minmax01(processed_countries, "Unemployment_Rate_percent", "Unemployment__norm_inv", invert=True)
-processed_countries = minmax01(processed_countries, "Real_GDP_PPP_billion_USD", "GDP__norm", invert=False)
-processed_countries = minmax01(processed_countries, "Youth_Unemployment_Rate_percent", "Youth_Unemp__norm_inv", invert=True)
-processed_countries = minmax01(processed_countries, "Population_Growth_Rate", "Pop_Growth__norm", invert=False)
-processed_countries = minmax01(processed_countries, "electricity_access_percent", "Elec_Access__norm", invert=False)
-processed_countries = minmax01(processed_countries, "electricity_generating_capacity_kW", "Elec_Capacity__norm", invert=False)
+    for c in POS_ONLY:
+        df = censor_range(df, c, gt0=True)
 
-# Normalize derived metrics too (useful for composites / UI)
-DERIVED_TO_NORM = [
-    "Available_Skilled_Workforce",
-    "Industrial_Energy_Capacity",
-    "Supply_Chain_Connectivity_Score",
-    "Wage_Sustainability_Index",
-    "Economic_Resilience_Score",
-]
-for c in DERIVED_TO_NORM:
-    if c in processed_countries.columns:
-        processed_countries = minmax01(processed_countries, c, f"{c}__norm", invert=False)
+    for c in NONNEG:
+        df = censor_range(df, c, ge0=True)
+    return df
+
+
+# merge the cleaned per-file datasets on Country (in SOURCES order)
+def merge_stage(frames: dict) -> pd.DataFrame:
+    names = list(frames)
+    merged = frames[names[0]].copy()
+    for k in names[1:]:
+        merged = merged.merge(frames[k], on="Country", how="outer", suffixes=("", f"_{k}"))
+    return merged
+
+
+# OUTLIERS: winsorize heavy-tailed metrics
+def winsorize_stage(df: pd.DataFrame) -> pd.DataFrame:
+    for c in HEAVY_TAIL:
+        df = winsorize(df, c, q=WINSOR_Q)
+    return df
+
+
+# derived metrics
+def derive_stage(df: pd.DataFrame) -> pd.DataFrame:
+    #  Available Skilled Workforce
+    if {"Total_Literacy_Rate", "Unemployment_Rate_percent"}.issubset(df.columns):
+        df["Available_Skilled_Workforce"] = (
+            df["Total_Literacy_Rate"]
+            * (100.0 - df["Unemployment_Rate_percent"]) / 100.0
+        )
+
+    #  Industrial Energy Capacity
+    if {"electricity_generating_capacity_kW", "Total_Population", "electricity_access_percent"}.issubset(df.columns):
+        cap_per_capita = safe_div(df["electricity_generating_capacity_kW"], df["Total_Population"])
+        df["Industrial_Energy_Capacity"] = cap_per_capita * (df["electricity_access_percent"] / 100.0)
+
+    # Supply Chain Connectivity Score
+    if {"airports_paved_runways_count", "airports_unpaved_runways_count"}.issubset(df.columns):
+        df["airports_total"] = (
+            df["airports_paved_runways_count"].fillna(0)
+            + df["airports_unpaved_runways_count"].fillna(0)
+        )
+
+    # Normalize components first
+    df = minmax01(df, "airports_total", "airports_total__norm", invert=False)
+    df = minmax01(df, "railways_km", "railways_km__norm", invert=False)
+    df = minmax01(df, "waterways_km", "waterways_km__norm", invert=False)
+
+    if {"airports_total__norm", "railways_km__norm", "waterways_km__norm"}.issubset(df.columns):
+        df["Supply_Chain_Connectivity_Score"] = (
+            0.4 * df["airports_total__norm"]
+            + 0.3 * df["railways_km__norm"]
+            + 0.3 * df["waterways_km__norm"]
+        )
+
+    #  Wage Sustainability Index (only if inflation exists)
+    if {"Real_GDP_per_Capita_USD", "Inflation_Rate_percent"}.issubset(df.columns):
+        df["Wage_Sustainability_Index"] = (
+            df["Real_GDP_per_Capita_USD"] / (1.0 + df["Inflation_Rate_percent"] / 100.0)
+        )
+
+    # Economic Resilience Score (simple proxy if debt + inflation exist)
+    if {"Public_Debt_percent_of_GDP", "Inflation_Rate_percent"}.issubset(df.columns):
+        df = minmax01(df, "Public_Debt_percent_of_GDP", "Debt__norm_inv", invert=True)
+
+        df["Inflation_Distance"] = (df["Inflation_Rate_percent"] - INFLATION_TARGET).abs()
+        df = minmax01(df, "Inflation_Distance", "Inflation_Control__norm_inv", invert=True)
+
+        df["Economic_Resilience_Score"] = (
+            0.5 * df["Debt__norm_inv"]
+            + 0.5 * df["Inflation_Control__norm_inv"]
+        )
+    return df
+
+
+# normalize global and derived metrics to [0,1], all present columns in one pass
+def normalize_stage(df: pd.DataFrame) -> pd.DataFrame:
+    targets = GLOBAL_TO_NORM + [(c, f"{c}__norm", False) for c in DERIVED_TO_NORM if c in df.columns]
+    present = [(col, invert) for col, _, invert in targets if col in df.columns]
+    scaled = normalize_columns(df[[col for col, _ in present]].to_numpy(dtype=float), None,
+                               [not invert for _, invert in present], log=False, constant=np.nan)
+
+    j = 0
+    for col, out_col, _ in targets:
+        if col in df.columns:
+            df[out_col] = scaled[:, j]
+            j += 1
+        else:
+            df[out_col] = np.nan
+    return df
 
 
 # quality report
-report_rows = []
-for col in [c for c in NUM_COLS if c in processed_countries.columns]:
-    total = len(processed_countries)
-    missing = processed_countries[col].isna().sum()
-    report_rows.append({
-        "metric": col,
-        "total_rows": int(total),
-        "missing_rows": int(missing),
-        "missing_percent": float(missing) / float(total) * 100.0
-    })
-
-quality_report = pd.DataFrame(report_rows).sort_values("missing_percent", ascending=False)
-
-# output saving
-processed_countries.to_csv(OUT_CLEAN, index=False)
-quality_report.to_csv(OUT_REPORT, index=False)
-
-print(f"Saved: {OUT_CLEAN}")    
-print(f"Saved: {OUT_REPORT}")   
\ No newline at end of file
+def report_stage(df: pd.DataFrame) -> pd.DataFrame:
+    report_rows = []
+    for col in [c for c in NUM_COLS if c in df.columns]:
+        total = len(df)
+        missing = df[col].isna().sum()
+        report_rows.append({
+            "metric": col,
+            "total_rows": int(total),
+            "missing_rows": int(missing),
+            "missing_percent": float(missing) / float(total) * 100.0
+        })
+
+    return pd.DataFrame(report_rows).sort_values("missing_percent", ascending=False)
+
+
+# Stage name -> (function, parameters it reads, helpers it calls), in run order.
+# Parameters and the code of the function and helpers are part of the stage's
+# cache key, so editing either reruns that stage and everything after it.
+# FILE_STAGES run independently for every source file (in a worker pool);
+# STAGES run once on the merged table.
+FILE_STAGES = {
+    "load": (load_stage, {}, ()),
+    "coerce": (coerce_stage, {"NUM_COLS": NUM_COLS}, (coerce_numeric,)),
+    "censor": (censor_stage, {"PCT_COLS": PCT_COLS, "RATE_BOUNDS": RATE_BOUNDS,
+                              "POS_ONLY": POS_ONLY, "NONNEG": NONNEG},
+               (censor_range, coerce_numeric)),
+}
+STAGES = {
+    "merge": (merge_stage, {}, ()),
+    "winsorize": (winsorize_stage, {"HEAVY_TAIL": HEAVY_TAIL, "WINSOR_Q": WINSOR_Q}, (winsorize,)),
+    "derive": (derive_stage, {"INFLATION_TARGET": INFLATION_TARGET}, (minmax01, safe_div, normalize_columns)),
+    "normalize": (normalize_stage, {"GLOBAL_TO_NORM": GLOBAL_TO_NORM,
+                                    "DERIVED_TO_NORM": DERIVED_TO_NORM}, (normalize_columns,)),
+    "report": (report_stage, {"NUM_COLS": NUM_COLS}, ()),
+}
+
+
+def _stage_key(name: str, stage: tuple, upstream: str) -> str:
+    fn, params, helpers = stage
+    spec = f"{name};{upstream};{sorted(params.items())!r};{snapshot.code_fingerprint(fn, *helpers)}"
+    return snapshot.source_fingerprint((), extra=spec)
+
+
+def _artifact(stage_dir: Path, name: str, tag: str, key: str) -> Path:
+    return stage_dir / (f"{name}-{tag}-{key}.npz" if tag else f"{name}-{key}.npz")
+
+
+def _run_chain(chain: dict, stage_dir: Path, tag: str, first_input, upstream: str, force: bool = False):
+    """
+    Run the stages of `chain` in order, skipping those whose artifact exists.
+    An artifact is only read when the stage after it has to run.
+
+    Args:
+        first_input: zero-argument callable producing the first stage's input
+        upstream: key of whatever feeds the first stage (content hash, parent keys)
+
+    Returns:
+        (stage -> key, [(stage, tag, "cached" | "ran", seconds), ...])
+    """
+    keys, records = {}, []
+    frame, prev_path = None, None
+    for name, stage in chain.items():
+        start = time.perf_counter()
+        key = _stage_key(name, stage, upstream)
+        path = _artifact(stage_dir, name, tag, key)
+
+        if path.exists() and not force:
+            frame, state = None, "cached"
+        else:
+            if prev_path is None:
+                frame = stage[0](first_input())
+            else:
+                if frame is None:
+                    frame = snapshot.read_snapshot(prev_path)
+                frame = stage[0](frame)
+            snapshot.write_snapshot(frame, path)
+            stale_glob = _artifact(stage_dir, name, tag, "?" * len(key)).name
+            for stale in stage_dir.glob(stale_glob):
+                if stale != path:
+                    stale.unlink(missing_ok=True)
+            state = "ran"
+
+        records.append((name, tag, state, time.perf_counter() - start))
+        keys[name] = upstream = key
+        prev_path = path
+    return keys, records
+
+
+# load -> coerce -> censor for one source file (runs inside a pool worker)
+def _prepare_file(tag: str, path: Path, stage_dir: Path, force: bool = False):
+    upstream = snapshot.source_fingerprint([path])
+    return _run_chain(FILE_STAGES, stage_dir, tag, lambda: path, upstream, force)
+
+
+def prepare_files(paths: dict, stage_dir: Path, workers: int | None = None,
+                  executor: str = "process", force: bool = False) -> dict:
+    """
+    Run the per-file stages for every source file in a worker pool.
+
+    Args:
+        paths: source name -> CSV path
+        workers: pool size (default: one per CPU); 1 runs serially in-process
+        executor: "process" or "thread"
+
+    Returns:
+        Source name -> (stage -> key, timing records), in the order of `paths`
+    """
+    stage_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    if workers <= 1:
+        return {tag: _prepare_file(tag, path, stage_dir, force) for tag, path in paths.items()}
+
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_cls(max_workers=workers) as pool:
+        futures = {tag: pool.submit(_prepare_file, tag, path, stage_dir, force)
+                   for tag, path in paths.items()}
+        return {tag: fut.result() for tag, fut in futures.items()}
+
+
+def run_pipeline(raw_dir: Path = RAW_DIR, out_dir: Path = OUT_DIR, force: bool = False,
+                 workers: int | None = None, executor: str = "process",
+                 sources: dict | None = None) -> list:
+    """
+    Run every stage, reusing cached artifacts whose key still matches.
+    Per-file stages run in parallel; only the merge and later stages are serial.
+
+    Args:
+        sources: source name -> file name under raw_dir (default: SOURCES)
+
+    Returns:
+        Timing records (stage, source, "cached" | "ran" | "wall", seconds) in run order.
+        The "files" record holds the wall time of the whole parallel section.
+    """
+    raw_dir, out_dir = Path(raw_dir), Path(out_dir)
+    stage_dir = out_dir / ".stages"
+    paths = {name: raw_dir / fname for name, fname in (sources or SOURCES).items()}
+    missing = [str(p) for p in paths.values() if not p.exists()]
+    if missing:
+        raise FileNotFoundError(f"Missing file(s): {', '.join(missing)}")
+
+    start = time.perf_counter()
+    prepared = prepare_files(paths, stage_dir, workers, executor, force)
+    records = [rec for _, recs in prepared.values() for rec in recs]
+    records.append(("files", "", "wall", time.perf_counter() - start))
+
+    # The merged table depends on every file's censored output
+    censored = {tag: _artifact(stage_dir, "censor", tag, keys["censor"])
+                for tag, (keys, _) in prepared.items()}
+    upstream = ";".join(f"{tag}={keys['censor']}" for tag, (keys, _) in prepared.items())
+    keys, recs = _run_chain(
+        STAGES, stage_dir, "",
+        lambda: {tag: snapshot.read_snapshot(p) for tag, p in censored.items()},
+        upstream, force,
+    )
+    records.extend(recs)
+
+    _publish(out_dir, stage_dir, keys)
+    return records
+
+
+def format_timings(records: list) -> str:
+    """Per-file lines, then per-stage totals (summed over files) and wall times."""
+    lines = [f"{'stage':<10} {'source':<16} {'state':<7} {'seconds':>8}"]
+    totals: dict[str, float] = {}
+    for stage, tag, state, seconds in records:
+        lines.append(f"{stage:<10} {tag:<16} {state:<7} {seconds:8.3f}")
+        if state != "wall":
+            totals[stage] = totals.get(stage, 0.0) + seconds
+    lines.append("")
+    lines.append("per-stage totals:")
+    for stage, seconds in totals.items():
+        lines.append(f"  {stage:<10} {seconds:8.3f}")
+    return "\n".join(lines)
+
+
+# Write the CSV outputs, unless they already hold the current final artifacts
+def _publish(out_dir: Path, stage_dir: Path, keys: dict) -> None:
+    stamp = stage_dir / "published.txt"
+    current = f"{keys['normalize']} {keys['report']}"
+    outputs = [out_dir / OUT_CLEAN, out_dir / OUT_REPORT]
+    if stamp.exists() and stamp.read_text() == current and all(p.exists() for p in outputs):
+        return
+
+    processed = snapshot.read_snapshot(stage_dir / f"normalize-{keys['normalize']}.npz")
+    quality_report = snapshot.read_snapshot(stage_dir / f"report-{keys['report']}.npz")
+    processed.to_csv(outputs[0], index=False)
+    quality_report.to_csv(outputs[1], index=False)
+    stamp.write_text(current)
+    print(f"Saved: {outputs[0]}")
+    print(f"Saved: {outputs[1]}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Clean and merge the raw Factbook CSVs.")
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DIR, help="directory with the source CSVs")
+    parser.add_argument("--out-dir", type=Path, default=OUT_DIR, help="where outputs and stage caches go")
+    parser.add_argument("--force", action="store_true", help="ignore cached stage artifacts")
+    parser.add_argument("--no-app-metrics", action="store_true",
+                        help="skip precomputing the app's complex metrics")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="parallel workers for per-file stages (default: one per CPU)")
+    parser.add_argument("--executor", choices=("process", "thread"), default="process",
+                        help="pool type for per-file stages")
+    args = parser.parse_args(argv)
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    records = run_pipeline(args.raw_dir, args.out_dir, force=args.force,
+                           workers=args.workers, executor=args.executor)
+    print(format_timings(records))
+
+    if not args.no_app_metrics and args.raw_dir.resolve() != RAW_DIR:
+        print(f"app metrics not rebuilt: they come from {RAW_DIR}, not --raw-dir {args.raw_dir}")
+    elif not args.no_app_metrics:
+        # The app reads its metrics from this artifact instead of deriving them
+        from jbi100_app.data import build_metrics_artifact
+        build_metrics_artifact()
+        print("app metrics up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())